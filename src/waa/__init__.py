@@ -1,4 +1,7 @@
-from whisper_answer_assistant import main
+def main():
+    # legacy script sounddevice/faster_whisper/openai çeker → `import waa.cli` hafif kalsın
+    from whisper_answer_assistant import main as _main
+    return _main()
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
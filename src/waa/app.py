@@ -1,4 +1,5 @@
 # --- src/waa/app.py ---
+import sqlite3
 import time
 import pyperclip
 import yaml
@@ -6,23 +7,61 @@ from typing import Optional
 from pathlib import Path
 from dotenv import load_dotenv
 
-from .audio import MicSegmenter
-from .asr import WhisperASR
-from .detect import is_english_question, load_keywords, contains_keyword
-from .llm import ChatAssistant
-
-load_dotenv()
+from .audio import FileSource, MicSegmenter
+from .endpoint import AdaptiveEndpointer
+from .eventlog import EventLog
+from .history import DEFAULT_HISTORY_PATH, MeetingHistory
+from .asr import LanguageGate, WhisperASR
+from .cache import AnswerCache, CachedAssistant
+from .context import MeetingContext
+from .detect import QuestionClassifier, is_english_question, load_keywords, contains_keyword
+from .llm import SYSTEM_PROMPT, AsyncChatAssistant, ChatAssistant
+from .metrics import Metrics, MetricsReporter, StageProfiler
+from .pipeline import BoundedQueue, OverlapStitcher, Pipeline, SegmentJob, merge_questions, merge_segments
+from .scheduler import BatchingScheduler, CoalescingScheduler
+from .speculate import Speculator
+from .startup import BackgroundLoader, StartupTimer
+from .streaming import StreamingASR
+from .tune import DEFAULT_PROFILE_PATH, load_profile
 
 def run(
     device: Optional[int] = None,
-    whisper_model: str = "base",
+    whisper_model: Optional[str] = None,
     config_path: Optional[str] = "configs/settings.yaml",
     keywords_path: Optional[str] = "configs/keywords.en.txt",
+    input_path: Optional[str] = None,
+    input_speed: float = 1.0,
+    metrics_dir: Optional[str] = None,
+    metrics_interval: float = 10.0,
+    profile: Optional[str] = None,
 ):
+    timer = StartupTimer()
+    metrics = Metrics()
+    load_dotenv()
+
     # Varsayılanlar
-    sr = 16000; frame_ms = 20; vad_aggr = 2; max_seg = 12.0; silence = 0.30
+    sr = 16000; frame_ms = 20; vad_aggr = 2; max_seg = 12.0; silence = 0.30; preroll_ms = 0
+    min_silence = None; max_silence = None; onset_frames = 1; energy_on_db = None; energy_off_db = None
+    capture_rate = None; capture_channels = 0; overlap_sec = 0.0
     auto_copy = False; openai_model = "gpt-4o-mini"; require_dev_keyword = False
+    llm_backend = "sync"; base_url = None; connect_to = 3.0; first_token_to = 8.0; total_to = 45.0
+    hedge_ms = 0; max_conns = 8; supersede = True
     min_prob = 0.0; min_chars = 0; force_en = False
+    detector = "heuristic"; detector_path = None; question_threshold = None
+    lang_gate = False; lang_gate_prob = 0.8; lang_gate_prefix = 2.0; lang_prior_skip = 0.85
+    asr_q_size = 4; asr_overflow = "merge"; answer_q_size = 2; answer_overflow = "drop_oldest"
+    coalesce = False; coalesce_short = 2.0; coalesce_max = 20.0; coalesce_gap = 0.3
+    batch = False; batch_size = 8; batch_min = 3
+    streaming = False; partial_ms = 400; agreement = 2
+    speculative = False; spec_similarity = 0.85; spec_restarts = 2
+    background_load = True; warmup = True
+    tune_profile = True; tune_profile_path = DEFAULT_PROFILE_PATH
+    cache_enabled = False; cache_path = ".waa/answers.sqlite"; cache_entries = 512; cache_ttl_h = 168.0
+    log_enabled = False; log_path = ".waa/meeting.jsonl"; log_max_mb = 10.0; log_rotate_h = 0.0; log_backups = 5
+    hist_enabled = False; hist_path = DEFAULT_HISTORY_PATH; hist_batch = 64; hist_flush = 2.0; hist_buffer = 5000
+    hist_recall = True; hist_min_score = 0.6
+    ctx_enabled = False; ctx_max_tokens = 2000; ctx_keep_tokens = 1200; ctx_summary_tokens = 250
+    ctx_summarize = "extractive"; ctx_answers = True
 
     # YAML konfigürasyonu
     if config_path and Path(config_path).exists():
@@ -32,28 +71,140 @@ def run(
         vad_aggr = cfg.get("audio", {}).get("vad_aggressiveness", vad_aggr)
         max_seg = cfg.get("audio", {}).get("max_segment_sec", max_seg)
         silence = cfg.get("audio", {}).get("silence_follow_sec", silence)
+        preroll_ms = cfg.get("audio", {}).get("preroll_ms", preroll_ms)
+        min_silence = cfg.get("audio", {}).get("min_silence_sec", min_silence)
+        max_silence = cfg.get("audio", {}).get("max_silence_sec", max_silence)
+        onset_frames = int(cfg.get("audio", {}).get("onset_frames", onset_frames))
+        energy_on_db = cfg.get("audio", {}).get("energy_on_db", energy_on_db)
+        energy_off_db = cfg.get("audio", {}).get("energy_off_db", energy_off_db)
+        capture_rate = cfg.get("audio", {}).get("capture_rate", capture_rate)
+        capture_channels = int(cfg.get("audio", {}).get("capture_channels", capture_channels) or 0)
+        overlap_sec = float(cfg.get("audio", {}).get("maxlen_overlap_sec", overlap_sec) or 0.0)
 
         assistant_cfg = cfg.get("assistant", {}) or {}
         auto_copy = assistant_cfg.get("auto_copy", auto_copy)
         openai_model = assistant_cfg.get("openai_model", openai_model)
+        llm_backend = assistant_cfg.get("backend", llm_backend)
+        base_url = assistant_cfg.get("base_url", base_url) or None
+        connect_to = float(assistant_cfg.get("connect_timeout_sec", connect_to))
+        first_token_to = float(assistant_cfg.get("first_token_timeout_sec", first_token_to))
+        total_to = float(assistant_cfg.get("total_timeout_sec", total_to))
+        hedge_ms = float(assistant_cfg.get("hedge_after_ms", hedge_ms) or 0)
+        max_conns = int(assistant_cfg.get("max_connections", max_conns))
+        supersede = bool(assistant_cfg.get("supersede_stale", supersede))
         require_dev_keyword = assistant_cfg.get("require_dev_keyword", require_dev_keyword)
         min_prob = float(assistant_cfg.get("min_lang_prob", min_prob) or 0.0)
         min_chars = int(assistant_cfg.get("min_chars", min_chars) or 0)
         force_en = bool(assistant_cfg.get("force_language_en", force_en))
+        lang_gate = bool(assistant_cfg.get("language_gate", lang_gate))
+        lang_gate_prob = float(assistant_cfg.get("language_gate_min_prob", lang_gate_prob))
+        lang_gate_prefix = float(assistant_cfg.get("language_gate_prefix_sec", lang_gate_prefix))
+        lang_prior_skip = float(assistant_cfg.get("language_prior_skip", lang_prior_skip))
+        detector = assistant_cfg.get("question_detector", detector) or detector
+        detector_path = assistant_cfg.get("question_model", detector_path) or None
+        question_threshold = assistant_cfg.get("question_threshold", question_threshold)
+
+        pipeline_cfg = cfg.get("pipeline", {}) or {}
+        asr_q_size = int(pipeline_cfg.get("asr_queue_size", asr_q_size))
+        asr_overflow = pipeline_cfg.get("asr_overflow", asr_overflow)
+        answer_q_size = int(pipeline_cfg.get("answer_queue_size", answer_q_size))
+        answer_overflow = pipeline_cfg.get("answer_overflow", answer_overflow)
+        coalesce = bool(pipeline_cfg.get("coalesce", coalesce))
+        coalesce_short = float(pipeline_cfg.get("coalesce_short_sec", coalesce_short))
+        coalesce_max = float(pipeline_cfg.get("coalesce_max_sec", coalesce_max))
+        coalesce_gap = float(pipeline_cfg.get("coalesce_gap_sec", coalesce_gap))
+        batch = bool(pipeline_cfg.get("batch", batch))
+        batch_size = int(pipeline_cfg.get("batch_size", batch_size))
+        batch_min = int(pipeline_cfg.get("batch_min", batch_min))
+
+        cache_cfg = cfg.get("cache", {}) or {}
+        cache_enabled = bool(cache_cfg.get("enabled", cache_enabled))
+        cache_path = cache_cfg.get("path", cache_path)
+        cache_entries = int(cache_cfg.get("max_entries", cache_entries))
+        cache_ttl_h = float(cache_cfg.get("ttl_hours", cache_ttl_h))
+
+        tune_cfg = cfg.get("tune", {}) or {}
+        tune_profile = bool(tune_cfg.get("use_profile", tune_profile))
+        tune_profile_path = tune_cfg.get("profile_path", tune_profile_path) or tune_profile_path
+
+        startup_cfg = cfg.get("startup", {}) or {}
+        background_load = bool(startup_cfg.get("background_load", background_load))
+        warmup = bool(startup_cfg.get("warmup", warmup))
+
+        log_cfg = cfg.get("log", {}) or {}
+        log_enabled = bool(log_cfg.get("enabled", log_enabled))
+        log_path = log_cfg.get("path", log_path) or log_path
+        log_max_mb = float(log_cfg.get("max_mb", log_max_mb) or 0)
+        log_rotate_h = float(log_cfg.get("rotate_hours", log_rotate_h) or 0)
+        log_backups = int(log_cfg.get("backups", log_backups))
+
+        history_cfg = cfg.get("history", {}) or {}
+        hist_enabled = bool(history_cfg.get("enabled", hist_enabled))
+        hist_path = history_cfg.get("path", hist_path) or hist_path
+        hist_batch = int(history_cfg.get("batch_size", hist_batch))
+        hist_flush = float(history_cfg.get("flush_sec", hist_flush))
+        hist_buffer = int(history_cfg.get("max_buffer", hist_buffer))
+        hist_recall = bool(history_cfg.get("recall", hist_recall))
+        hist_min_score = float(history_cfg.get("recall_min_score", hist_min_score))
+
+        context_cfg = cfg.get("context", {}) or {}
+        ctx_enabled = bool(context_cfg.get("enabled", ctx_enabled))
+        ctx_max_tokens = int(context_cfg.get("max_tokens", ctx_max_tokens))
+        ctx_keep_tokens = int(context_cfg.get("keep_tokens", ctx_keep_tokens))
+        ctx_summary_tokens = int(context_cfg.get("summary_tokens", ctx_summary_tokens))
+        ctx_summarize = context_cfg.get("summarize", ctx_summarize) or "extractive"
+        ctx_answers = bool(context_cfg.get("include_answers", ctx_answers))
+
+        streaming_cfg = cfg.get("streaming", {}) or {}
+        streaming = bool(streaming_cfg.get("enabled", streaming))
+        partial_ms = int(streaming_cfg.get("partial_interval_ms", partial_ms))
+        agreement = int(streaming_cfg.get("agreement", agreement))
+        speculative = bool(streaming_cfg.get("speculative", speculative))
+        spec_similarity = float(streaming_cfg.get("speculative_similarity", spec_similarity))
+        spec_restarts = int(streaming_cfg.get("speculative_max_restarts", spec_restarts))
     else:
         cfg = {}
 
+    # --whisper-model verilmediyse (ya da aynı modelse) `waa tune` profili
+    tuned = load_profile(tune_profile_path) if tune_profile else None
+    if tuned and whisper_model not in (None, tuned["model"]):
+        tuned = None
+    asr_opts = {k: tuned[k] for k in ("cpu_threads", "num_workers", "compute_type", "beam_size")} if tuned else {}
+    whisper_model = tuned["model"] if tuned else (whisper_model or "base")
+
     keywords = load_keywords(keywords_path) if keywords_path else set()
+    classifier = QuestionClassifier.load(detector_path, question_threshold) if detector == "classifier" else None
 
     print("=" * 80)
     print("🎧 Whisper Answer Assistant")
     print("Whisper model:", whisper_model)
-    print("Mic device:", device if device is not None else "default")
+    if tuned:
+        print("ASR profile: {compute_type}, cpu_threads={cpu_threads}, num_workers={num_workers}, beam={beam_size} "
+              "(RTF {rtf}, WER {wer:.1%})".format(**tuned))
+    if input_path:
+        print("Input file:", input_path, "(speed {0})".format(input_speed or "max"))
+    else:
+        print("Mic device:", device if device is not None else "default")
     print("Auto-copy:", "ON" if auto_copy else "OFF")
+    print("LLM backend:", llm_backend, "({0})".format(base_url) if base_url else "")
+    print("Question detector:", detector if classifier is None else
+          "classifier (threshold {0:.2f})".format(classifier.threshold))
     print("Require dev keyword:", "ON" if require_dev_keyword else "OFF")
     print("Min EN prob:", "{:.2f}".format(min_prob))
     print("Min chars:", min_chars)
     print("Force EN:", force_en)
+    print("Language gate:", "ON (skip non-EN at p≥{0:.2f})".format(lang_gate_prob) if (lang_gate and not force_en) else "OFF")
+    print("Queues: asr={0}/{1}, answer={2}/{3}".format(asr_q_size, asr_overflow, answer_q_size, answer_overflow))
+    print("Coalesce short segments:", "≤{0}s".format(coalesce_short) if coalesce else "OFF")
+    print("Batched catch-up:", "{0}..{1} segments".format(batch_min, batch_size) if batch else "OFF")
+    print("Answer cache:", cache_path if (cache_enabled and not ctx_enabled) else
+          "OFF (answers depend on the meeting context)" if cache_enabled else "OFF")
+    print("Event log:", log_path if log_enabled else "OFF")
+    print("History:", "{0}{1}".format(hist_path, " (+ recall)" if hist_recall else "") if hist_enabled else "OFF")
+    print("Meeting context:", "≤{0} tok recent + {1} tok summary ({2})".format(
+        ctx_max_tokens, ctx_summary_tokens, ctx_summarize) if ctx_enabled else "OFF")
+    print("Streaming partials:", "every {0} ms".format(partial_ms) if streaming else "OFF")
+    print("Speculative answers:", "ON" if (streaming and speculative) else "OFF")
     print("=" * 80)
 
     seg = MicSegmenter(
@@ -62,52 +213,340 @@ def run(
         vad_aggressiveness=vad_aggr,
         max_segment_sec=max_seg,
         silence_follow_sec=silence,
+        preroll_ms=preroll_ms,
+        endpointer=AdaptiveEndpointer(
+            sr, silence, min_silence, max_silence, onset_frames, on_db=energy_on_db, off_db=energy_off_db,
+        ),
         device=device,
+        source=(FileSource(input_path, sr, int(sr * frame_ms / 1000), speed=input_speed) if input_path else None),
+        metrics=metrics,
+        capture_rate=capture_rate,
+        capture_channels=capture_channels,
+        overlap_sec=overlap_sec,
     )
-    asr = WhisperASR(whisper_model)
+    stitcher = OverlapStitcher(overlap_sec, sr) if overlap_sec > 0 else None
+    timer.add("config", timer.since_start())
 
-    try:
-        assistant = ChatAssistant(openai_model)
-    except Exception as e:
-        print("⚠️ OpenAI init error → sadece transkript:", e)
-        assistant = None
+    # bağlam açıkken cevap toplantıya bağlı ("and how does it scale?") → önbellek başka
+    # toplantının cevabını döndürebilir; bu durumda atlanır
+    cache = AnswerCache(cache_path, cache_entries, cache_ttl_h * 3600) if (cache_enabled and not ctx_enabled) else None
+    events = EventLog(
+        log_path, int(log_max_mb * 1024 * 1024), log_rotate_h * 3600, log_backups,
+    ) if log_enabled else None
+    history = None
+    if hist_enabled:
+        try:
+            history = MeetingHistory(hist_path, source=str(input_path or "mic"), batch_size=hist_batch,
+                                     flush_interval=hist_flush, max_buffer=hist_buffer)
+        except sqlite3.Error as e:      # ör. FTS5 olmadan derlenmiş SQLite
+            print("⚠️ History disabled:", e)
+
+    context = MeetingContext(
+        ctx_max_tokens, ctx_keep_tokens, ctx_summary_tokens, include_answers=ctx_answers,
+    ) if ctx_enabled else None
+
+    def make_assistant():
+        try:
+            if llm_backend == "async":
+                chat = AsyncChatAssistant(
+                    openai_model, base_url, connect_to, first_token_to, total_to,
+                    hedge_after_sec=(hedge_ms / 1000.0 if hedge_ms else None), max_connections=max_conns,
+                    context=context,
+                )
+            else:
+                chat = ChatAssistant(openai_model, base_url=base_url, context=context)
+        except Exception as e:
+            print("⚠️ OpenAI init error → sadece transkript:", e)
+            return None
+        if context is not None and ctx_summarize == "llm":
+            context.summarize_fn = chat.summarize
+        return CachedAssistant(chat, cache, SYSTEM_PROMPT) if cache else chat
+
+    gate = LanguageGate("en", lang_gate_prob, lang_gate_prefix, lang_prior_skip) if (lang_gate and not force_en) else None
+
+    def make_asr():
+        m = WhisperASR(whisper_model, **asr_opts)
+        if gate is not None and m.multilingual:   # .en modelleri zaten yalnızca İngilizce
+            m.language_gate = gate
+        return m
+
+    # Model arka planda yüklenir; bu sırada capture/VAD segmentleri kuyruğa biriktirir
+    asr = BackgroundLoader(
+        "whisper",
+        make_asr,
+        warmup=(lambda m: m.warmup()) if warmup else None,
+        timer=timer,
+        on_ready=lambda _: print(timer.report()),
+    )
+    assistant_loader = BackgroundLoader("openai", make_assistant, timer=timer)
+    if not background_load:
+        asr = asr.get()
+    streamer = StreamingASR(asr, agreement, language=("en" if force_en else None)) if streaming else None
+
+    def stream_fn(question: str):
+        a = assistant_loader.get()
+        return a.stream_answer(question) if a else iter(())
+
+    speculator = Speculator(stream_fn, spec_similarity, spec_restarts) if (streaming and speculative) else None
 
-    for pcm16, reason in seg.segments():
-        print("\n[{0}] (segment {1}) decoding...".format(time.strftime("%Y-%m-%d %H:%M:%S"), reason))
+    def wants_answer(text: str, lang: str, prob: float) -> bool:
+        if classifier is not None:
+            if not classifier.is_question(text, lang):
+                return False
+        elif not is_english_question(text, lang):
+            return False
+        # Filtreler
+        if len(text) < min_chars:
+            return False
+        if prob and prob < min_prob:
+            return False
+        if require_dev_keyword and not contains_keyword(text, keywords):
+            return False
+        return True
+
+    def transcribe(job: SegmentJob):
+        kind = "partial" if job.reason == "partial" else "final"
+        queue_wait = max(0.0, time.time() - job.t_end)
+        if kind == "final":
+            metrics.observe("queue_wait", queue_wait)
+            print("\n[{0}] (segment {1}) decoding...".format(time.strftime("%Y-%m-%d %H:%M:%S"), job.reason))
+        t0 = time.perf_counter()
+        words = [] if stitcher is not None and stitcher.needs_words(job) else None
         try:
-            text, lang, prob = asr.transcribe_segment(pcm16, language=("en" if force_en else None))
+            if streamer:
+                ev = streamer.process(job)
+                if ev is None:
+                    return None
+                if ev.kind == "partial":
+                    metrics.observe("asr_decode", time.perf_counter() - t0, kind=kind)
+                    seg.hint(ev.seg_id, ev.text)
+                    ask = wants_answer(ev.text, ev.lang, ev.prob)
+                    print("  {0} {1} | {2}".format("❔" if ask else "…", ev.stable, ev.text[len(ev.stable):].strip()))
+                    if ask and speculator:
+                        speculator.on_partial(ev.seg_id, ev.text)
+                    return None
+                text, lang, prob = ev.text, ev.lang, ev.prob
+            elif job.result is not None:
+                text, lang, prob = job.result
+            else:
+                text, lang, prob = asr.transcribe_segment(job.pcm16, language=("en" if force_en else None), words=words)
         except Exception as e:
+            metrics.inc("errors", stage="asr")
+            if events:
+                events.write("error", stage="asr", seg_id=job.seg_id, error=str(e))
             print("Transcription error:", e)
-            continue
+            return None
+        decode_sec = time.perf_counter() - t0
+        if job.result is None:
+            metrics.observe("asr_decode", decode_sec, kind=kind)
+        if stitcher is not None:
+            text = stitcher.stitch(job, text, words)
 
         if not text.strip():
-            continue
+            if lang not in ("en", "auto") and kind == "final":
+                metrics.inc("filtered_segments", reason="non_english")
+                print("  (skipped: {0}, p={1:.2f})".format(lang, prob))
+            else:
+                metrics.inc("filtered_segments", reason="empty")
+            if speculator:
+                speculator.cancel_pending()
+            return None
 
         prob_s = ", p={0:.2f}".format(prob) if prob else ""
         print("[{0}] You ({1}{2}): {3}".format(time.strftime("%Y-%m-%d %H:%M:%S"), lang, prob_s, text))
+        if context is not None:
+            context.add_transcript(text)
+        if history is not None:
+            history.add_transcript(text, job.seg_id)
+
+        with metrics.span("question_filter"):
+            ask = wants_answer(text, lang, prob)
+        if events:
+            events.write(
+                "transcript", seg_id=job.seg_id, reason=job.reason, text=text, lang=lang,
+                prob=round(prob, 3) if prob else None, question=ask,
+                queue_wait_ms=round(queue_wait * 1000.0, 1),
+                decode_ms=None if job.result is not None else round(decode_sec * 1000.0, 1),
+            )
+        if not ask:
+            metrics.inc("filtered_segments", reason="not_question")
+            if speculator:
+                speculator.cancel_pending()
+            return None
+        return job.seg_id, text
 
-        if is_english_question(text, lang):
-            # Filtreler
-            if len(text) < min_chars:
-                continue
-            if prob and prob < min_prob:
-                continue
-            if require_dev_keyword and not contains_keyword(text, keywords):
-                continue
-
-            print("-" * 80)
-            print("🧩 English question detected:\n> {0}".format(text))
-            if assistant:
-                print("🤖 Suggested answer (speak this):")
-                collected = []
-                for token in assistant.stream_answer(text):
+    # answer() kuyruğu doğrudan görür (Pipeline'dan önce kurulur; geç bağlanan `pipeline` adına bakmaz)
+    answer_q = BoundedQueue("answer", answer_q_size, answer_overflow, merge=merge_questions)
+
+    def answer(item):
+        seg_id, text = item
+        print("-" * 80)
+        print("🧩 English question detected:\n> {0}".format(text))
+        if history is not None and hist_recall:
+            with metrics.span("history_lookup"):
+                prior = history.lookup(text, hist_min_score)
+            if prior is not None:
+                print("📚 Asked before ({0}, overlap {1}, {2} ms):\n> {3}\n{4}".format(
+                    time.strftime("%Y-%m-%d %H:%M", time.localtime(prior["ts"])), prior["score"], prior["ms"],
+                    prior["question"], prior["answer"]))
+        assistant = assistant_loader.get()
+        if assistant:
+            print("🤖 Suggested answer (speak this):")
+            collected = []
+            t0 = time.perf_counter()
+            t_first = None
+            outcome = "ok"
+            tokens = speculator.claim(text, seg_id) if speculator else None
+            prefetched = tokens is not None
+            if tokens is None:
+                tokens = assistant.stream_answer(text)
+            superseded = False
+            try:
+                for token in tokens:
+                    if t_first is None:
+                        t_first = time.perf_counter() - t0
                     print(token, end="", flush=True)
                     collected.append(token)
-                ans = "".join(collected).strip()
-                print("\n" + "-" * 80)
-                if ans and auto_copy:
-                    try:
-                        pyperclip.copy(ans)
-                        print("📋 Copied to clipboard.")
-                    except Exception:
-                        pass
\ No newline at end of file
+                    if supersede and len(answer_q):
+                        # daha yeni soru bekliyor → eski cevabı iptal et
+                        superseded = True
+                        outcome = "superseded"
+                        break
+            except Exception as e:
+                outcome = "error"
+                metrics.inc("errors", stage="llm")
+                if events:
+                    events.write("error", stage="llm", question=text, error=str(e))
+                print("\n⚠️ OpenAI error:", e)
+            finally:
+                close = getattr(tokens, "close", None)
+                if close is not None:
+                    close()
+            cache_hit = getattr(tokens, "cache_hit", False)
+            source = "prefetch" if prefetched else ("cache" if cache_hit else "live")
+            if t_first is not None:
+                metrics.observe("llm_ttft", t_first, source=source)
+            total = time.perf_counter() - t0
+            metrics.observe("answer_total", total, outcome=outcome)
+            metrics.inc("answers", outcome=outcome)
+            ans = "".join(collected).strip()
+            if history is not None:
+                history.add_answer(text, ans, outcome, seg_id)
+            prompt = {}
+            if context is not None:
+                if ans and outcome == "ok":
+                    context.add_answer(ans)
+                rep = context.last_report
+                if source == "live" and rep is not None:
+                    usage = getattr(tokens, "usage", None) or {}
+                    prompt = {"prompt_tokens": usage.get("prompt_tokens") or rep.total_tokens,
+                              "prompt_tokens_est": rep.total_tokens,
+                              "stable_prefix_tokens": rep.stable_prefix_tokens,
+                              "cached_tokens": usage.get("cached_tokens")}
+                    metrics.inc("prompt_tokens", prompt["prompt_tokens"])
+                    if usage.get("cached_tokens"):
+                        metrics.inc("prompt_cached_tokens", usage["cached_tokens"])
+            if events:
+                events.write(
+                    "answer", question=text, answer=ans, outcome=outcome, source=source,
+                    ttft_ms=round(t_first * 1000.0, 1) if t_first is not None else None,
+                    total_ms=round(total * 1000.0, 1), **prompt
+                )
+            if superseded:
+                print(" … (superseded by a newer question)", end="")
+            elif prefetched:
+                print("\n(prefetched from partial)", end="")
+            elif cache_hit:
+                print("\n(cached answer)", end="")
+            if prompt:
+                r = context.last_report
+                print("\n(prompt ≈{0} tok: system {1}, summary {2}, recent {3} in {4} msgs; stable prefix ≈{5}{6})".format(
+                    r.total_tokens, r.system_tokens, r.summary_tokens, r.recent_tokens, r.recent_messages,
+                    r.stable_prefix_tokens,
+                    "; provider {0}, cached {1}".format(prompt["prompt_tokens"], prompt["cached_tokens"])
+                    if prompt["cached_tokens"] is not None else "",
+                ), end="")
+            print("\n" + "-" * 80)
+            if ans and auto_copy:
+                try:
+                    pyperclip.copy(ans)
+                    print("📋 Copied to clipboard.")
+                except Exception:
+                    pass
+        elif history is not None:
+            history.add_answer(text, "", "no_backend", seg_id)   # soru yine de geçmişte aranabilsin
+
+    scheduler = CoalescingScheduler(
+        asr, coalesce_short, coalesce_max, coalesce_gap, language=("en" if force_en else None), samplerate=sr,
+        metrics=metrics,
+    ) if coalesce else None
+    if batch:
+        scheduler = BatchingScheduler(
+            asr, batch_size, batch_min, language=("en" if force_en else None), samplerate=sr, fallback=scheduler,
+            metrics=metrics,
+        )
+
+    profiler = StageProfiler(profile, Path(metrics_dir or ".waa") / "profile") if profile else None
+    pipeline = Pipeline(
+        seg.segments(partial_every_sec=(partial_ms / 1000.0 if streaming else None)),
+        profiler.wrap("asr", transcribe) if profiler else transcribe,
+        profiler.wrap("llm", answer) if profiler else answer,
+        asr_queue=BoundedQueue("asr", asr_q_size, asr_overflow, merge=merge_segments),
+        answer_queue=answer_q,
+        scheduler=scheduler,
+        overlap_sec=seg.overlap_samples / float(sr),
+    )
+    def collect():
+        for st in pipeline.stats():
+            metrics.set("queue_depth", st["depth"], queue=st["name"])
+            metrics.set("queue_max_depth", st["max_depth"], queue=st["name"])
+            metrics.set("queue_dropped", st["dropped"], queue=st["name"])
+            metrics.set("queue_merged", st["merged"], queue=st["name"])
+
+    reporter = MetricsReporter(metrics, metrics_dir, metrics_interval, collect).start() if metrics_dir else None
+    pipeline.start()
+    if background_load:
+        print("🎤 Listening (model loading in background)... Ctrl+C to stop.")
+    try:
+        pipeline.wait()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping...")
+    finally:
+        pipeline.stop()
+        summary = reporter.stop() if reporter else metrics.summary()
+        spans = summary["spans_ms"]
+        if spans:
+            print("Latency ms (p50/p90/p99):", ", ".join(
+                "{0}={1}/{2}/{3}".format(k, v["p50"], v["p90"], v["p99"]) for k, v in spans.items() if v.get("p50") is not None
+            ))
+        if reporter:
+            print("Metrics →", reporter.json_path, reporter.prom_path)
+        if profiler:
+            print("Profiles →", ", ".join(str(p) for p in profiler.close()))
+        for st in pipeline.stats():
+            print("Queue {name}: max_depth={max_depth}/{maxsize} put={put} dropped={dropped} merged={merged}".format(**st))
+        if events:
+            events.close()
+            print("Event log: written={written} dropped={dropped} rotations={rotations}".format(**events.stats()))
+        if history is not None:
+            history.close()
+            print("History:", ", ".join("{0}={1}".format(k, v) for k, v in history.stats().items()))
+        if cache:
+            print("Answer cache: entries={entries} hits={hits} misses={misses} hit_rate={hit_rate}".format(**cache.stats()))
+            cache.close()
+        chat = assistant_loader.get() if assistant_loader.ready() else None
+        chat = getattr(chat, "assistant", chat)
+        if hasattr(chat, "stats"):
+            print("LLM:", ", ".join("{0}={1}".format(k, v) for k, v in chat.stats().items()))
+        if hasattr(chat, "close"):
+            chat.close()
+        if context is not None:
+            print("Meeting context:", ", ".join("{0}={1}".format(k, v) for k, v in context.stats().items()))
+        if speculator:
+            print("Speculation:", ", ".join("{0}={1}".format(k, v) for k, v in speculator.stats().items()))
+        if gate is not None and (gate.prepass or gate.prior_skips):
+            print("Language gate:", ", ".join("{0}={1}".format(k, v) for k, v in gate.stats().items()))
+        if stitcher is not None and stitcher.cuts:
+            print("Maxlen overlap:", ", ".join("{0}={1}".format(k, v) for k, v in stitcher.stats().items()))
+        if scheduler:
+            print("ASR scheduler:", ", ".join("{0}={1}".format(k, v) for k, v in scheduler.stats().items()))
@@ -1,28 +1,284 @@
 # --- src/waa/asr.py ---
+import bisect
+import time
 import numpy as np
-from faster_whisper import WhisperModel
+from typing import List, Optional, Sequence, Tuple
+
+WHISPER_SR = 16000   # Whisper yalnızca 16 kHz mono bekler
+
+def pcm_float32_from_int16(pcm16, out: Optional[np.ndarray] = None):
+    """int16 PCM (bytes / memoryview) → float32 [-1, 1) in a single pass.
+
+    With `out`, the result is written into out[:n] (no new array) and that view is returned.
+    """
+    x = np.frombuffer(pcm16, dtype=np.int16)
+    out = np.empty(len(x), dtype=np.float32) if out is None else out[:len(x)]
+    np.multiply(x, np.float32(1.0 / 32768.0), out=out, dtype=np.float32, casting="unsafe")
+    return out
+
+class LanguageGate:
+    """Skips the full decode of segments that are confidently not `target` language.
+
+    Per segment (only when no language is forced):
+    - while the session prior says `target` (EMA of per-segment target
+      probability ≥ `prior_skip`), no pre-pass runs: the full decode detects
+      the language itself and keeps the prior up to date;
+    - otherwise language ID runs on the first `prefix_sec` of the segment;
+      a non-target language with probability ≥ `min_prob` skips the full
+      decode, a `target` result is decoded with the language fixed (no
+      second detection).
+    Avoided decode time is estimated from the measured decode time per
+    audio second of the segments that were decoded.
+    """
+    def __init__(
+        self,
+        target: str = "en",
+        min_prob: float = 0.8,
+        prefix_sec: float = 2.0,
+        prior_skip: float = 0.85,
+        prior_alpha: float = 0.3,
+    ):
+        self.target = target
+        self.min_prob = min_prob
+        self.prefix_sec = prefix_sec
+        self.prior_skip = prior_skip
+        self.prior_alpha = prior_alpha
+        self.prior = 0.5                 # oturumdaki hedef dil olasılığı (EMA)
+        self._rtf: Optional[float] = None
+        # sayaçlar
+        self.prepass = 0
+        self.prepass_sec = 0.0
+        self.prior_skips = 0
+        self.skipped = 0
+        self.skipped_audio_sec = 0.0
+        self.avoided_sec = 0.0
+
+    def _observe(self, lang: str, prob: float):
+        p = prob if lang == self.target else 0.0
+        self.prior += self.prior_alpha * (p - self.prior)
+
+    def transcribe(self, asr: "WhisperASR", pcm16, words: Optional[list] = None) -> Tuple[str, str, float]:
+        dur = len(pcm16) / 2.0 / WHISPER_SR
+        language = None
+        if self.prior >= self.prior_skip:
+            self.prior_skips += 1
+        else:
+            t0 = time.perf_counter()
+            lang, prob = asr.detect_language(pcm16, self.prefix_sec)
+            self.prepass += 1
+            self.prepass_sec += time.perf_counter() - t0
+            if lang != self.target and prob >= self.min_prob:
+                self._observe(lang, prob)
+                self.skipped += 1
+                self.skipped_audio_sec += dur
+                if self._rtf is not None:
+                    self.avoided_sec += self._rtf * dur
+                return "", lang, prob
+            # düşük güvenli başka dil → tam çözüm dili kendisi (tüm pencerede) belirlesin
+            language = lang if lang == self.target else None
+        t0 = time.perf_counter()
+        text, lang, prob = asr.decode(pcm16, language, words)
+        if dur > 0:
+            rtf = (time.perf_counter() - t0) / dur
+            self._rtf = rtf if self._rtf is None else 0.8 * self._rtf + 0.2 * rtf
+        self._observe(lang, prob)
+        return text, lang, prob
+
+    def stats(self) -> dict:
+        return {
+            "prior": round(self.prior, 3),
+            "prepass": self.prepass,
+            "prepass_sec": round(self.prepass_sec, 3),
+            "prior_skips": self.prior_skips,
+            "skipped_decodes": self.skipped,
+            "skipped_audio_sec": round(self.skipped_audio_sec, 2),
+            "avoided_decode_sec": round(self.avoided_sec, 3),
+            "net_saved_sec": round(self.avoided_sec - self.prepass_sec, 3),
+        }
 
-def pcm_float32_from_int16(pcm16: bytes):
-    return np.frombuffer(pcm16, dtype=np.int16).astype(np.float32) / 32768.0
 
 class WhisperASR:
-    def __init__(self, model_name: str = "base"):
-        # device="auto", compute_type="auto" → en hızlı uygun ayar
-        self.model = WhisperModel(model_name, device="auto", compute_type="auto")
+    def __init__(
+        self,
+        model_name: str = "base",
+        cpu_threads: int = 0,
+        num_workers: int = 1,
+        model=None,
+        compute_type: str = "auto",
+        beam_size: int = 1,
+        device: str = "auto",
+    ):
+        """`model`: share an already loaded WhisperModel (one wrapper per worker thread).
+
+        `num_workers` > 1 lets that many threads run transcribe() on the model
+        concurrently; `cpu_threads` = 0 keeps CTranslate2's default.
+        `compute_type` / `beam_size` come from `waa tune` when a tuned profile exists.
+        """
+        if model is None:
+            from faster_whisper import WhisperModel   # ağır import: yalnızca model yüklenirken
 
-    def transcribe_segment(self, pcm16: bytes, language=None):
-        """Returns: (text, lang, lang_prob)"""
-        audio = pcm_float32_from_int16(pcm16)
+            # device="auto", compute_type="auto" → en hızlı uygun ayar
+            model = WhisperModel(
+                model_name, device=device, compute_type=compute_type,
+                cpu_threads=int(cpu_threads), num_workers=max(1, int(num_workers)),
+            )
+        self.model = model
+        self.beam_size = max(1, int(beam_size))
+        self._f32 = np.empty(0, dtype=np.float32)   # yeniden kullanılan dönüşüm tamponu
+        self._batched = None                        # BatchedInferencePipeline (ilk kullanımda)
+        self.language_gate: Optional[LanguageGate] = None
+
+    def _audio(self, pcm16):
+        n = len(pcm16) // 2
+        if len(self._f32) < n:
+            self._f32 = np.empty(max(n, 2 * len(self._f32)), dtype=np.float32)
+        return pcm_float32_from_int16(pcm16, out=self._f32)
+
+    def warmup(self, seconds: float = 1.0):
+        """Synthetic decode so CTranslate2's first-call cost is not paid by the first utterance."""
+        rng = np.random.default_rng(0)
+        noise = (rng.standard_normal(int(WHISPER_SR * seconds)) * 30).astype(np.int16)
+        self.transcribe_segment(noise.tobytes(), language="en")
+
+    @property
+    def multilingual(self) -> bool:
+        return bool(getattr(getattr(self.model, "model", None), "is_multilingual", True))
+
+    def detect_language(self, pcm16, prefix_sec: float = 2.0) -> Tuple[str, float]:
+        """Language ID on the first `prefix_sec` of a segment → (lang, prob); no text decoding."""
+        n = min(len(pcm16) // 2, int(WHISPER_SR * prefix_sec))
+        audio = self._audio(memoryview(pcm16).cast("B")[:n * 2])
+        detect = getattr(self.model, "detect_language", None)
+        if detect is not None:                     # faster-whisper ≥ 1.1
+            lang, prob, _ = detect(audio)
+        else:
+            # transcribe() dili hemen belirler; segment üreteci tüketilmezse metin çözülmez
+            _, info = self.model.transcribe(audio, beam_size=1, vad_filter=False, without_timestamps=True)
+            lang, prob = info.language, info.language_probability
+        return lang or "auto", float(prob or 0.0)
+
+    def transcribe_segment(self, pcm16, language=None, words: Optional[list] = None):
+        """Returns: (text, lang, lang_prob). Not thread-safe (shared float32 buffer).
+
+        With `language_gate` set and no forced language, confidently
+        non-English segments come back as ("", lang, prob) without a full decode.
+        With a `words` list, the decode runs with word timestamps and appends
+        (start_sec, end_sec, word) to it (see OverlapStitcher).
+        """
+        if language is None and self.language_gate is not None:
+            return self.language_gate.transcribe(self, pcm16, words)
+        return self.decode(pcm16, language, words)
+
+    def decode(self, pcm16, language=None, words: Optional[list] = None):
+        audio = self._audio(pcm16)
         segments, info = self.model.transcribe(
             audio,
             language=language,                 # None veya "en"
             task="transcribe",
-            beam_size=1,                       # hızlı
+            beam_size=self.beam_size,          # 1 = hızlı (greedy)
             vad_filter=False,
-            word_timestamps=False,
+            word_timestamps=words is not None,
             condition_on_previous_text=False,
         )
+        segments = list(segments)
+        if words is not None:
+            words.extend((w.start, w.end, w.word) for s in segments for w in (s.words or []))
         text = " ".join(s.text.strip() for s in segments if s.text)
         lang = getattr(info, "language", None) or "auto"
         prob = float(getattr(info, "language_probability", 0.0) or 0.0)
-        return text, lang, prob
\ No newline at end of file
+        return text, lang, prob
+
+    def _join(self, pcms: Sequence, gap_sec: float):
+        """Segmentleri `gap_sec` sessizlikle tek float32 tampona dizer → (audio, start_sec listesi)."""
+        gap = int(WHISPER_SR * gap_sec)
+        lens = [len(p) // 2 for p in pcms]
+        total = sum(lens) + gap * (len(pcms) - 1)
+        if len(self._f32) < total:
+            self._f32 = np.empty(max(total, 2 * len(self._f32)), dtype=np.float32)
+        audio = self._f32[:total]
+        starts = []
+        pos = 0
+        for i, pcm in enumerate(pcms):
+            if i:
+                audio[pos:pos + gap] = 0.0
+                pos += gap
+            starts.append(pos / WHISPER_SR)
+            pcm_float32_from_int16(pcm, out=audio[pos:])
+            pos += lens[i]
+        return audio, starts
+
+    @staticmethod
+    def _split_words(segments, starts: List[float], info) -> List[Tuple[str, str, float]]:
+        parts = [[] for _ in starts]
+        for s in segments:
+            for w in (s.words or []):
+                mid = (w.start + w.end) / 2.0
+                parts[max(0, bisect.bisect_right(starts, mid) - 1)].append(w.word)
+        lang = getattr(info, "language", None) or "auto"
+        prob = float(getattr(info, "language_probability", 0.0) or 0.0)
+        return [("".join(ws).strip(), lang, prob) for ws in parts]
+
+    def transcribe_joined(self, pcms: Sequence, language=None, gap_sec: float = 0.3) -> List[Tuple[str, str, float]]:
+        """Decodes several segments as one call (silence between them) and splits
+        the words back per segment by timestamp. Returns [(text, lang, lang_prob), ...]."""
+        audio, starts = self._join(pcms, gap_sec)
+        segments, info = self.model.transcribe(
+            audio,
+            language=language,
+            task="transcribe",
+            beam_size=self.beam_size,
+            vad_filter=False,
+            word_timestamps=True,
+            condition_on_previous_text=False,
+        )
+        return self._split_words(segments, starts, info)
+
+    def _batched_pipeline(self):
+        if self._batched is None:
+            try:
+                from faster_whisper import BatchedInferencePipeline
+            except ImportError:             # faster-whisper < 1.1
+                self._batched = False
+            else:
+                self._batched = BatchedInferencePipeline(model=self.model)
+        return self._batched or None
+
+    def transcribe_batch(self, pcms: Sequence, language=None, batch_size: int = 8) -> List[Tuple[str, str, float]]:
+        """Decodes a backlog of segments together with faster-whisper's batched
+        pipeline (one clip per segment). Returns [(text, lang, lang_prob), ...].
+
+        Without BatchedInferencePipeline, falls back to joined decodes of up to ~28 s.
+        """
+        if not pcms:
+            return []
+        batched = self._batched_pipeline()
+        if batched is None:
+            out, group, dur = [], [], 0.0
+            for pcm in pcms:
+                d = len(pcm) / 2.0 / WHISPER_SR
+                if group and dur + d > 28.0:
+                    out.extend(self.transcribe_joined(group, language=language))
+                    group, dur = [], 0.0
+                group.append(pcm)
+                dur += d + 0.3
+            return out + self.transcribe_joined(group, language=language)
+
+        gap_sec = 0.5
+        audio, starts = self._join(pcms, gap_sec)
+        # batched pipeline klipleri audio[start:end] ile keser → tamsayı örnek ofsetleri
+        clips = []
+        for st, pcm in zip(starts, pcms):
+            s0 = int(round(st * WHISPER_SR))
+            clips.append({"start": s0, "end": s0 + len(pcm) // 2})
+        segments, info = batched.transcribe(
+            audio,
+            language=language,
+            task="transcribe",
+            beam_size=self.beam_size,
+            batch_size=max(1, int(batch_size)),
+            vad_filter=False,
+            clip_timestamps=clips,
+            word_timestamps=True,
+            condition_on_previous_text=False,
+        )
+        return self._split_words(segments, starts, info)
@@ -1,11 +1,129 @@
 # --- src/waa/audio.py ---
 import time
-import sounddevice as sd
+import wave
+import numpy as np
 import webrtcvad
-from typing import Optional
+from pathlib import Path
+from typing import Optional, Union
+
+from .endpoint import AdaptiveEndpointer
+from .resample import PolyphaseResampler
+
+
+class FileSource:
+    """WAV / raw PCM replay → mono int16 frames (headless runs, benchmarks).
+
+    speed=0 → as fast as possible, 1.0 → real time, 2.0 → twice real time.
+    Raw files (.pcm/.raw) are read as mono int16 at `samplerate`.
+    """
+    def __init__(
+        self,
+        path: Union[str, Path],
+        samplerate: int = 16000,
+        frame_samples: int = 320,
+        speed: float = 0.0,
+    ):
+        self.path = Path(path)
+        self.sr = samplerate
+        self.frame_samples = frame_samples
+        self.speed = float(speed or 0.0)
+        if not self.path.exists():
+            raise FileNotFoundError(self.path)
+
+    def duration_sec(self) -> float:
+        if self.path.suffix.lower() == ".wav":
+            with wave.open(str(self.path), "rb") as w:
+                return w.getnframes() / float(w.getframerate())
+        return self.path.stat().st_size / 2.0 / self.sr
+
+    def _chunks(self):
+        frame_bytes = self.frame_samples * 2
+        if self.path.suffix.lower() == ".wav":
+            with wave.open(str(self.path), "rb") as w:
+                if w.getsampwidth() != 2 or w.getnchannels() != 1 or w.getframerate() != self.sr:
+                    raise RuntimeError(
+                        f"{self.path}: need mono 16-bit PCM at {self.sr} Hz, got "
+                        f"{w.getnchannels()} ch / {8 * w.getsampwidth()} bit / {w.getframerate()} Hz"
+                    )
+                while True:
+                    data = w.readframes(self.frame_samples)
+                    if not data:
+                        return
+                    yield data
+        else:
+            with open(self.path, "rb") as f:
+                while True:
+                    data = f.read(frame_bytes)
+                    if not data:
+                        return
+                    yield data
+
+    def frames(self):
+        frame_bytes = self.frame_samples * 2
+        frame_sec = self.frame_samples / float(self.sr)
+        t0 = time.monotonic()
+        for i, data in enumerate(self._chunks()):
+            if len(data) < frame_bytes:
+                data = data + b"\x00" * (frame_bytes - len(data))   # VAD tam frame ister
+            if self.speed > 0:
+                delay = t0 + i * frame_sec / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            yield data
+
+
+class PcmRing:
+    """Preallocated int16 ring buffer with zero-copy window views.
+
+    Every sample is written twice (at i and i + capacity), so any window of
+    up to `capacity` samples is a single contiguous slice — no copy on wrap.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self._a = np.zeros(2 * self.capacity, dtype=np.int16)
+        self.written = 0          # toplam yazılan örnek (mutlak konum)
+
+    def write(self, frame) -> int:
+        x = np.frombuffer(frame, dtype=np.int16)
+        n = len(x)
+        if n > self.capacity:
+            x = x[-self.capacity:]
+            self.written += n - self.capacity
+            n = self.capacity
+        cap = self.capacity
+        w = self.written % cap
+        first = min(n, cap - w)
+        self._a[w:w + first] = x[:first]
+        self._a[w + cap:w + cap + first] = x[:first]
+        if n > first:
+            rest = n - first
+            self._a[:rest] = x[first:]
+            self._a[cap:cap + rest] = x[first:]
+        self.written += n
+        return n
+
+    def oldest(self) -> int:
+        return max(0, self.written - self.capacity)
+
+    def view(self, start: int, end: int) -> memoryview:
+        """Bytes view of absolute samples [start, end); valid until overwritten."""
+        start = max(start, self.oldest())
+        if end < start:
+            end = start
+        s = start % self.capacity
+        return memoryview(self._a[s:s + (end - start)]).cast("B")
+
 
 class MicSegmenter:
-    """Mic → 20ms frames → VAD → voiced segment üretir."""
+    """Mic → 20ms frames → VAD → voiced segment üretir.
+
+    All timing (segment length, trailing silence, partial interval) is
+    counted in captured samples, so a stalled consumer cannot stretch or
+    shrink segments. Frames go into a preallocated PcmRing; segments are
+    yielded as memoryviews into it (no per-segment copy). A view stays valid
+    while less than `ring_sec` minus its own length of further audio has been
+    captured; call bytes() on it to keep it longer.
+    """
     def __init__(
         self,
         samplerate: int = 16000,
@@ -14,57 +132,210 @@ class MicSegmenter:
         max_segment_sec: float = 12.0,
         silence_follow_sec: float = 0.30,
         device: Optional[int] = None,
+        source=None,
+        preroll_ms: int = 0,
+        ring_sec: Optional[float] = None,
+        endpointer: Optional[AdaptiveEndpointer] = None,
+        metrics=None,
+        capture_rate: Union[int, str, None] = None,
+        capture_channels: int = 0,
+        overlap_sec: float = 0.0,
     ):
+        """`source`: any object with frames() yielding int16 frames (e.g. FileSource); None → mic.
+
+        `preroll_ms` of audio from before speech onset is kept at the head of
+        each segment. `endpointer` defaults to a non-adaptive one using
+        `silence_follow_sec`. `metrics` (waa.metrics.Metrics) records frame
+        processing time, endpoint delay, segment and dropped-frame counts.
+
+        The mic is opened at `capture_rate` (None → `samplerate`, "native" →
+        the device's default rate) with `capture_channels` (0 → mono, or the
+        device's, at most 2, with "native") and downmixed / resampled to
+        `samplerate` by a PolyphaseResampler.
+
+        `overlap_sec`: after a "maxlen" cut the segment stays open and the
+        next one starts this much before the cut, so a word straddling the
+        cut is heard whole (OverlapStitcher removes the repeat).
+        """
         self.sr = samplerate
         self.frame_samples = int(self.sr * frame_ms / 1000)
         self.vad = webrtcvad.Vad(vad_aggressiveness)
         self.max_segment_sec = max_segment_sec
         self.silence_follow_sec = silence_follow_sec
+        self.max_samples = int(self.sr * max_segment_sec)
+        self.endpointer = endpointer or AdaptiveEndpointer(
+            samplerate, silence_follow_sec, silence_follow_sec, silence_follow_sec, on_db=None,
+        )
         self.device = device
-        self._buf = bytearray()
-        self._seg_start = None
-        self._last_voiced = None
+        self.source = source
+        self.native = capture_rate == "native"
+        self.capture_rate = None if capture_rate in (None, "native") else int(capture_rate)
+        self.capture_channels = int(capture_channels or 0)
+        self.preroll_samples = int(self.sr * max(0, preroll_ms) / 1000)
+        self.overlap_samples = int(self.sr * min(max(0.0, overlap_sec), max_segment_sec / 2.0))
+        if ring_sec is None:
+            ring_sec = 3 * max_segment_sec + 1.0
+        cap = int(self.sr * ring_sec) + self.preroll_samples
+        cap += (-cap) % self.frame_samples          # frame'ler sınırda bölünmesin
+        self.ring = PcmRing(cap)
+        self.metrics = metrics
+        self.segment_index = 0                      # kapanan segment sayısı (pipeline seg_id ile aynı)
+        self._prev_end = 0                          # önceki segmentin bittiği örnek
+        self._reset()
+
+    def hint(self, seg_index: int, text: str):
+        """Partial transcript of the open segment → adaptive hangover (thread-safe enough: one assignment)."""
+        if seg_index == self.segment_index:
+            self.endpointer.hint(text)
 
     def frames(self):
+        if self.source is not None:
+            yield from self.source.frames()
+            return
+        import sounddevice as sd   # dosya kaynağı/headless için PortAudio gerekmesin
+
         dev_in = self.device if self.device is not None else sd.default.device[0]
         info = sd.query_devices(dev_in)
         if info.get("max_input_channels", 0) < 1:
             raise RuntimeError(f"Selected device {dev_in} has no input channels: {info}")
 
+        # native: cihazın kendi hızı/kanal sayısı, host API dönüşümü (yavaş, bazen hiç yok) devreye girmesin
+        if self.native:
+            rate = int(info.get("default_samplerate") or self.sr)
+        else:
+            rate = self.capture_rate or self.sr
+        channels = min(self.capture_channels or (2 if self.native else 1), int(info["max_input_channels"]))
+        if rate == self.sr and channels == 1:
+            resampler = None
+            block = self.frame_samples
+        else:
+            resampler = PolyphaseResampler(rate, self.sr, channels)
+            block = int(round(self.frame_samples * rate / float(self.sr)))
+            print("🎚 Capture {0} Hz x {1} → {2} Hz mono ({3} taps/phase)".format(rate, channels, self.sr, resampler.taps))
+
+        metrics = self.metrics
+        fs = self.frame_samples
+        pending = np.zeros(0, dtype=np.int16)
         with sd.RawInputStream(
-            samplerate=self.sr,
-            blocksize=self.frame_samples,
+            samplerate=rate,
+            blocksize=block,
             device=dev_in,
-            channels=1,
+            channels=channels,
             dtype="int16",
         ) as stream:
             while True:
-                yield stream.read(self.frame_samples)[0]
+                data, overflowed = stream.read(block)
+                if overflowed and metrics is not None:
+                    metrics.inc("dropped_frames")
+                if resampler is None:
+                    yield data
+                    continue
+                t0 = time.perf_counter()
+                out = resampler.process(bytes(data))
+                if metrics is not None:
+                    metrics.observe("resample", time.perf_counter() - t0)
+                # oran tam bölünmüyorsa blok başına çıkış ±1 örnek oynar → sabit frame'lere yeniden böl
+                pending = np.concatenate((pending, out)) if len(pending) else out
+                while len(pending) >= fs:
+                    yield pending[:fs].tobytes()
+                    pending = pending[fs:]
 
-    def segments(self):
+    def segments(self, partial_every_sec: Optional[float] = None):
+        """Yields (pcm16, reason); reason ∈ silence | maxlen | partial | eof.
+
+        pcm16 is a memoryview into the ring (see class docstring). With
+        `partial_every_sec` set, a snapshot of the still-open segment is
+        yielded as "partial" every that many seconds of audio (streaming ASR).
+        """
+        partial_samples = int(self.sr * partial_every_sec) if partial_every_sec else 0
         for frame in self.frames():
-            now = time.time()
-            voiced = self.vad.is_speech(frame, self.sr)
-            if voiced:
-                if self._seg_start is None:
-                    self._seg_start = now
-                    self._buf = bytearray()
-                self._buf.extend(frame)
-                self._last_voiced = now
-                if (now - self._seg_start) > self.max_segment_sec:
-                    seg = bytes(self._buf)
-                    self._reset()
-                    if seg:
-                        yield seg, "maxlen"
-            else:
-                if self._seg_start is not None and self._last_voiced is not None:
-                    if (now - self._last_voiced) >= self.silence_follow_sec:
-                        seg = bytes(self._buf)
-                        self._reset()
-                        if seg:
-                            yield seg, "silence"
+            out = self.push(frame, partial_samples)
+            if out is not None:
+                yield out
+        # kaynak bitti (dosya) → açık segmenti boşalt
+        out = self.flush()
+        if out is not None:
+            yield out
+
+    def push(self, frame, partial_samples: int = 0):
+        """Push-mode entry (network sessions): one full frame → (pcm16, reason) or None."""
+        metrics = self.metrics
+        if metrics is None:
+            return self._step(frame, partial_samples)
+        t0 = time.perf_counter()
+        out = self._step(frame, partial_samples)
+        # yalnızca VAD/ring işleme süresi (tüketicinin beklemesi hariç)
+        metrics.observe("capture_frame", time.perf_counter() - t0)
+        return out
+
+    def flush(self):
+        """End of input: closes the open segment → (pcm16, "eof") or None."""
+        if self._open:
+            return self._close("eof"), "eof"
+        return None
+
+    @property
+    def last_end_sec(self) -> float:
+        """Stream time (s) where the last closed segment's speech ended."""
+        return self._prev_end / float(self.sr)
+
+    def _step(self, frame, partial_samples: int):
+        """One frame through VAD/endpointing → (pcm16, reason) or None."""
+        ring = self.ring
+        ep = self.endpointer
+        frame_start = ring.written
+        ring.write(frame)
+        pos = ring.written
+        x = np.frombuffer(frame, dtype=np.int16)
+        speech = ep.is_speech(x, self.vad.is_speech(frame, self.sr))
+        if speech:
+            if not self._open:
+                if self._onset_run == 0:
+                    self._onset_start = frame_start
+                self._onset_run += 1
+                if self._onset_run < ep.onset_frames:
+                    return None
+                self._open = True
+                ep.in_speech = True
+                self._start_sample = max(self._onset_start - self.preroll_samples, self._prev_end, ring.oldest())
+                self._last_partial = pos
+            self._end_sample = pos
+            if (pos - self._start_sample) > self.max_samples:
+                return self._close("maxlen"), "maxlen"
+        else:
+            self._onset_run = 0
+            if self._open and (pos - self._end_sample) >= ep.hangover_samples():
+                return self._close("silence"), "silence"
+        if partial_samples and self._open and (pos - self._last_partial) >= partial_samples:
+            self._last_partial = pos
+            return ring.view(self._start_sample, self._end_sample), "partial"
+        return None
+
+    def _close(self, reason: str) -> memoryview:
+        # sondaki sessizlik (hangover) segmente dahil edilmez
+        seg = self.ring.view(self._start_sample, self._end_sample)
+        if self.metrics is not None:
+            self.metrics.inc("segments", reason=reason)
+            if reason == "silence":
+                # konuşmanın bitişinden segmentin kapanmasına kadar geçen ses süresi
+                self.metrics.observe("vad_endpoint", (self.ring.written - self._end_sample) / self.sr)
+        end = self._prev_end = self._end_sample
+        self.segment_index += 1
+        self.endpointer.reset()
+        self._reset()
+        if reason == "maxlen" and self.overlap_samples:
+            # konuşma sürüyor: sonraki segment kesimden overlap kadar önce başlar, onset beklenmez
+            self._open = True
+            self.endpointer.in_speech = True
+            self._start_sample = max(end - self.overlap_samples, self.ring.oldest())
+            self._end_sample = end
+            self._last_partial = self.ring.written
+        return seg
 
     def _reset(self):
-        self._buf = bytearray()
-        self._seg_start = None
-        self._last_voiced = None
\ No newline at end of file
+        self._open = False
+        self._onset_run = 0
+        self._onset_start = 0
+        self._start_sample = 0
+        self._end_sample = 0
+        self._last_partial = 0
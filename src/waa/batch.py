@@ -0,0 +1,332 @@
+# --- src/waa/batch.py ---
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from .asr import WHISPER_SR
+
+
+@dataclass
+class PcmSpec:
+    path: str
+    offset: int          # ses verisinin dosyadaki bayt konumu
+    frames: int          # örnek sayısı (kanal başına)
+    channels: int
+    samplerate: int
+
+    @property
+    def duration_sec(self) -> float:
+        return self.frames / float(self.samplerate)
+
+
+def probe(path, samplerate: int = WHISPER_SR, channels: int = 1) -> PcmSpec:
+    """WAV header (16-bit PCM) or raw int16 → PcmSpec; only the RIFF chunk headers are read."""
+    path = str(path)
+    size = os.path.getsize(path)
+    if not path.lower().endswith(".wav"):
+        return PcmSpec(path, 0, size // (2 * channels), channels, samplerate)
+    with open(path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff not in (b"RIFF", b"RF64") or wave_id != b"WAVE":
+            raise RuntimeError("{0}: not a RIFF/WAVE file".format(path))
+        fmt = None
+        while True:
+            head = f.read(8)
+            if len(head) < 8:
+                raise RuntimeError("{0}: no data chunk".format(path))
+            cid, n = struct.unpack("<4sI", head)
+            if cid == b"fmt ":
+                body = f.read(n + (n & 1))
+                tag, ch, sr, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                fmt = (tag, ch, sr, bits)
+            elif cid == b"data":
+                if fmt is None:
+                    raise RuntimeError("{0}: data before fmt chunk".format(path))
+                tag, ch, sr, bits = fmt
+                if tag not in (1, 0xFFFE) or bits != 16:
+                    raise RuntimeError("{0}: need 16-bit PCM, got format {1} / {2} bit".format(path, tag, bits))
+                offset = f.tell()
+                # 4 GB'ı aşan (ya da akıtılarak yazılmış) dosyalarda boyut alanı güvenilmez
+                if n in (0, 0xFFFFFFFF) or offset + n > size:
+                    n = size - offset
+                return PcmSpec(path, offset, n // (2 * ch), ch, sr)
+            else:
+                f.seek(n + (n & 1), 1)
+
+
+def open_pcm(spec: PcmSpec) -> np.ndarray:
+    """Read-only memmap of shape (frames, channels); pages are loaded only when sliced."""
+    if spec.frames == 0:
+        return np.zeros((0, spec.channels), dtype="<i2")
+    return np.memmap(spec.path, dtype="<i2", mode="r", offset=spec.offset, shape=(spec.frames, spec.channels))
+
+
+def mono(block: np.ndarray) -> np.ndarray:
+    """(n, channels) int16 → contiguous mono int16 (channel mean)."""
+    if block.shape[1] == 1:
+        return np.ascontiguousarray(block[:, 0])
+    return block.mean(axis=1).astype(np.int16)
+
+
+def frame_energy_db(frames: np.ndarray) -> np.ndarray:
+    """(n_frames, frame_samples) int16 → RMS dBFS per frame, one vectorized pass."""
+    x = frames.astype(np.float32)
+    ms = np.einsum("ij,ij->i", x, x) / frames.shape[1]
+    return 10.0 * np.log10(ms / (32768.0 * 32768.0) + 1e-10)
+
+
+def speech_frames(frames: np.ndarray, vad, sr: int, on_db: Optional[float]) -> np.ndarray:
+    """Per-frame speech decision for a chunk: a vectorized energy gate against the
+    chunk's noise floor (10th percentile), webrtcvad only on frames that pass it."""
+    if on_db is None:
+        cand = np.arange(len(frames))
+    else:
+        db = frame_energy_db(frames)
+        cand = np.flatnonzero(db > np.percentile(db, 10) + on_db)
+    out = np.zeros(len(frames), dtype=bool)
+    for i in cand:
+        out[i] = vad.is_speech(frames[i].tobytes(), sr)
+    return out
+
+
+def vad_segments(
+    pcm: np.ndarray,
+    samplerate: int = WHISPER_SR,
+    frame_ms: int = 20,
+    vad_aggressiveness: int = 2,
+    silence_sec: float = 0.3,
+    max_segment_sec: float = 12.0,
+    onset_frames: int = 1,
+    preroll_ms: int = 0,
+    on_db: Optional[float] = 6.0,
+    chunk_sec: float = 60.0,
+) -> Iterator[Tuple[int, int, str]]:
+    """Yields (start_sample, end_sample, reason) over a (frames, channels) array.
+
+    Works chunk by chunk (only `chunk_sec` of audio is resident at a time);
+    the segmentation itself runs on speech runs (np.diff), not per frame.
+    Same rules as MicSegmenter: onset frames, trailing-silence hangover,
+    max length split, preroll not overlapping the previous segment.
+    """
+    import webrtcvad
+
+    vad = webrtcvad.Vad(vad_aggressiveness)
+    fs = int(samplerate * frame_ms / 1000)
+    hang = max(1, int(round(silence_sec * 1000 / frame_ms)))
+    max_frames = max(1, int(max_segment_sec * 1000 / frame_ms))
+    preroll = int(samplerate * preroll_ms / 1000)
+    chunk_frames = max(1, int(chunk_sec * 1000 / frame_ms))
+    total_frames = len(pcm) // fs
+    is_open = False
+    start = last_end = 0
+    prev_end = 0                 # önceki segmentin bittiği örnek
+
+    def emit(a: int, b: int, reason: str):
+        nonlocal prev_end
+        s = max(a * fs - preroll, prev_end)
+        prev_end = b * fs
+        return s, b * fs, reason
+
+    for f0 in range(0, total_frames, chunk_frames):
+        n = min(chunk_frames, total_frames - f0)
+        block = mono(pcm[f0 * fs:(f0 + n) * fs]).reshape(n, fs)
+        speech = speech_frames(block, vad, samplerate, on_db)
+        edges = np.diff(np.concatenate(([0], speech.view(np.int8), [0])))
+        for rs, re_ in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+            rs, re_ = int(rs) + f0, int(re_) + f0
+            if is_open and rs - last_end >= hang:
+                yield emit(start, last_end, "silence")
+                is_open = False
+            if not is_open:
+                if re_ - rs < onset_frames:
+                    continue
+                is_open = True
+                start = rs
+            last_end = re_
+            while last_end - start > max_frames:
+                yield emit(start, start + max_frames, "maxlen")
+                start += max_frames
+    if is_open:
+        yield emit(start, last_end, "silence" if total_frames - last_end >= hang else "eof")
+
+
+# ---- worker processes ----
+_W = {}
+
+
+def _init_worker(spec: PcmSpec, model_name: str, cpu_threads: int, language: Optional[str]):
+    from .asr import WhisperASR
+
+    _W["pcm"] = open_pcm(spec)
+    _W["asr"] = WhisperASR(model_name, cpu_threads=cpu_threads)
+    _W["language"] = language
+
+
+def _decode(seg_id: int, start: int, end: int):
+    # yalnızca segmentin sayfaları okunur; PCM süreçler arasında taşınmaz
+    pcm16 = mono(_W["pcm"][start:end]).tobytes()
+    t0 = time.perf_counter()
+    text, lang, prob = _W["asr"].transcribe_segment(pcm16, language=_W["language"])
+    return seg_id, text, lang, prob, time.perf_counter() - t0
+
+
+def _question_filter(cfg: dict):
+    from .detect import QuestionClassifier, is_english_question
+
+    a = cfg.get("assistant", {}) or {}
+    clf = None
+    if (a.get("question_detector") or "heuristic") == "classifier":
+        clf = QuestionClassifier.load(a.get("question_model") or None, a.get("question_threshold"))
+    min_chars = int(a.get("min_chars", 8) or 0)
+    min_prob = float(a.get("min_lang_prob", 0.0) or 0.0)
+
+    def is_question(text: str, lang: str, prob: float) -> bool:
+        ok = clf.is_question(text, lang) if clf is not None else is_english_question(text, lang)
+        return ok and len(text) >= min_chars and not (prob and prob < min_prob)
+
+    return is_question
+
+
+def transcribe_file(
+    path: str,
+    out,
+    model_name: str = "base",
+    workers: int = 0,
+    cpu_threads: int = 0,
+    language: Optional[str] = "en",
+    audio: Optional[dict] = None,
+    is_question=None,
+    raw_samplerate: int = WHISPER_SR,
+    raw_channels: int = 1,
+    questions_only: bool = False,
+    progress_sec: float = 10.0,
+) -> dict:
+    """VAD over a memmapped file → process pool of WhisperASR → ordered JSONL on `out`.
+
+    At most 4 segments per worker are in flight and finished ones are written
+    in seg_id order, so memory does not grow with the file length.
+    """
+    audio = audio or {}
+    spec = probe(path, raw_samplerate, raw_channels)
+    if spec.samplerate != WHISPER_SR:
+        raise RuntimeError("{0}: need {1} Hz audio, got {2} Hz".format(path, WHISPER_SR, spec.samplerate))
+    cores = os.cpu_count() or 1
+    workers = workers or max(1, cores // 2)
+    cpu_threads = cpu_threads or max(1, cores // workers)
+    pcm = open_pcm(spec)
+    segs = vad_segments(
+        pcm, spec.samplerate, int(audio.get("frame_ms", 20)), int(audio.get("vad_aggressiveness", 2)),
+        float(audio.get("silence_follow_sec", 0.3)), float(audio.get("max_segment_sec", 12.0)),
+        int(audio.get("onset_frames", 1)), int(audio.get("preroll_ms", 0) or 0), audio.get("energy_on_db", 6.0),
+    )
+    bounds = {}
+    done = {}
+    next_id = 0
+    st = {"file": str(path), "duration_sec": round(spec.duration_sec, 2), "channels": spec.channels,
+          "workers": workers, "cpu_threads": cpu_threads, "segments": 0, "speech_sec": 0.0,
+          "questions": 0, "decode_sec": 0.0}
+    t0 = time.perf_counter()
+    last_progress = t0
+
+    def flush():
+        nonlocal next_id
+        while next_id in done:
+            seg_id, text, lang, prob, dt = done.pop(next_id)
+            a, b, reason = bounds.pop(seg_id)
+            next_id += 1
+            st["decode_sec"] += dt
+            if not text.strip():
+                continue
+            q = bool(is_question and is_question(text, lang, prob))
+            st["questions"] += q
+            if questions_only and not q:
+                continue
+            out.write(json.dumps({
+                "kind": "transcript", "seg_id": seg_id, "start": round(a / spec.samplerate, 2),
+                "end": round(b / spec.samplerate, 2), "reason": reason, "text": text, "lang": lang,
+                "prob": round(prob, 3), "question": q,
+            }, ensure_ascii=False) + "\n")
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(spec, model_name, cpu_threads, language)) as pool:
+        pending = set()
+        for seg_id, (a, b, reason) in enumerate(segs):
+            bounds[seg_id] = (a, b, reason)
+            st["segments"] += 1
+            st["speech_sec"] += (b - a) / spec.samplerate
+            pending.add(pool.submit(_decode, seg_id, a, b))
+            while len(pending) >= 4 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    r = fut.result()
+                    done[r[0]] = r
+                flush()
+            now = time.perf_counter()
+            if progress_sec and now - last_progress >= progress_sec:
+                last_progress = now
+                pos = b / spec.samplerate
+                print("  … {0:.1f}/{1:.1f} min, {2:.1f}x real time".format(
+                    pos / 60.0, spec.duration_sec / 60.0, pos / (now - t0)), file=sys.stderr, flush=True)
+        for fut in pending:
+            r = fut.result()
+            done[r[0]] = r
+        flush()
+    wall = time.perf_counter() - t0
+    st.update({
+        "wall_sec": round(wall, 2),
+        "speech_sec": round(st["speech_sec"], 2),
+        "decode_sec": round(st["decode_sec"], 2),
+        "realtime_x": round(spec.duration_sec / wall, 1) if wall else None,
+    })
+    out.write(json.dumps(dict(kind="summary", **st)) + "\n")
+    return st
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="waa batch", description="Offline VAD → Whisper → question detection over recordings")
+    p.add_argument("inputs", nargs="+", help="WAV (16-bit PCM, 16 kHz, any channel count) or raw int16 PCM files")
+    p.add_argument("--out", type=str, default=None, help="JSONL path (default: <input>.jsonl; '-' = stdout)")
+    p.add_argument("--whisper-model", type=str, default="base")
+    p.add_argument("--config", type=str, default="configs/settings.yaml")
+    p.add_argument("--workers", type=int, default=0, help="ASR processes (0 = cores / 2)")
+    p.add_argument("--cpu-threads", type=int, default=0, help="CTranslate2 threads per process (0 = cores / workers)")
+    p.add_argument("--language", type=str, default=None, help="ASR language (default: en if force_language_en)")
+    p.add_argument("--raw-channels", type=int, default=1, help="Channel count of raw .pcm/.raw inputs")
+    p.add_argument("--questions-only", action="store_true", help="Write only segments detected as questions")
+    args = p.parse_args(argv)
+    if args.out not in (None, "-") and len(args.inputs) > 1:
+        p.error("--out takes a single input (default writes <input>.jsonl next to each file)")
+
+    cfg = {}
+    if args.config and Path(args.config).exists():
+        import yaml
+        cfg = yaml.safe_load(Path(args.config).read_text(encoding="utf-8")) or {}
+    audio = cfg.get("audio", {}) or {}
+    language = args.language
+    if language is None:
+        language = "en" if (cfg.get("assistant", {}) or {}).get("force_language_en", True) else None
+    is_question = _question_filter(cfg)
+
+    for path in args.inputs:
+        dest = args.out or str(Path(path).with_suffix(".jsonl"))
+        print("📼", path, "→", dest if dest != "-" else "stdout", file=sys.stderr)
+        if dest == "-":
+            st = transcribe_file(path, sys.stdout, args.whisper_model, args.workers, args.cpu_threads, language,
+                                 audio, is_question, raw_channels=args.raw_channels, questions_only=args.questions_only)
+        else:
+            with open(dest, "w", encoding="utf-8") as out:
+                st = transcribe_file(path, out, args.whisper_model, args.workers, args.cpu_threads, language,
+                                     audio, is_question, raw_channels=args.raw_channels,
+                                     questions_only=args.questions_only)
+        print("✅ {duration_sec}s audio ({speech_sec}s speech, {segments} segments, {questions} questions) in "
+              "{wall_sec}s → {realtime_x}x real time with {workers} workers x {cpu_threads} threads".format(**st),
+              file=sys.stderr)
@@ -0,0 +1,226 @@
+# --- src/waa/bench.py ---
+import argparse
+import json
+import platform
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import yaml
+
+from .audio import FileSource, MicSegmenter
+from .endpoint import AdaptiveEndpointer
+from .asr import WhisperASR
+from .detect import KeywordMatcher, is_english_question, load_keywords
+from .metrics import percentiles
+
+DEFAULT_ANSWER = (
+    "We shard the consumers by tenant, keep the hot path stateless, "
+    "and scale out horizontally behind the queue."
+)
+
+
+class StandInAssistant:
+    """Offline stand-in for ChatAssistant with a fixed first-token and inter-token delay."""
+    def __init__(self, ttft_ms: float = 300.0, token_ms: float = 15.0, answer: str = DEFAULT_ANSWER):
+        self.ttft = ttft_ms / 1000.0
+        self.token_delay = token_ms / 1000.0
+        self.answer = answer
+        self.model = "stand-in"
+
+    def stream_answer(self, question: str):
+        time.sleep(self.ttft)
+        for i, word in enumerate(self.answer.split()):
+            if i:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
+
+
+def _ms(stats: dict) -> dict:
+    return {k: (v if k == "count" else round(v * 1000.0, 2)) for k, v in stats.items()}
+
+
+def _audio_settings(config_path: Optional[str]) -> dict:
+    audio = {"sample_rate": 16000, "frame_ms": 20, "vad_aggressiveness": 2,
+             "max_segment_sec": 12.0, "silence_follow_sec": 0.30, "preroll_ms": 0}
+    if config_path and Path(config_path).exists():
+        cfg = yaml.safe_load(Path(config_path).read_text(encoding="utf-8")) or {}
+        audio.update(cfg.get("audio", {}) or {})
+    return audio
+
+
+def bench_model(
+    asr,
+    audio_paths: Sequence[str],
+    audio_cfg: dict,
+    assistant,
+    speed: float = 0.0,
+    language: Optional[str] = None,
+    answer_all: bool = False,
+) -> dict:
+    """segments() → transcribe_segment → stand-in answer over every file; returns latency samples."""
+    sr = int(audio_cfg["sample_rate"])
+    silence = float(audio_cfg["silence_follow_sec"])
+    end_to_text: List[float] = []
+    text_to_token: List[float] = []
+    rtf: List[float] = []
+    audio_sec = 0.0
+    decode_sec = 0.0
+    segments = 0
+    for path in audio_paths:
+        seg = MicSegmenter(
+            samplerate=sr,
+            frame_ms=audio_cfg["frame_ms"],
+            vad_aggressiveness=audio_cfg["vad_aggressiveness"],
+            max_segment_sec=audio_cfg["max_segment_sec"],
+            silence_follow_sec=silence,
+            preroll_ms=audio_cfg.get("preroll_ms", 0),
+            endpointer=AdaptiveEndpointer(
+                sr, silence, audio_cfg.get("min_silence_sec"), audio_cfg.get("max_silence_sec"),
+                int(audio_cfg.get("onset_frames", 1)),
+                on_db=audio_cfg.get("energy_on_db"), off_db=audio_cfg.get("energy_off_db"),
+            ),
+            source=FileSource(path, sr, int(sr * audio_cfg["frame_ms"] / 1000), speed=speed),
+        )
+        for pcm16, reason in seg.segments():
+            t_seg = time.perf_counter()
+            # gerçek zamanlı modda konuşma, segment kapanmadan `silence` sn önce bitti
+            speech_end = t_seg - (silence if (reason == "silence" and speed > 0) else 0.0)
+            dur = len(pcm16) / 2.0 / sr
+            text, lang, _ = asr.transcribe_segment(pcm16, language=language)
+            t_text = time.perf_counter()
+            segments += 1
+            audio_sec += dur
+            decode_sec += t_text - t_seg
+            end_to_text.append(t_text - speech_end)
+            if dur > 0:
+                rtf.append((t_text - t_seg) / dur)
+            if not text.strip() or not (answer_all or is_english_question(text, lang)):
+                continue
+            for _ in assistant.stream_answer(text):
+                text_to_token.append(time.perf_counter() - t_text)
+                break
+    return {
+        "segments": segments,
+        "audio_sec": round(audio_sec, 3),
+        "decode_sec": round(decode_sec, 3),
+        "rtf_total": round(decode_sec / audio_sec, 4) if audio_sec else None,
+        "speech_end_to_transcript_ms": _ms(percentiles(end_to_text)),
+        "transcript_to_first_token_ms": _ms(percentiles(text_to_token)),
+        "rtf": percentiles(rtf),
+    }
+
+
+def _version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("whisper-answer-assistant")
+    except Exception:
+        return "dev"
+
+
+def _fmt(stats: dict, digits: int = 1) -> str:
+    if not stats.get("count"):
+        return "n=0"
+    f = "{0:.%df}" % digits
+    return "n={0} p50={1} p90={2} p99={3} max={4}".format(
+        stats["count"], *(f.format(stats[k]) for k in ("p50", "p90", "p99", "max"))
+    )
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="waa bench", description="End-to-end latency benchmark on recorded audio")
+    p.add_argument("audio", nargs="+", help="WAV (mono 16-bit) or raw int16 PCM files")
+    p.add_argument("--models", type=str, default="base", help="Comma separated Whisper models")
+    p.add_argument("--config", type=str, default="configs/settings.yaml", help="Settings YAML (audio section)")
+    p.add_argument("--speed", type=float, default=0.0, help="0 = as fast as possible, 1 = real time")
+    p.add_argument("--language", type=str, default=None, help="Force ASR language (e.g. en)")
+    p.add_argument("--ttft-ms", type=float, default=300.0, help="Stand-in answer time-to-first-token")
+    p.add_argument("--token-ms", type=float, default=15.0, help="Stand-in answer inter-token delay")
+    p.add_argument("--base-url", type=str, default=None,
+                   help="Answer through ChatAssistant at this OpenAI-compatible URL (e.g. waa mock-server)")
+    p.add_argument("--answer-all", action="store_true", help="Answer every transcript, not only questions")
+    p.add_argument("--json", type=str, default=None, help="Write results as JSON to this path")
+    args = p.parse_args(argv)
+
+    audio_cfg = _audio_settings(args.config)
+    if args.base_url:
+        from .llm import ChatAssistant
+        assistant = ChatAssistant("mock", base_url=args.base_url)
+    else:
+        assistant = StandInAssistant(args.ttft_ms, args.token_ms)
+    report = {
+        "version": _version(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "speed": args.speed,
+        "answer_backend": args.base_url or "stand-in",
+        "audio": [str(a) for a in args.audio],
+        "models": {},
+    }
+    for name in [m.strip() for m in args.models.split(",") if m.strip()]:
+        t0 = time.perf_counter()
+        asr = WhisperASR(name)
+        load_sec = time.perf_counter() - t0
+        res = bench_model(asr, args.audio, audio_cfg, assistant, args.speed, args.language, args.answer_all)
+        res["load_sec"] = round(load_sec, 3)
+        report["models"][name] = res
+        print("[{0}] load {1:.2f}s, {2} segments, RTF {3}".format(name, load_sec, res["segments"], res["rtf_total"]))
+        print("  speech-end → transcript (ms):", _fmt(res["speech_end_to_transcript_ms"]))
+        print("  transcript → first token (ms):", _fmt(res["transcript_to_first_token_ms"]))
+        print("  real-time factor:", _fmt(res["rtf"], 3))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print("JSON →", args.json)
+    return report
+
+
+KEYWORD_SENTENCES = (
+    "How would you design a rate limiter for a public API behind a load balancer?",
+    "What is the difference between optimistic and pessimistic locking in Postgres?",
+    "Can you walk me through how you would debug rapid memory growth in production?",
+    "Why did you pick NoSQL over a relational store for the event sourcing pipeline?",
+    "So tell me a little bit about yourself and your last project.",
+)
+
+
+def _naive_contains(text: str, keywords) -> bool:
+    s = text.lower()
+    return any(k in s for k in keywords)
+
+
+def keyword_bench(base: Sequence[str], sizes: Sequence[int], repeat: int = 2000) -> List[dict]:
+    """µs per sentence for the compiled matcher vs. the substring scan as the list grows."""
+    rows = []
+    for n in sizes:
+        # gerçek liste + sentetik terimler (tek kelime ve iki kelimelik ifadeler karışık)
+        words = list(base) + ["term{0:05d}".format(i) if i % 2 else "service{0:05d} mesh".format(i)
+                              for i in range(max(0, n - len(base)))]
+        t0 = time.perf_counter()
+        matcher = KeywordMatcher(words)
+        build = time.perf_counter() - t0
+        row = {"keywords": len(matcher), "build_ms": round(build * 1000.0, 2)}
+        for name, fn in (("matcher_us", matcher.search), ("substring_us", lambda t: _naive_contains(t, words))):
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                for text in KEYWORD_SENTENCES:
+                    fn(text)
+            row[name] = round((time.perf_counter() - t0) / (repeat * len(KEYWORD_SENTENCES)) * 1e6, 2)
+        rows.append(row)
+    return rows
+
+
+def keywords_main(argv=None):
+    p = argparse.ArgumentParser(prog="waa bench-keywords", description="Dev-keyword matcher microbenchmark")
+    p.add_argument("--keywords", type=str, default="configs/keywords.en.txt", help="Base keyword list")
+    p.add_argument("--sizes", type=str, default="20,200,2000,20000", help="Comma separated list sizes")
+    p.add_argument("--repeat", type=int, default=500)
+    args = p.parse_args(argv)
+
+    base = sorted(load_keywords(args.keywords))
+    rows = keyword_bench(base, [int(x) for x in args.sizes.split(",") if x.strip()], args.repeat)
+    print("{0:>9} {1:>10} {2:>12} {3:>14}".format("keywords", "build ms", "matcher µs", "substring µs"))
+    for r in rows:
+        print("{keywords:>9} {build_ms:>10} {matcher_us:>12} {substring_us:>14}".format(**r))
+    return rows
@@ -0,0 +1,206 @@
+# --- src/waa/cache.py ---
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+FILLER_WORDS = frozenset(("um", "uh", "uhm", "erm", "hmm", "mm"))
+FILLER_PHRASES = ("you know", "i mean")
+# yalnızca cümle başında anlamsız olan söylem dolgusu / kalıplar ("and", "like", "please" anlam taşıyabilir)
+LEADING_WORDS = frozenset(("so", "well", "okay", "ok", "alright"))
+LEADING_PHRASES = ("let me ask", "can you tell me", "tell me", "i wanted to ask", "my question is")
+_PUNCT_RE = re.compile(r"[^\w\s']+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """Case-folded, punctuation-free question with filler removed (cache key text)."""
+    t = _PUNCT_RE.sub(" ", (text or "").casefold())
+    t = " " + _SPACE_RE.sub(" ", t).strip() + " "
+    for phrase in FILLER_PHRASES:
+        t = t.replace(" " + phrase + " ", " ")
+    words = [w for w in t.split() if w not in FILLER_WORDS]
+    changed = True
+    while words and changed:
+        changed = False
+        if words[0] in LEADING_WORDS:
+            words = words[1:]
+            changed = True
+            continue
+        head = " ".join(words[:5])
+        for phrase in LEADING_PHRASES:
+            if head == phrase or head.startswith(phrase + " "):
+                words = words[len(phrase.split()):]
+                changed = True
+                break
+    return " ".join(words)
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class AnswerCache:
+    """LRU + TTL answer cache with an optional SQLite store that survives restarts.
+
+    Keys are (model, system-prompt hash, normalized question). Memory holds
+    at most `max_entries`; expired rows are dropped on open and the disk
+    store is pruned back to `max_entries` in batches, once it has grown
+    `max_entries // 8` rows past it.
+    """
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        max_entries: int = 512,
+        ttl_sec: float = 7 * 24 * 3600,
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_sec = float(ttl_sec)
+        self._mem: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_rows = 0                           # üst sınır: REPLACE satır eklemez ama sayılır
+        self._prune_slack = max(1, self.max_entries // 8)
+        self.hits = 0
+        self.misses = 0
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT PRIMARY KEY, question TEXT, answer TEXT, created REAL)"
+            )
+            self._db.execute("DELETE FROM answers WHERE created < ?", (time.time() - self.ttl_sec,))
+            self._prune()
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT key, answer, created FROM answers ORDER BY created DESC LIMIT ?", (self.max_entries,)
+            ).fetchall()
+            for key, answer, created in reversed(rows):
+                self._mem[key] = (answer, created)
+
+    @staticmethod
+    def make_key(question: str, model: str, prompt: str) -> str:
+        raw = "\x1f".join((model, prompt_hash(prompt), normalize_question(question)))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None and time.time() - hit[1] > self.ttl_sec:
+                del self._mem[key]
+                hit = None
+            if hit is None:
+                self.misses += 1
+                return None
+            self._mem.move_to_end(key)
+            self.hits += 1
+            return hit[0]
+
+    def put(self, key: str, answer: str, question: str = ""):
+        now = time.time()
+        with self._lock:
+            self._mem[key] = (answer, now)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers (key, question, answer, created) VALUES (?, ?, ?, ?)",
+                    (key, question, answer, now),
+                )
+                self._db_rows += 1
+                if self._db_rows > self.max_entries + self._prune_slack:
+                    self._prune()
+                self._db.commit()
+
+    def _prune(self):
+        # tüm tabloyu tarayan silme her eklemede değil, tampon dolunca bir kez
+        self._db.execute(
+            "DELETE FROM answers WHERE key NOT IN"
+            " (SELECT key FROM answers ORDER BY created DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self._db_rows = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._mem),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+
+class CachedStream:
+    """Token iterator from CachedAssistant.stream_answer; `cache_hit` is this call's lookup result."""
+    def __init__(self, tokens, cache_hit: bool, source=None):
+        self._tokens = tokens
+        self.cache_hit = cache_hit
+        self._source = source           # canlı akış (isabette yok)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._tokens)
+
+    def close(self):
+        self._tokens.close()
+        close = getattr(self._source, "close", None)
+        if close is not None:
+            close()
+
+    def cancel(self):
+        """Thread-safe abort of the live request (see AnswerStream.cancel)."""
+        cancel = getattr(self._source, "cancel", None)
+        if cancel is not None:
+            cancel()
+
+
+class CachedAssistant:
+    """ChatAssistant wrapper: replays cached answers through the same token stream.
+
+    Safe to call from several threads (live answer + speculative prefetch):
+    the hit status travels with each returned stream, not on the wrapper.
+    """
+    def __init__(self, assistant, cache: AnswerCache, system_prompt: str):
+        self.assistant = assistant
+        self.cache = cache
+        self.system_prompt = system_prompt
+        self.model = getattr(assistant, "model", "")
+
+    def stream_answer(self, question: str) -> CachedStream:
+        key = self.cache.make_key(question, self.model, self.system_prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return CachedStream(self._replay(cached), True)
+        stream = self.assistant.stream_answer(question)
+        return CachedStream(self._live(key, question, stream), False, stream)
+
+    @staticmethod
+    def _replay(cached: str):
+        for i, word in enumerate(cached.split(" ")):
+            yield word if i == 0 else " " + word
+
+    def _live(self, key: str, question: str, stream):
+        collected = []
+        for token in stream:
+            collected.append(token)
+            yield token
+        # yalnızca tamamlanmış (istisnasız) cevaplar önbelleğe girer
+        answer = "".join(collected).strip()
+        if answer:
+            self.cache.put(key, answer, question)
@@ -1,31 +1,133 @@
 # --- src/waa/cli.py ---
 import argparse
-import sounddevice as sd
-from .app import run
+import sys
+
 
 def list_devices():
+    import sounddevice as sd   # yalnızca cihaz listesi için; faster_whisper/openai yüklenmez
+
     print(sd.query_devices())
 
-def main():
-    p = argparse.ArgumentParser(prog="waa", description="Whisper Answer Assistant CLI")
+
+def batch(argv):
+    from .batch import main as batch_main
+    batch_main(argv)
+
+
+def bench(argv):
+    from .bench import main as bench_main
+    bench_main(argv)
+
+
+def bench_keywords(argv):
+    from .bench import keywords_main
+    keywords_main(argv)
+
+
+def bench_resample(argv):
+    from .resample import main as resample_main
+    resample_main(argv)
+
+
+def search(argv):
+    from .history import main as search_main
+    search_main(argv)
+
+
+def tune(argv):
+    from .tune import main as tune_main
+    tune_main(argv)
+
+
+def train_detector(argv):
+    from .detect_train import main as train_main
+    train_main(argv)
+
+
+def multi(argv):
+    from .multistream import main as multi_main
+    multi_main(argv)
+
+
+def bench_streams(argv):
+    from .multistream import bench_main
+    bench_main(argv)
+
+
+def serve(argv):
+    from .ingest import main as serve_main
+    serve_main(argv)
+
+
+def ingest_load(argv):
+    from .ingest import load_main
+    load_main(argv)
+
+
+def mock_server(argv):
+    from .mockserver import main as mock_main
+    mock_main(argv)
+
+
+# `waa <command> ...` alt komutları; komutsuz çağrı canlı asistanı başlatır
+COMMANDS = {
+    "batch": batch,
+    "bench": bench,
+    "bench-keywords": bench_keywords,
+    "bench-resample": bench_resample,
+    "bench-streams": bench_streams,
+    "ingest-load": ingest_load,
+    "mock-server": mock_server,
+    "multi": multi,
+    "search": search,
+    "serve": serve,
+    "train-detector": train_detector,
+    "tune": tune,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+
+    p = argparse.ArgumentParser(
+        prog="waa",
+        description="Whisper Answer Assistant CLI",
+        epilog="Commands: " + ", ".join(sorted(COMMANDS)) + " (waa <command> --help)",
+    )
     p.add_argument("--list-devices", action="store_true", help="List input devices")
     p.add_argument("--device", type=int, default=None, help="Mic device index")
-    p.add_argument("--whisper-model", type=str, default="base",
-                   help="tiny|base|small|medium|large-v3 or local path")
+    p.add_argument("--whisper-model", type=str, default=None,
+                   help="tiny|base|small|medium|large-v3 or local path (default: `waa tune` profile, else base)")
     p.add_argument("--config", type=str, default="configs/settings.yaml", help="Settings YAML")
     p.add_argument("--keywords", type=str, default="configs/keywords.en.txt", help="Keyword list")
-    args = p.parse_args()
+    p.add_argument("--input", type=str, default=None, help="Replay a WAV/raw PCM file instead of the mic")
+    p.add_argument("--speed", type=float, default=1.0, help="Replay speed for --input (0 = as fast as possible)")
+    p.add_argument("--metrics", type=str, default=None, metavar="DIR",
+                   help="Write metrics.json + metrics.prom (Prometheus text) to DIR periodically")
+    p.add_argument("--metrics-interval", type=float, default=10.0, help="Seconds between metrics writes")
+    p.add_argument("--profile", choices=("cprofile", "sample"), default=None,
+                   help="Profile the ASR and LLM stages (output in <metrics dir or .waa>/profile)")
+    args = p.parse_args(argv)
 
     if args.list_devices:
         list_devices()
         return
 
+    from .app import run   # ağır bağımlılıklar yalnızca canlı çalıştırmada
+
     run(
         device=args.device,
         whisper_model=args.whisper_model,
         config_path=args.config,
         keywords_path=args.keywords,
+        input_path=args.input,
+        input_speed=args.speed,
+        metrics_dir=args.metrics,
+        metrics_interval=args.metrics_interval,
+        profile=args.profile,
     )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,206 @@
+# --- src/waa/context.py ---
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a live technical meeting. Merge the new transcript lines into the "
+    "existing summary. Keep decisions, open questions, names, numbers and the topics discussed; drop filler. "
+    "Plain sentences, at most {0} words. Reply with the summary only."
+)
+
+
+def _make_counter() -> Callable[[str], int]:
+    try:
+        import tiktoken   # isteğe bağlı: varsa gerçek token sayısı
+    except ImportError:
+        # ~4 karakter / token (İngilizce için OpenAI'nin kaba tahmini)
+        return lambda text: (len(text) + 3) // 4
+    enc = tiktoken.get_encoding("o200k_base")
+    return lambda text: len(enc.encode(text, disallowed_special=()))
+
+
+count_tokens = _make_counter()
+
+
+@dataclass
+class Turn:
+    role: str        # "transcript" | "answer"
+    text: str
+    tokens: int
+
+
+@dataclass
+class PromptReport:
+    total_tokens: int
+    system_tokens: int
+    summary_tokens: int
+    recent_tokens: int
+    question_tokens: int
+    stable_prefix_tokens: int      # önceki istekle aynı kalan baş kısım (prompt cache'e uygun)
+    recent_messages: int           # özet ile soru arasındaki mesaj sayısı
+
+
+class MeetingContext:
+    """Bounded meeting memory for follow-up questions.
+
+    Recent transcript lines and answers are kept verbatim up to
+    `max_tokens`; past that, the oldest turns are folded down to
+    `keep_tokens` in one go and merged into a running summary (by
+    `summarize_fn(summary, lines)` on a background thread, or an extractive
+    fallback). Folding in blocks instead of one turn at a time keeps the
+    message prefix byte-identical between folds, so provider-side prompt
+    caching applies; messages() is laid out most-stable first:
+    system prompt → summary → recent turns (append-only) → question.
+    """
+    def __init__(
+        self,
+        max_tokens: int = 2000,
+        keep_tokens: int = 1200,
+        summary_tokens: int = 250,
+        summarize_fn: Optional[Callable[[str, List[str], int], str]] = None,
+        include_answers: bool = True,
+    ):
+        self.max_tokens = int(max_tokens)
+        self.keep_tokens = min(int(keep_tokens), self.max_tokens)
+        self.summary_tokens = int(summary_tokens)
+        self.summarize_fn = summarize_fn
+        self.include_answers = include_answers
+        self.summary = ""
+        self._turns: Deque[Turn] = deque()
+        self._recent_tokens = 0
+        self._pending: List[str] = []       # özetlenmeyi bekleyen (katlanmış) satırlar
+        self._summarizing = False
+        self._lock = threading.Lock()
+        self._prev: List[dict] = []
+        self.last_report: Optional[PromptReport] = None
+        # sayaçlar
+        self.folds = 0
+        self.summaries = 0
+        self.summary_errors = 0
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.stable_tokens = 0
+
+    def add_transcript(self, text: str):
+        self._add(Turn("transcript", text.strip(), count_tokens(text)))
+
+    def add_answer(self, answer: str):
+        if self.include_answers and answer.strip():
+            self._add(Turn("answer", answer.strip(), count_tokens(answer)))
+
+    def _add(self, turn: Turn):
+        if not turn.text:
+            return
+        with self._lock:
+            self._turns.append(turn)
+            self._recent_tokens += turn.tokens
+            if self._recent_tokens <= self.max_tokens:
+                return
+            # tek seferde keep_tokens'a kadar katla: bir sonraki katlamaya kadar önek sabit kalır
+            while self._turns and self._recent_tokens > self.keep_tokens:
+                old = self._turns.popleft()
+                self._recent_tokens -= old.tokens
+                self._pending.append(("A: " if old.role == "answer" else "") + old.text)
+            self.folds += 1
+            if self._summarizing:
+                return
+            self._summarizing = True
+        threading.Thread(target=self._summarize_loop, name="waa-context-summary", daemon=True).start()
+
+    def _summarize_loop(self):
+        while True:
+            with self._lock:
+                lines, self._pending = self._pending, []
+                summary = self.summary
+                if not lines:
+                    self._summarizing = False
+                    return
+            new = None
+            if self.summarize_fn is not None:
+                try:
+                    new = (self.summarize_fn(summary, lines, self.summary_tokens) or "").strip() or None
+                except Exception as e:
+                    self.summary_errors += 1
+                    print("⚠️ context summary failed (extractive fallback):", e)
+            if new is None:
+                new = self._extractive(summary, lines)
+            with self._lock:
+                self.summary = new
+                self.summaries += 1
+
+    def _extractive(self, summary: str, lines: List[str]) -> str:
+        """Fallback: keep the newest words of summary + folded lines within summary_tokens."""
+        words = " ".join([summary] + lines).split()
+        out: Deque[str] = deque()
+        budget = self.summary_tokens
+        for w in reversed(words):
+            budget -= count_tokens(" " + w)
+            if budget < 0:
+                break
+            out.appendleft(w)
+        return ("… " if len(out) < len(words) else "") + " ".join(out)
+
+    def messages(self, question: str, system_prompt: str) -> List[dict]:
+        """Chat messages for `question` with the meeting context; records last_report."""
+        with self._lock:
+            turns = list(self._turns)
+            summary = self.summary
+        # soru zaten son transkript satırıysa tekrar etme
+        if turns and turns[-1].role == "transcript" and turns[-1].text == question.strip():
+            turns = turns[:-1]
+        msgs = [{"role": "system", "content": system_prompt}]
+        if summary:
+            msgs.append({"role": "system", "content": "Meeting summary so far:\n" + summary})
+        lines: List[str] = []
+        for t in turns:
+            if t.role == "answer":
+                if lines:
+                    msgs.append({"role": "user", "content": "Meeting transcript:\n" + "\n".join(lines)})
+                    lines = []
+                msgs.append({"role": "assistant", "content": t.text})
+            else:
+                lines.append(t.text)
+        if lines:
+            msgs.append({"role": "user", "content": "Meeting transcript:\n" + "\n".join(lines)})
+        msgs.append({"role": "user", "content": question})
+        with self._lock:
+            self._report(msgs, summary)
+        return msgs
+
+    def _report(self, msgs: List[dict], summary: str):
+        sizes = [count_tokens(m["content"]) + 4 for m in msgs]   # ~4 token mesaj başlığı
+        stable = 0
+        for m, n, prev in zip(msgs, sizes, self._prev):
+            if m == prev:
+                stable += n
+                continue
+            if m["content"].startswith(prev["content"]) and m["role"] == prev["role"]:
+                stable += count_tokens(prev["content"])   # sona eklenmiş mesaj: eski içerik önek
+            break
+        self._prev = msgs
+        system = sizes[0]
+        summ = sizes[1] if summary else 0
+        question = sizes[-1]
+        total = sum(sizes)
+        self.last_report = PromptReport(
+            total, system, summ, total - system - summ - question, question, stable, len(msgs) - 2 - (1 if summary else 0),
+        )
+        self.requests += 1
+        self.prompt_tokens += total
+        self.stable_tokens += stable
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "recent_turns": len(self._turns),
+                "recent_tokens": self._recent_tokens,
+                "summary_tokens": count_tokens(self.summary) if self.summary else 0,
+                "folds": self.folds,
+                "summaries": self.summaries,
+                "summary_errors": self.summary_errors,
+                "requests": self.requests,
+                "avg_prompt_tokens": round(self.prompt_tokens / self.requests, 1) if self.requests else 0.0,
+                "stable_prefix_ratio": round(self.stable_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0,
+            }
@@ -1,6 +1,10 @@
 # --- src/waa/detect.py ---
+import re
+import zlib
 from pathlib import Path
-from typing import Union, Set
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
 
 EN_QUESTION_STARTS = (
     "what","why","how","when","where","who","which",
@@ -18,14 +22,182 @@ def is_english_question(text: str, lang: str) -> bool:
 
 PathLike = Union[str, Path]
 
-def load_keywords(path: PathLike) -> Set[str]:
+DATA_DIR = Path(__file__).resolve().parent / "data"
+DEFAULT_CLASSIFIER_PATH = DATA_DIR / "question_clf.npz"
+DEFAULT_CORPUS_PATH = DATA_DIR / "questions.en.tsv"
+HASH_DIM = 1 << 16
+_WORDS_RE = re.compile(r"[a-z0-9']+")
+
+
+def question_features(text: str) -> List[str]:
+    """Sparse features of one utterance: word 1-2 grams, sentence start/end, char 3-grams."""
+    t = (text or "").strip().lower()
+    words = _WORDS_RE.findall(t)
+    feats = ["n:{0}".format(min(len(words), 12))]   # her metinde en az bir özellik
+    feats += ["w:" + w for w in words]
+    feats += ["b:{0} {1}".format(a, b) for a, b in zip(words, words[1:])]
+    if words:
+        feats.append("f:" + words[0])
+        feats.append("f2:" + " ".join(words[:2]))
+        feats.append("l:" + words[-1])
+    if t.endswith("?"):
+        feats.append("?")
+    padded = " " + " ".join(words) + " "
+    feats += ["c:" + padded[i:i + 3] for i in range(len(padded) - 2)]
+    return feats
+
+
+def hash_features(text: str, dim: int = HASH_DIM) -> np.ndarray:
+    # zlib.crc32 süreçler arası kararlı (hash() tuzlanır)
+    return np.fromiter((zlib.crc32(f.encode("utf-8")) & (dim - 1) for f in question_features(text)), dtype=np.int64)
+
+
+class QuestionClassifier:
+    """Hashed n-gram logistic regression: P(utterance is a question / asks for an answer).
+
+    Weights ship as a small .npz next to the bundled corpus and are retrained
+    with `waa train-detector`. score_batch() scores many utterances with one
+    gather + reduceat over the weight vector.
+    """
+    def __init__(self, weights: np.ndarray, bias: float = 0.0, threshold: float = 0.5):
+        self.w = np.asarray(weights, dtype=np.float32)
+        self.dim = len(self.w)
+        self.b = float(bias)
+        self.threshold = float(threshold)
+
+    @classmethod
+    def load(cls, path: Optional[PathLike] = None, threshold: Optional[float] = None) -> "QuestionClassifier":
+        with np.load(str(path or DEFAULT_CLASSIFIER_PATH)) as z:
+            clf = cls(z["w"], float(z["b"]), float(z["threshold"]))
+        if threshold is not None:
+            clf.threshold = float(threshold)
+        return clf
+
+    def save(self, path: PathLike):
+        np.savez_compressed(str(path), w=self.w.astype(np.float16), b=np.float32(self.b),
+                            threshold=np.float32(self.threshold))
+
+    def encode(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(concatenated feature indices, start offset per text, 1/sqrt(n_features) per text)."""
+        rows = [hash_features(t, self.dim) for t in texts]
+        lens = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+        starts = np.zeros(len(rows), dtype=np.int64)
+        np.cumsum(lens[:-1], out=starts[1:])
+        idx = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        return idx, starts, 1.0 / np.sqrt(lens)
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        if not len(texts):
+            return np.zeros(0, dtype=np.float32)
+        idx, starts, scale = self.encode(texts)
+        logits = np.add.reduceat(self.w[idx], starts) * scale + self.b
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def score(self, text: str) -> float:
+        return float(self.score_batch([text])[0])
+
+    def is_question(self, text: str, lang: Optional[str] = "en") -> bool:
+        if lang is not None and (lang or "").lower() != "en":
+            return False
+        if not (text or "").strip():
+            return False
+        return self.score(text) >= self.threshold
+
+
+# "c++", "c#" tek token; tire/nokta/eğik çizgi ayırır ("real-time" == "real time", "node.js" == "node js")
+_TOKEN_RE = re.compile(r"[a-z0-9]+[+#]*")
+_END = ""   # trie'de "burada bir anahtar kelime bitiyor" işareti
+
+
+def _stem(tok: str) -> str:
+    """Very light plural folding, applied to keywords and text alike (apis → api, queries → query)."""
+    if len(tok) <= 3 or not tok[-1] == "s" or tok.endswith("ss"):
+        return tok
+    if tok.endswith("ies"):
+        return tok[:-3] + "y"
+    if tok.endswith(("ses", "xes", "ches", "shes")):
+        return tok[:-2]
+    return tok[:-1]
+
+
+def _tokens(text: str) -> List[str]:
+    return [_stem(t) for t in _TOKEN_RE.findall((text or "").lower())]
+
+
+class KeywordMatcher:
+    """Word-boundary keyword/phrase matcher compiled once into a token trie.
+
+    Text is tokenized in one pass and walked leftmost-longest through the
+    trie, so the cost grows with the text, not with the number of keywords;
+    "api" no longer matches "rapid" and "sql" no longer matches "nosql".
+    Behaves like the old keyword set (len, iteration, membership).
+    """
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: Set[str] = {k.strip().lower() for k in keywords if k and k.strip()}
+        self._trie: Dict[str, dict] = {}
+        self._max_len = 0
+        for kw in self.keywords:
+            toks = _tokens(kw)
+            if not toks:
+                continue
+            node = self._trie
+            for tok in toks:
+                node = node.setdefault(tok, {})
+            node[_END] = kw
+            self._max_len = max(self._max_len, len(toks))
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keywords)
+
+    def __contains__(self, keyword) -> bool:
+        return keyword in self.keywords
+
+    def _walk(self, toks: List[str]) -> Iterator[Tuple[str, int]]:
+        i = 0
+        while i < len(toks):
+            node = self._trie.get(toks[i])
+            best = None
+            j = i
+            while node is not None:
+                if _END in node:
+                    best = (node[_END], j - i + 1)
+                j += 1
+                node = node.get(toks[j]) if j < len(toks) else None
+            if best is None:
+                i += 1
+            else:
+                yield best
+                i += best[1]
+
+    def search(self, text: str) -> bool:
+        for _ in self._walk(_tokens(text)):
+            return True
+        return False
+
+    def match(self, text: str) -> Tuple[List[str], float]:
+        """(distinct matched keywords in order of appearance, score).
+
+        The score counts matched tokens, so a multiword phrase weighs more
+        than a single term and repeated mentions count once.
+        """
+        found: Dict[str, int] = {}
+        for kw, n in self._walk(_tokens(text)):
+            found.setdefault(kw, n)
+        return list(found), float(sum(found.values()))
+
+
+def load_keywords(path: PathLike) -> KeywordMatcher:
     p = Path(path)
     if not p.exists():
-        return set()
-    return {line.strip().lower() for line in p.read_text(encoding="utf-8").splitlines() if line.strip()}
+        return KeywordMatcher(())
+    return KeywordMatcher(line for line in p.read_text(encoding="utf-8").splitlines() if not line.startswith("#"))
 
-def contains_keyword(text: str, keywords: Set[str]) -> bool:
+def contains_keyword(text: str, keywords: Union[KeywordMatcher, Set[str]]) -> bool:
     if not keywords:
         return True
-    s = (text or "").lower()
-    return any(k in s for k in keywords)
\ No newline at end of file
+    if not isinstance(keywords, KeywordMatcher):
+        keywords = KeywordMatcher(keywords)
+    return keywords.search(text)
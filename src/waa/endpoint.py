@@ -0,0 +1,113 @@
+# --- src/waa/endpoint.py ---
+import math
+import re
+from typing import Optional
+
+import numpy as np
+
+from .detect import EN_QUESTION_STARTS
+
+# Cümle bunlarla bitiyorsa konuşmacı büyük ihtimalle devam edecek
+CONTINUATION_WORDS = frozenset((
+    "and", "or", "but", "so", "because", "if", "then", "than", "that", "which",
+    "the", "a", "an", "to", "of", "in", "on", "for", "with", "about", "from",
+    "my", "our", "your", "their", "is", "are", "was", "were", "be", "like", "um", "uh",
+))
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def frame_dbfs(x: np.ndarray) -> float:
+    """RMS level of an int16 frame in dBFS (silence → -100)."""
+    if not len(x):
+        return -100.0
+    ms = float(np.dot(x.astype(np.float32), x.astype(np.float32))) / len(x)
+    return 10.0 * math.log10(ms / (32768.0 * 32768.0) + 1e-10)
+
+
+def looks_finished_question(text: str) -> bool:
+    t = (text or "").strip().lower()
+    if t.endswith("?"):
+        return True
+    words = _WORD_RE.findall(t)
+    if len(words) < 4 or words[0] not in EN_QUESTION_STARTS:
+        return False
+    return words[-1] not in CONTINUATION_WORDS and not t.endswith(",")
+
+
+def looks_unfinished(text: str) -> bool:
+    t = (text or "").strip().lower()
+    if not t or t.endswith(","):
+        return bool(t)
+    words = _WORD_RE.findall(t)
+    return bool(words) and words[-1] in CONTINUATION_WORDS
+
+
+class AdaptiveEndpointer:
+    """Sample-clock speech/silence decision on top of webrtcvad.
+
+    - smoothed frame energy vs. a tracked noise floor gates VAD false positives,
+      with hysteresis (`on_db` to enter speech, the lower `off_db` to stay in it)
+    - `onset_frames` consecutive speech frames are needed to open a segment
+    - the silence hangover adapts to the latest partial transcript (`hint`):
+      `min_silence_sec` after a finished-looking question, `max_silence_sec`
+      mid-sentence, `silence_sec` otherwise
+
+    on_db=None turns the energy gate off (plain webrtcvad decision).
+    """
+    def __init__(
+        self,
+        samplerate: int = 16000,
+        silence_sec: float = 0.30,
+        min_silence_sec: Optional[float] = None,
+        max_silence_sec: Optional[float] = None,
+        onset_frames: int = 1,
+        on_db: Optional[float] = 6.0,
+        off_db: Optional[float] = 3.0,
+        energy_alpha: float = 0.5,
+        noise_alpha: float = 0.05,
+    ):
+        self.sr = samplerate
+        self.silence_sec = silence_sec
+        self.min_silence_sec = silence_sec * 0.5 if min_silence_sec is None else min_silence_sec
+        self.max_silence_sec = silence_sec * 2.5 if max_silence_sec is None else max_silence_sec
+        self.onset_frames = max(1, int(onset_frames))
+        self.on_db = on_db
+        self.off_db = on_db if (on_db is None or off_db is None) else min(off_db, on_db)
+        self.energy_alpha = energy_alpha
+        self.noise_alpha = noise_alpha
+        self.noise_db = -70.0
+        self.energy_db: Optional[float] = None
+        self.in_speech = False
+        self._hint = ""
+
+    def is_speech(self, x: np.ndarray, vad_voiced: bool) -> bool:
+        if self.on_db is None:
+            return vad_voiced
+        e = frame_dbfs(x)
+        self.energy_db = e if self.energy_db is None else (
+            self.energy_alpha * e + (1.0 - self.energy_alpha) * self.energy_db
+        )
+        if not vad_voiced:
+            # gürültü tabanını yalnızca konuşmasız frame'lerden izle
+            self.noise_db += self.noise_alpha * (e - self.noise_db)
+            return False
+        margin = self.off_db if self.in_speech else self.on_db
+        return self.energy_db > self.noise_db + margin
+
+    def hint(self, text: str):
+        self._hint = text or ""
+
+    def hangover_sec(self) -> float:
+        if looks_finished_question(self._hint):
+            return self.min_silence_sec
+        if looks_unfinished(self._hint):
+            return self.max_silence_sec
+        return self.silence_sec
+
+    def hangover_samples(self) -> int:
+        return int(self.sr * self.hangover_sec())
+
+    def reset(self):
+        """Segment kapandığında çağrılır (gürültü tabanı korunur)."""
+        self.in_speech = False
+        self._hint = ""
@@ -0,0 +1,143 @@
+# --- src/waa/eventlog.py ---
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+_STOP = object()
+
+
+class EventLog:
+    """Background JSONL sink for transcripts, answers and errors.
+
+    write() only enqueues a dict (never touches the file); a writer thread
+    drains the queue in batches, keeps the file open and flushes every
+    `flush_interval` seconds. The file rotates to `<name>.1 … <name>.N` when
+    it exceeds `max_bytes` or has been open for `rotate_sec` (checked before
+    each batch). close() drains
+    everything that was queued before it returns.
+    """
+    def __init__(
+        self,
+        path: Union[str, Path],
+        max_bytes: int = 10 * 1024 * 1024,
+        rotate_sec: Optional[float] = None,
+        backups: int = 5,
+        flush_interval: float = 1.0,
+        batch_size: int = 256,
+        max_queue: int = 10000,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes) if max_bytes else 0
+        self.rotate_sec = float(rotate_sec) if rotate_sec else 0.0
+        self.backups = max(0, int(backups))
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, int(batch_size))
+        self._q: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._f = None
+        self._opened = 0.0
+        self._closed = False
+        # sayaçlar
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self.flushes = 0
+        self._thread = threading.Thread(target=self._run, name="waa-eventlog", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)   # Ctrl+C / sys.exit yolunda da kuyruğu boşalt
+
+    def write(self, kind: str, **fields):
+        """Queue one record; {"ts", "kind", **fields}. Drops (and counts) if the queue is full."""
+        if self._closed:
+            return
+        rec = {"ts": round(time.time(), 3), "kind": kind}
+        rec.update(fields)
+        try:
+            self._q.put_nowait(rec)
+        except queue.Full:
+            self.dropped += 1
+
+    def _open(self):
+        self._f = open(self.path, "a", encoding="utf-8")
+        self._opened = time.time()
+
+    def _rotate(self):
+        self._f.close()
+        self._f = None
+        if self.backups:
+            for i in range(self.backups - 1, 0, -1):
+                src = self.path.with_name("{0}.{1}".format(self.path.name, i))
+                if src.exists():
+                    os.replace(str(src), str(self.path.with_name("{0}.{1}".format(self.path.name, i + 1))))
+            os.replace(str(self.path), str(self.path.with_name(self.path.name + ".1")))
+        else:
+            self.path.unlink()
+        self.rotations += 1
+        self._open()
+
+    def _needs_rotation(self) -> bool:
+        if self.max_bytes and self._f.tell() >= self.max_bytes:
+            return True
+        return bool(self.rotate_sec) and self._f.tell() > 0 and time.time() - self._opened >= self.rotate_sec
+
+    def _write_batch(self, batch):
+        if self._needs_rotation():
+            self._rotate()
+        self._f.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch))
+        self.written += len(batch)
+
+    def _run(self):
+        self._open()
+        last_flush = time.monotonic()
+        stop = False
+        try:
+            while not stop:
+                batch = []
+                try:
+                    item = self._q.get(timeout=self.flush_interval)
+                    while True:
+                        if item is _STOP:
+                            stop = True
+                            break
+                        batch.append(item)
+                        if len(batch) >= self.batch_size:
+                            break
+                        item = self._q.get_nowait()
+                except queue.Empty:
+                    pass
+                if batch:
+                    self._write_batch(batch)
+                if stop or time.monotonic() - last_flush >= self.flush_interval:
+                    self._f.flush()
+                    self.flushes += 1
+                    last_flush = time.monotonic()
+        except Exception as e:
+            print("⚠️ event log writer stopped:", e)
+        finally:
+            if self._f is not None:
+                self._f.close()
+
+    def close(self, timeout: float = 5.0):
+        """Flushes every queued record and closes the file (idempotent)."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._q.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+            "flushes": self.flushes,
+            "queued": self._q.qsize(),
+        }
@@ -0,0 +1,355 @@
+# --- src/waa/history.py ---
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, List, Optional, Union
+
+from .cache import normalize_question
+
+DEFAULT_HISTORY_PATH = ".waa/history.sqlite"
+# benzerlikten çıkarılan dolgu kelimeler (soru kelimeleri kalır: "how" ≠ "why")
+STOPWORDS = frozenset((
+    "a", "an", "the", "is", "are", "was", "were", "be", "do", "does", "did", "i", "you", "we", "they", "it",
+    "to", "of", "in", "on", "for", "and", "or", "with", "this", "that", "there", "can", "could", "would",
+    "should", "me", "my", "your", "our", "about", "any", "some",
+))
+# hemen her soruda geçer → FTS aday sorgusuna girmez (yalnızca benzerlikte sayılır)
+QUESTION_WORDS = frozenset(("what", "how", "why", "when", "where", "which", "who", "whom", "whose"))
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions ("
+    " id TEXT PRIMARY KEY, started REAL, ended REAL, source TEXT)",
+    # kind: transcript | question (answer + outcome ile, cevaplandığında yazılır)
+    "CREATE TABLE IF NOT EXISTS entries ("
+    " id INTEGER PRIMARY KEY, session TEXT, ts REAL, kind TEXT, seg_id INTEGER,"
+    " text TEXT, answer TEXT, outcome TEXT)",
+    "CREATE INDEX IF NOT EXISTS entries_session ON entries (session, ts)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5("
+    " text, answer, content='entries', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN"
+    " INSERT INTO entries_fts (rowid, text, answer) VALUES (new.id, new.text, coalesce(new.answer, ''));"
+    " END",
+    # lookup() yalnızca tamamlanmış cevaplarda arar: transkript satırları aday listesini şişirmesin
+    "CREATE VIRTUAL TABLE IF NOT EXISTS answered_fts USING fts5("
+    " text, content='entries', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS entries_ai_answered AFTER INSERT ON entries"
+    " WHEN new.kind = 'question' AND new.answer != '' AND coalesce(new.outcome, 'ok') = 'ok' BEGIN"
+    " INSERT INTO answered_fts (rowid, text) VALUES (new.id, new.text);"
+    " END",
+)
+
+
+def new_session_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + os.urandom(2).hex()
+
+
+def _terms(text: str) -> List[str]:
+    """Content words of a question (normalized, stopwords removed, plural -s cut, order kept, unique)."""
+    seen = []
+    for w in normalize_question(text).replace("'", " ").split():
+        if len(w) < 2 or w in STOPWORDS:
+            continue
+        if len(w) > 3 and w.endswith("s") and not w.endswith("ss"):
+            w = w[:-1]
+        if w not in seen:
+            seen.append(w)
+    return seen
+
+
+def _fts_query(terms: List[str], op: str) -> str:
+    # her terim tırnaklı → kullanıcı metnindeki FTS5 sözdizimi ("-", "*", AND…) etkisiz
+    return (" " + op + " ").join('"{0}"'.format(t.replace('"', '""')) for t in terms)
+
+
+def _similarity(a: List[str], b: List[str]) -> float:
+    sa, sb = set(a), set(b)
+    return len(sa & sb) / float(len(sa | sb)) if sa and sb else 0.0
+
+
+class MeetingHistory:
+    """Searchable on-disk history of every transcript, question and answer.
+
+    add_transcript() / add_answer() only append to a bounded in-memory
+    buffer (oldest dropped and counted when full); a writer thread commits
+    it to SQLite in one transaction per batch — every `flush_interval`
+    seconds or `batch_size` rows. An FTS5 index (porter stemming) covers
+    the text and answers. lookup() finds the best earlier answer to a new
+    question: FTS5 bm25 candidates over past questions re-ranked by word
+    overlap, plus the not-yet-committed buffer.
+    """
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_HISTORY_PATH,
+        session: Optional[str] = None,
+        source: str = "",
+        batch_size: int = 64,
+        flush_interval: float = 2.0,
+        max_buffer: int = 5000,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.session = session or new_session_id()
+        self.source = source
+        self.started = time.time()
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self._buf: Deque[tuple] = deque()
+        self._inflight: List[tuple] = []        # yazılmakta olan batch (lookup onu da görür)
+        self.max_buffer = max(1, int(max_buffer))
+        self._cond = threading.Condition()
+        self._closed = False
+        db = self._connect()
+        with db:
+            for stmt in _SCHEMA:
+                db.execute(stmt)
+        self._read = db                          # lookup/search (yazıcı kendi bağlantısını kullanır)
+        self._read_lock = threading.Lock()
+        # sayaçlar
+        self.added = 0
+        self.written = 0
+        self.dropped = 0
+        self.commits = 0
+        self.lookups = 0
+        self.recalls = 0
+        self._thread = threading.Thread(target=self._run, name="waa-history", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10.0)
+        db.execute("PRAGMA journal_mode=WAL")       # okuyucular yazıcıyı beklemesin
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def add_transcript(self, text: str, seg_id: int = 0):
+        self._add((self.session, time.time(), "transcript", seg_id, text.strip(), None, None))
+
+    def add_answer(self, question: str, answer: str, outcome: str = "ok", seg_id: int = 0):
+        """A detected question with its answer ("" when none was produced)."""
+        self._add((self.session, time.time(), "question", seg_id, question.strip(), answer.strip(), outcome))
+
+    def _add(self, row: tuple):
+        if not row[4] or self._closed:
+            return
+        with self._cond:
+            if len(self._buf) >= self.max_buffer:
+                self._buf.popleft()
+                self.dropped += 1
+            self._buf.append(row)
+            self.added += 1
+            if len(self._buf) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        db = self._connect()
+        try:
+            while True:
+                with self._cond:
+                    if not self._closed and len(self._buf) < self.batch_size:
+                        self._cond.wait(self.flush_interval)
+                    batch = self._inflight = list(self._buf)
+                    self._buf.clear()
+                    closed = self._closed
+                if batch:
+                    with db:
+                        if not self.commits:
+                            # oturum satırı ilk yazımda: yalnızca arama yapan örnekler oturum açmaz
+                            db.execute("INSERT OR IGNORE INTO sessions (id, started, source) VALUES (?, ?, ?)",
+                                       (self.session, self.started, self.source))
+                        db.executemany(
+                            "INSERT INTO entries (session, ts, kind, seg_id, text, answer, outcome)"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+                    with self._cond:
+                        self._inflight = []
+                    self.written += len(batch)
+                    self.commits += 1
+                if closed:
+                    break
+            if self.commits:
+                with db:
+                    db.execute("UPDATE sessions SET ended = ? WHERE id = ?", (time.time(), self.session))
+        except Exception as e:
+            print("⚠️ history writer stopped:", e)
+        finally:
+            db.close()
+
+    def lookup(self, question: str, min_score: float = 0.6, candidates: int = 20) -> Optional[dict]:
+        """Best earlier answered question similar to `question` (word-overlap ≥ min_score), or None."""
+        t0 = time.perf_counter()
+        terms = _terms(question)
+        self.lookups += 1
+        if not terms:
+            return None
+        best = None
+        with self._cond:
+            # henüz diske yazılmamış (tampondaki / yazılmakta olan) sorular
+            rows = [(r[4], r[5], r[1], r[0]) for r in list(self._inflight) + list(self._buf)
+                    if r[2] == "question" and r[5] and (r[6] or "ok") == "ok"]
+        query = _fts_query([t for t in terms if t not in QUESTION_WORDS] or terms, "OR")
+        with self._read_lock:
+            rows += self._read.execute(
+                "SELECT e.text, e.answer, e.ts, e.session FROM answered_fts f JOIN entries e ON e.id = f.rowid"
+                " WHERE answered_fts MATCH ? ORDER BY bm25(answered_fts) LIMIT ?",
+                (query, candidates),
+            ).fetchall()
+        for q, answer, ts, session in rows:
+            score = _similarity(terms, _terms(q))
+            if score >= min_score and (best is None or (score, ts) > (best["score"], best["ts"])):
+                best = {"question": q, "answer": answer, "ts": ts, "session": session, "score": round(score, 3)}
+        if best is not None:
+            self.recalls += 1
+            best["ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+        return best
+
+    def search(self, query: str, kind: Optional[str] = None, session: Optional[str] = None,
+               limit: int = 10, raw: bool = False) -> List[dict]:
+        """Committed entries matching `query` (all words; `raw` → FTS5 syntax), best match first."""
+        if not raw:
+            words = [w for w in normalize_question(query).replace("'", " ").split()]
+            query = _fts_query(words, "AND")
+        if not query:
+            return []
+        sql = ("SELECT e.id, e.session, e.ts, e.kind, e.seg_id, e.text, e.answer, e.outcome,"
+               " snippet(entries_fts, -1, '[', ']', '…', 12)"
+               " FROM entries_fts f JOIN entries e ON e.id = f.rowid WHERE entries_fts MATCH ?")
+        args: list = [query]
+        if kind:
+            sql += " AND e.kind = ?"
+            args.append(kind)
+        if session:
+            sql += " AND e.session = ?"
+            args.append(session)
+        sql += " ORDER BY bm25(entries_fts) LIMIT ?"
+        args.append(int(limit))
+        with self._read_lock:
+            rows = self._read.execute(sql, args).fetchall()
+        keys = ("id", "session", "ts", "kind", "seg_id", "text", "answer", "outcome", "snippet")
+        return [dict(zip(keys, r)) for r in rows]
+
+    def sessions(self, limit: int = 20) -> List[dict]:
+        with self._read_lock:
+            rows = self._read.execute(
+                "SELECT s.id, s.started, s.ended, s.source,"
+                " (SELECT count(*) FROM entries e WHERE e.session = s.id AND e.kind = 'transcript'),"
+                " (SELECT count(*) FROM entries e WHERE e.session = s.id AND e.kind = 'question')"
+                " FROM sessions s ORDER BY s.started DESC LIMIT ?", (int(limit),)).fetchall()
+        keys = ("id", "started", "ended", "source", "transcripts", "questions")
+        return [dict(zip(keys, r)) for r in rows]
+
+    def import_jsonl(self, path: Union[str, Path]) -> int:
+        """Backfills an event log (`log:` JSONL) as its own session; returns the rows queued."""
+        n = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get("kind") == "transcript" and rec.get("text"):
+                    row = (self.session, rec.get("ts", 0.0), "transcript", rec.get("seg_id", 0), rec["text"], None, None)
+                elif rec.get("kind") == "answer" and rec.get("question"):
+                    row = (self.session, rec.get("ts", 0.0), "question", 0, rec["question"],
+                           rec.get("answer") or "", rec.get("outcome"))
+                else:
+                    continue
+                self._add(row)
+                n += 1
+        return n
+
+    def close(self, timeout: float = 5.0):
+        """Commits everything buffered and closes (idempotent)."""
+        if self._closed:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        with self._read_lock:
+            self._read.close()
+
+    def stats(self) -> dict:
+        with self._cond:
+            buffered = len(self._buf)
+        return {
+            "session": self.session,
+            "added": self.added,
+            "written": self.written,
+            "commits": self.commits,
+            "dropped": self.dropped,
+            "buffered": buffered,
+            "lookups": self.lookups,
+            "recalls": self.recalls,
+        }
+
+
+def _when(ts: Optional[float]) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(ts)) if ts else "-"
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="waa search", description="Search past meeting transcripts, questions and answers")
+    p.add_argument("query", nargs="*", help="Words to find (all must match)")
+    p.add_argument("--db", type=str, default=None, help="History database (default: history.path)")
+    p.add_argument("--config", type=str, default="configs/settings.yaml")
+    p.add_argument("--kind", choices=("transcript", "question"), default=None)
+    p.add_argument("--session", type=str, default=None)
+    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--raw", action="store_true", help="Query is FTS5 syntax (NEAR, prefix*, OR …)")
+    p.add_argument("--ask", action="store_true", help="Treat the query as a new question → best earlier answer")
+    p.add_argument("--min-score", type=float, default=None, help="--ask: word overlap needed (default: history.recall_min_score)")
+    p.add_argument("--sessions", action="store_true", help="List recent sessions")
+    p.add_argument("--import", dest="import_path", type=str, default=None, help="Backfill a JSONL event log")
+    p.add_argument("--json", action="store_true", help="One JSON object per result")
+    args = p.parse_args(argv)
+
+    hcfg = {}
+    if args.config and Path(args.config).exists():
+        import yaml
+        hcfg = (yaml.safe_load(Path(args.config).read_text(encoding="utf-8")) or {}).get("history", {}) or {}
+    path = args.db or hcfg.get("path") or DEFAULT_HISTORY_PATH
+    if not args.import_path and not Path(path).exists():
+        p.error("no history at {0} (enable `history:` in settings and run waa first)".format(path))
+    hist = MeetingHistory(path, source="import:" + args.import_path if args.import_path else "search")
+    try:
+        if args.import_path:
+            n = hist.import_jsonl(args.import_path)
+            print("📥 {0} rows from {1} → {2} (session {3})".format(n, args.import_path, path, hist.session))
+            return n
+        if args.sessions:
+            for s in hist.sessions(args.limit):
+                print(json.dumps(s) if args.json else "{0}  {1} → {2}  {3} transcripts, {4} questions  {5}".format(
+                    s["id"], _when(s["started"]), _when(s["ended"]), s["transcripts"], s["questions"], s["source"]))
+            return None
+        query = " ".join(args.query)
+        if not query:
+            p.error("nothing to search for")
+        if args.ask:
+            min_score = args.min_score if args.min_score is not None else float(hcfg.get("recall_min_score", 0.6))
+            hit = hist.lookup(query, min_score)
+            if args.json:
+                print(json.dumps(hit))
+            elif hit is None:
+                print("No earlier answer for that question.")
+            else:
+                print("📚 {0} (session {1}, overlap {2}, {3} ms)\n> {4}\n{5}".format(
+                    _when(hit["ts"]), hit["session"], hit["score"], hit["ms"], hit["question"], hit["answer"]))
+            return hit
+        t0 = time.perf_counter()
+        rows = hist.search(query, args.kind, args.session, args.limit, args.raw)
+        ms = (time.perf_counter() - t0) * 1000.0
+        for r in rows:
+            if args.json:
+                print(json.dumps(r, ensure_ascii=False))
+                continue
+            print("{0}  {1:<10} {2}  {3}".format(_when(r["ts"]), r["kind"], r["session"], r["snippet"]))
+            if r["kind"] == "question" and r["answer"]:
+                print("    → " + r["answer"][:200].replace("\n", " "))
+        if not args.json:
+            print("({0} results in {1:.1f} ms)".format(len(rows), ms))
+        return rows
+    finally:
+        hist.close()
@@ -0,0 +1,762 @@
+# --- src/waa/ingest.py ---
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from .audio import FileSource, MicSegmenter
+from .multistream import FairQueue, StreamSpec, _audio_cfg, make_workers, segmenter_factory
+from .pipeline import QueueClosed, SegmentJob
+
+_WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+TCP_HEADER = b"WAA "      # isteğe bağlı TCP başlığı: b"WAA {json}\n", sonra ham PCM
+
+
+def ws_accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1(key.strip().encode("ascii") + _WS_GUID).digest()).decode("ascii")
+
+
+def _mask(data: bytes, key: bytes) -> bytes:
+    n = len(data)
+    if not n:
+        return data
+    # tek büyük tamsayı XOR'u: bayt bayt döngüden ~100x hızlı
+    k = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(k, "big")).to_bytes(n, "big")
+
+
+def ws_frame(op: int, payload: bytes = b"", mask: bool = False) -> bytes:
+    """One unfragmented frame; clients must mask (RFC 6455 §5.3), the server must not."""
+    n = len(payload)
+    head = bytearray([0x80 | op])
+    mbit = 0x80 if mask else 0
+    if n < 126:
+        head.append(mbit | n)
+    elif n < 1 << 16:
+        head.append(mbit | 126)
+        head += struct.pack("!H", n)
+    else:
+        head.append(mbit | 127)
+        head += struct.pack("!Q", n)
+    if mask:
+        key = os.urandom(4)
+        return bytes(head) + key + _mask(payload, key)
+    return bytes(head) + payload
+
+
+async def ws_recv(reader: asyncio.StreamReader, max_size: int, on_ping: Callable[[bytes], None]):
+    """Next complete message → (opcode, payload). Fragments are joined, pings answered via `on_ping`."""
+    op, parts, size = None, [], 0
+    while True:
+        b0, b1 = await reader.readexactly(2)
+        n = b1 & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if size + n > max_size:
+            raise ValueError("message larger than {0} bytes".format(max_size))
+        key = await reader.readexactly(4) if b1 & 0x80 else None
+        data = await reader.readexactly(n)
+        if key:
+            data = _mask(data, key)
+        frame_op = b0 & 0x0F
+        if frame_op == OP_PING:
+            on_ping(data)
+            continue
+        if frame_op == OP_PONG:
+            continue
+        if frame_op == OP_CLOSE:
+            return OP_CLOSE, data
+        if frame_op:
+            op = frame_op
+        parts.append(data)
+        size += n
+        if b0 & 0x80:
+            return op, b"".join(parts)
+
+
+class Session:
+    """One connected client: its own segmenter, outbox and counters.
+
+    Segmenter state is only touched by the session's own feed calls, which
+    run one at a time on the feed pool; ASR / answer threads talk back
+    through emit() (call_soon_threadsafe).
+    """
+    def __init__(self, sid: str, label: str, seg: MicSegmenter, answer: bool, loop, encode):
+        self.id = sid
+        self.label = label
+        self.seg = seg
+        self.answer = answer
+        self.loop = loop
+        self.encode = encode            # event dict → bytes (JSON line / WS text frame)
+        self.out: "asyncio.Queue" = asyncio.Queue()
+        self.buf = bytearray()
+        self.seg_end: Dict[int, float] = {}
+        self.answer_seq = 0             # yeni soru eski cevabı geçersiz kılar
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.t_open = time.time()
+        self.closed = False
+        # sayaçlar
+        self.bytes_in = 0
+        self.segments = 0
+        self.transcripts = 0
+        self.answers = 0
+
+    def emit(self, event: dict):
+        """Thread-safe: queues one event for the client."""
+        if not self.closed:
+            self.loop.call_soon_threadsafe(self.out.put_nowait, event)
+
+    def begin(self):
+        with self._lock:
+            self._pending += 1
+
+    def done(self):
+        with self._lock:
+            self._pending -= 1
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def stats(self) -> dict:
+        return {
+            "session": self.id,
+            "label": self.label,
+            "audio_sec": round(self.bytes_in / 2.0 / self.seg.sr, 2),
+            "segments": self.segments,
+            "transcripts": self.transcripts,
+            "answers": self.answers,
+            "duration_sec": round(time.time() - self.t_open, 2),
+        }
+
+
+class IngestServer:
+    """One warm process, many clients streaming 16 kHz mono int16 PCM.
+
+    A single port speaks both protocols (sniffed from the first bytes):
+    - WebSocket: `ws://host:port/?label=alice&answer=1`, binary messages are
+      PCM, text `{"type": "end"}` finishes the session; events come back as
+      JSON text messages.
+    - TCP: optional `WAA {"label": ..., "answer": true}\\n` header, then raw
+      PCM; half-close (EOF) finishes; events come back as JSON lines.
+    Every session gets its own MicSegmenter; segments of all sessions share
+    one FairQueue and the ASR worker threads, questions share one answer
+    pool. Events: transcript, answer (token deltas), answer_done, error, done.
+    """
+    def __init__(
+        self,
+        asr_workers: List,
+        make_segmenter: Callable[[StreamSpec], MicSegmenter],
+        stream_fn: Optional[Callable[[str], Iterator[str]]] = None,
+        wants_answer: Optional[Callable[[str, str, float], bool]] = None,
+        language: Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: int = 8790,
+        max_sessions: int = 32,
+        queue_size: int = 8,
+        idle_timeout: float = 30.0,
+        max_session_sec: float = 0.0,
+        max_message_bytes: int = 1 << 20,
+        max_outbox: int = 4096,
+        answer_workers: int = 4,
+        feed_workers: int = 4,
+        samplerate: int = 16000,
+    ):
+        self.make_segmenter = make_segmenter
+        self.stream_fn = stream_fn
+        self.wants_answer = wants_answer
+        self.language = language
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_session_sec = max_session_sec
+        self.max_message_bytes = max_message_bytes
+        self.max_outbox = max_outbox
+        self.sr = samplerate
+        self.queue = FairQueue(queue_size)
+        self.sessions: Dict[str, Session] = {}
+        self._ids = count(1)
+        self._answers = ThreadPoolExecutor(max(1, answer_workers), thread_name_prefix="waa-answer") if stream_fn else None
+        # VAD + segmenter her mesajda CPU harcar → olay döngüsünün dışında
+        self._feeder = ThreadPoolExecutor(max(1, feed_workers), thread_name_prefix="waa-feed")
+        self._workers = [
+            threading.Thread(target=self._worker_loop, args=(asr,), name="waa-asr-{0}".format(i), daemon=True)
+            for i, asr in enumerate(asr_workers)
+        ]
+        self._server = None
+        # sayaçlar
+        self.accepted = 0
+        self.rejected = 0
+        self.finished = 0
+        self.errors = 0
+        self.transcripts = 0
+        self.answers = 0
+
+    # ---- ASR / answer threads ----
+    def _worker_loop(self, asr):
+        while True:
+            try:
+                job = self.queue.get()
+            except QueueClosed:
+                return
+            s = self.sessions.get(job.stream)
+            try:
+                t0 = time.perf_counter()
+                text, lang, prob = asr.transcribe_segment(job.pcm16, language=self.language)
+                dt = time.perf_counter() - t0
+                if s is None:
+                    continue
+                s.transcripts += 1
+                self.transcripts += 1
+                s.emit({
+                    "type": "transcript", "seg_id": job.seg_id, "reason": job.reason, "text": text,
+                    "lang": lang, "prob": round(prob, 3), "audio_end_sec": round(s.seg_end.pop(job.seg_id, 0.0), 3),
+                    "decode_ms": round(dt * 1000.0, 1), "queue_wait_ms": round((time.time() - job.t_end - dt) * 1000.0, 1),
+                })
+                if (s.answer and self._answers is not None and text.strip()
+                        and (self.wants_answer is None or self.wants_answer(text, lang, prob))):
+                    s.answer_seq += 1
+                    s.begin()
+                    self._answers.submit(self._answer, s, text, job.seg_id, s.answer_seq)
+            except Exception as e:
+                self.errors += 1
+                if s is not None:
+                    s.emit({"type": "error", "stage": "asr", "error": str(e)})
+            finally:
+                if s is not None:
+                    s.done()
+
+    def _answer(self, s: Session, question: str, seg_id: int, seq: int):
+        t0 = time.perf_counter()
+        ttft = None
+        outcome = "ok"
+        try:
+            for tok in self.stream_fn(question):
+                if s.closed or s.answer_seq != seq:
+                    outcome = "superseded"
+                    break
+                if ttft is None:
+                    ttft = time.perf_counter() - t0
+                s.emit({"type": "answer", "seg_id": seg_id, "delta": tok})
+        except Exception as e:
+            outcome = "error"
+            s.emit({"type": "error", "stage": "llm", "error": str(e)})
+        finally:
+            s.answers += 1
+            self.answers += 1
+            s.emit({
+                "type": "answer_done", "seg_id": seg_id, "outcome": outcome,
+                "ttft_ms": round(ttft * 1000.0, 1) if ttft is not None else None,
+                "total_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+            })
+            s.done()
+
+    # ---- event loop side ----
+    def _open(self, label: Optional[str], answer: bool, loop, encode) -> Session:
+        sid = "s{0}".format(next(self._ids))
+        label = label or sid
+        s = Session(sid, label, self.make_segmenter(StreamSpec(label)), answer, loop, encode)
+        self.sessions[sid] = s
+        self.queue.add_stream(sid)
+        self.accepted += 1
+        return s
+
+    def _enqueue(self, s: Session, out):
+        pcm16, reason = out
+        if reason == "partial":
+            return
+        seg_id = s.segments
+        s.segments += 1
+        s.seg_end[seg_id] = s.seg.last_end_sec
+        s.begin()
+        if self.queue.put(SegmentJob(bytes(pcm16), reason, time.time(), seg_id, stream=s.id)):
+            s.done()      # son bekleyen işle birleşti → ayrı sonuç gelmeyecek
+
+    def _feed(self, s: Session, data: bytes) -> Optional[str]:
+        """PCM bytes → whole frames → segmenter; returns an error string to end the session.
+
+        Runs on the feed pool (see _push), never on the event loop.
+        """
+        s.bytes_in += len(data)
+        s.buf += data
+        fb = s.seg.frame_samples * 2
+        n = len(s.buf) - len(s.buf) % fb
+        if n:
+            mv = memoryview(s.buf)
+            for off in range(0, n, fb):
+                out = s.seg.push(mv[off:off + fb])
+                if out is not None:
+                    self._enqueue(s, out)
+            mv.release()
+            del s.buf[:n]
+        if self.max_session_sec and time.time() - s.t_open > self.max_session_sec:
+            return "session time limit ({0:.0f} s)".format(self.max_session_sec)
+        if s.out.qsize() > self.max_outbox:
+            return "slow consumer (outbox > {0} events)".format(self.max_outbox)
+        return None
+
+    async def _push(self, s: Session, data: bytes) -> Optional[str]:
+        # oturum başına sıralı: bir sonraki mesaj bu çağrı bitince okunur
+        return await asyncio.get_running_loop().run_in_executor(self._feeder, self._feed, s, data)
+
+    async def _writer(self, s: Session, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                ev = await s.out.get()
+                if ev is None:
+                    return
+                writer.write(s.encode(ev))
+                await writer.drain()
+        except (ConnectionError, OSError):
+            s.closed = True
+
+    async def _finish(self, s: Session, error: Optional[str] = None, drain_timeout: float = 60.0):
+        if error:
+            # döngüdeyiz: emit() (call_soon) hatayı "done"dan sonraya bırakırdı
+            s.out.put_nowait({"type": "error", "stage": "session", "error": error})
+        out = await asyncio.get_running_loop().run_in_executor(self._feeder, s.seg.flush)
+        if out is not None and not error:
+            self._enqueue(s, out)
+        t_end = time.monotonic() + drain_timeout
+        while s.pending > 0 and not s.closed and time.monotonic() < t_end:
+            await asyncio.sleep(0.02)
+        s.out.put_nowait({"type": "done", **s.stats()})
+        s.out.put_nowait(None)
+
+    def _close(self, s: Session):
+        s.closed = True
+        self.queue.remove_stream(s.id)
+        self.sessions.pop(s.id, None)
+        self.finished += 1
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await asyncio.wait_for(reader.readexactly(4), self.idle_timeout)
+            if head == b"GET ":
+                await self._handle_ws(reader, writer)
+            else:
+                await self._handle_tcp(head, reader, writer)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            self.errors += 1
+            print("⚠️ ingest connection error:", e)
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    def _full(self) -> bool:
+        if len(self.sessions) >= self.max_sessions:
+            self.rejected += 1
+            return True
+        return False
+
+    async def _handle_tcp(self, head: bytes, reader, writer):
+        def encode(ev: dict) -> bytes:
+            return (json.dumps(ev, ensure_ascii=False) + "\n").encode("utf-8")
+
+        opts = {}
+        first = b""
+        if head == TCP_HEADER:
+            opts = json.loads((await reader.readline()).decode("utf-8") or "{}")
+        else:
+            first = head
+        if self._full():
+            writer.write(encode({"type": "error", "stage": "session", "error": "busy: max {0} sessions".format(self.max_sessions)}))
+            await writer.drain()
+            return
+        s = self._open(opts.get("label"), bool(opts.get("answer", True)), asyncio.get_running_loop(), encode)
+        wtask = asyncio.ensure_future(self._writer(s, writer))
+        error = await self._push(s, first) if first else None
+        try:
+            while error is None:
+                try:
+                    data = await asyncio.wait_for(reader.read(65536), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    error = "idle timeout"
+                    break
+                if not data:
+                    break
+                error = await self._push(s, data)
+            await self._finish(s, error)
+            await wtask
+        finally:
+            self._close(s)
+            wtask.cancel()
+
+    async def _handle_ws(self, reader, writer):
+        request = await reader.readuntil(b"\r\n\r\n")
+        lines = request.decode("latin-1").split("\r\n")
+        path = lines[0].split(" ")[0]
+        headers = {}
+        for line in lines[1:]:
+            k, _, v = line.partition(":")
+            if k:
+                headers[k.strip().lower()] = v.strip()
+        key = headers.get("sec-websocket-key")
+        if not key or "websocket" not in headers.get("upgrade", "").lower():
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            return
+        if self._full():
+            # yükseltmeden önce reddet: istemci 503'ü doğrudan görür
+            writer.write(b"HTTP/1.1 503 Service Unavailable\r\nRetry-After: 1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            return
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            "Sec-WebSocket-Accept: {0}\r\n\r\n".format(ws_accept_key(key))
+        ).encode("ascii"))
+        q = {k: v[-1] for k, v in parse_qs(urlsplit(path).query).items()}
+
+        def encode(ev: dict) -> bytes:
+            return ws_frame(OP_TEXT, json.dumps(ev, ensure_ascii=False).encode("utf-8"))
+
+        s = self._open(q.get("label"), q.get("answer", "1") not in ("0", "false", "no"),
+                       asyncio.get_running_loop(), encode)
+        wtask = asyncio.ensure_future(self._writer(s, writer))
+        error = None
+        try:
+            while error is None:
+                try:
+                    op, data = await asyncio.wait_for(
+                        ws_recv(reader, self.max_message_bytes, lambda d: writer.write(ws_frame(OP_PONG, d))),
+                        self.idle_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    error = "idle timeout"
+                    break
+                except ValueError as e:
+                    error = str(e)
+                    break
+                except asyncio.IncompleteReadError:
+                    break
+                if op == OP_CLOSE:
+                    break
+                if op == OP_BINARY:
+                    error = await self._push(s, data)
+                elif op == OP_TEXT:
+                    msg = json.loads(data.decode("utf-8") or "{}")
+                    if msg.get("type") == "end":
+                        break
+            await self._finish(s, error)
+            await wtask
+            writer.write(ws_frame(OP_CLOSE, struct.pack("!H", 1000)))
+            await writer.drain()
+        finally:
+            self._close(s)
+            wtask.cancel()
+
+    async def start(self):
+        for t in self._workers:
+            t.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.queue.close()
+        for t in self._workers:
+            t.join(5.0)
+        if self._answers is not None:
+            self._answers.shutdown(wait=False)
+        self._feeder.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "finished": self.finished,
+            "transcripts": self.transcripts,
+            "answers": self.answers,
+            "errors": self.errors,
+            "merged": self.queue.merged,
+        }
+
+
+def _answerer(cfg: dict):
+    """(stream_fn, wants_answer) from the `assistant:` settings, like `waa` itself."""
+    from .detect import QuestionClassifier, is_english_question
+    from .llm import AsyncChatAssistant, ChatAssistant
+
+    a = cfg.get("assistant", {}) or {}
+    base_url = a.get("base_url") or None
+    if a.get("backend", "sync") == "async":
+        chat = AsyncChatAssistant(
+            a.get("openai_model", "gpt-4o-mini"), base_url,
+            float(a.get("connect_timeout_sec", 3)), float(a.get("first_token_timeout_sec", 8)),
+            float(a.get("total_timeout_sec", 45)), max_connections=int(a.get("max_connections", 8)),
+        )
+    else:
+        chat = ChatAssistant(a.get("openai_model", "gpt-4o-mini"), base_url=base_url)
+    clf = None
+    if (a.get("question_detector") or "heuristic") == "classifier":
+        clf = QuestionClassifier.load(a.get("question_model") or None, a.get("question_threshold"))
+    min_chars = int(a.get("min_chars", 8) or 0)
+
+    def wants_answer(text: str, lang: str, prob: float) -> bool:
+        ok = clf.is_question(text, lang) if clf is not None else is_english_question(text, lang)
+        return ok and len(text) >= min_chars
+
+    return chat.stream_answer, wants_answer
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="waa serve", description="Ingest PCM over WebSocket/TCP; transcripts and answers go back as events")
+    p.add_argument("--host", type=str, default=None)
+    p.add_argument("--port", type=int, default=None)
+    p.add_argument("--whisper-model", type=str, default="base")
+    p.add_argument("--config", type=str, default="configs/settings.yaml")
+    p.add_argument("--workers", type=int, default=None, help="ASR worker threads (shared model)")
+    p.add_argument("--cpu-threads", type=int, default=None)
+    p.add_argument("--max-sessions", type=int, default=None)
+    p.add_argument("--language", type=str, default="en", help="Force ASR language ('' = detect)")
+    p.add_argument("--no-answer", action="store_true", help="Transcripts only")
+    args = p.parse_args(argv)
+
+    cfg = _audio_cfg(args.config)
+    raw = {}
+    if args.config and Path(args.config).exists():
+        import yaml
+        raw = yaml.safe_load(Path(args.config).read_text(encoding="utf-8")) or {}
+    ingest_cfg = raw.get("ingest", {}) or {}
+    workers = int(args.workers if args.workers is not None else ingest_cfg.get("workers", 2))
+    cpu_threads = int(args.cpu_threads if args.cpu_threads is not None else ingest_cfg.get("cpu_threads", 0))
+
+    stream_fn = wants = None
+    if not args.no_answer:
+        try:
+            stream_fn, wants = _answerer(raw)
+        except Exception as e:
+            print("⚠️ OpenAI init error → sadece transkript:", e)
+
+    print("⏳ Loading Whisper ({0} x {1})...".format(workers, args.whisper_model))
+    asr_workers = make_workers(args.whisper_model, workers, cpu_threads)
+    for w in asr_workers[:1]:
+        w.warmup()
+    server = IngestServer(
+        asr_workers, segmenter_factory(cfg["audio"]), stream_fn, wants, language=args.language or None,
+        host=args.host or ingest_cfg.get("host", "127.0.0.1"),
+        port=int(args.port if args.port is not None else ingest_cfg.get("port", 8790)),
+        max_sessions=int(args.max_sessions if args.max_sessions is not None else ingest_cfg.get("max_sessions", 32)),
+        queue_size=int(ingest_cfg.get("queue_size", 8)),
+        idle_timeout=float(ingest_cfg.get("idle_timeout_sec", 30)),
+        max_session_sec=float(ingest_cfg.get("max_session_min", 0) or 0) * 60.0,
+        max_message_bytes=int(ingest_cfg.get("max_message_kb", 1024)) * 1024,
+        answer_workers=int(ingest_cfg.get("answer_workers", 4)),
+        feed_workers=int(ingest_cfg.get("feed_workers", 4)),
+        samplerate=int(cfg["audio"]["sample_rate"]),
+    )
+
+    async def serve():
+        await server.start()
+        print("🛰  Ingest on ws://{0}:{1}/ and tcp://{0}:{1} (Ctrl+C to stop)".format(server.host, server.port))
+        try:
+            await server.serve_forever()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping...")
+    print("Ingest:", ", ".join("{0}={1}".format(k, v) for k, v in server.stats().items()))
+
+
+# ---- load-test client ----
+def _read_pcm(path: str, sr: int) -> bytes:
+    return b"".join(FileSource(path, sr, frame_samples=sr // 10, speed=0.0).frames())
+
+
+async def _client(host: str, port: int, pcm: bytes, proto: str, speed: float, label: str,
+                  answer: bool, sr: int, chunk_ms: int = 100) -> dict:
+    res = {"label": label, "rejected": False, "transcripts": 0, "answers": 0,
+           "lag": [], "ttft": [], "events": 0, "error": None}
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError as e:
+        res["error"] = str(e)
+        return res
+    if proto == "ws":
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        writer.write((
+            "GET /?label={0}&answer={1} HTTP/1.1\r\nHost: {2}:{3}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            "Sec-WebSocket-Key: {4}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).format(label, int(answer), host, port, key).encode("ascii"))
+        status = (await reader.readuntil(b"\r\n\r\n")).split(b"\r\n", 1)[0]
+        if b" 101 " not in status:
+            res["rejected"] = True
+            writer.close()
+            return res
+
+        def send(data: bytes):
+            writer.write(ws_frame(OP_BINARY, data, mask=True))
+
+        def end():
+            writer.write(ws_frame(OP_TEXT, b'{"type": "end"}', mask=True))
+
+        async def events():
+            while True:
+                op, data = await ws_recv(reader, 1 << 24, lambda d: writer.write(ws_frame(OP_PONG, d, mask=True)))
+                if op == OP_CLOSE:
+                    return
+                yield json.loads(data.decode("utf-8"))
+    else:
+        writer.write(TCP_HEADER + json.dumps({"label": label, "answer": answer}).encode("utf-8") + b"\n")
+
+        def send(data: bytes):
+            writer.write(data)
+
+        def end():
+            writer.write_eof()
+
+        async def events():
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                yield json.loads(line.decode("utf-8"))
+
+    t0 = time.monotonic()
+    asked: Dict[int, float] = {}
+
+    async def receive():
+        async for ev in events():
+            res["events"] += 1
+            kind = ev.get("type")
+            now = time.monotonic()
+            if kind == "transcript":
+                res["transcripts"] += 1
+                asked[ev["seg_id"]] = now
+                if speed > 0:
+                    # gönderilen akış zamanına göre gecikme: konuşmanın bittiği an → transkript
+                    res["lag"].append(now - t0 - ev["audio_end_sec"] / speed)
+            elif kind == "answer_done":
+                res["answers"] += 1
+                if ev.get("ttft_ms") is not None and ev["seg_id"] in asked:
+                    res["ttft"].append(ev["ttft_ms"] / 1000.0)
+            elif kind == "error":
+                res["error"] = ev.get("error")
+                if str(ev.get("error", "")).startswith("busy"):
+                    res["rejected"] = True
+            elif kind == "done":
+                return
+
+    rtask = asyncio.ensure_future(receive())
+    chunk = int(sr * chunk_ms / 1000) * 2
+    try:
+        for i, off in enumerate(range(0, len(pcm), chunk)):
+            if rtask.done():
+                break
+            if speed > 0:
+                delay = t0 + i * chunk_ms / 1000.0 / speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            send(pcm[off:off + chunk])
+            await writer.drain()
+        if not rtask.done():
+            end()
+            await writer.drain()
+        await rtask
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        res["error"] = res["error"] or str(e) or type(e).__name__
+    finally:
+        rtask.cancel()
+        writer.close()
+    return res
+
+
+def load_test(host: str, port: int, paths: List[str], clients: int, proto: str = "ws",
+              speed: float = 1.0, answer: bool = False, sr: int = 16000, ramp_sec: float = 0.0) -> dict:
+    """`clients` concurrent sessions replaying `paths` (cycled); lag/TTFT percentiles over all sessions."""
+    from .metrics import percentiles
+
+    pcms = [_read_pcm(p, sr) for p in paths]
+
+    async def run_all():
+        async def one(i: int):
+            if ramp_sec:
+                await asyncio.sleep(ramp_sec * i / max(1, clients))
+            return await _client(host, port, pcms[i % len(pcms)], proto, speed, "c{0}".format(i), answer, sr)
+        return await asyncio.gather(*(one(i) for i in range(clients)))
+
+    t0 = time.perf_counter()
+    results = asyncio.run(run_all())
+    wall = time.perf_counter() - t0
+    lag = [x for r in results for x in r["lag"]]
+    ttft = [x for r in results for x in r["ttft"]]
+
+    def ms(st: dict) -> dict:
+        return {k: (v if k == "count" else round(v * 1000.0, 1)) for k, v in st.items()}
+
+    return {
+        "clients": clients,
+        "proto": proto,
+        "speed": speed,
+        "wall_sec": round(wall, 2),
+        "audio_sec": round(sum(len(pcms[i % len(pcms)]) for i in range(clients)) / 2.0 / sr, 1),
+        "rejected": sum(r["rejected"] for r in results),
+        "errors": sorted({r["error"] for r in results if r["error"] and not r["rejected"]}),
+        "transcripts": sum(r["transcripts"] for r in results),
+        "answers": sum(r["answers"] for r in results),
+        "lag_ms": ms(percentiles(lag, (50, 90, 99))),
+        "ttft_ms": ms(percentiles(ttft, (50, 90, 99))),
+    }
+
+
+def load_main(argv=None):
+    p = argparse.ArgumentParser(prog="waa ingest-load", description="Stream files into a running `waa serve` from N clients")
+    p.add_argument("audio", nargs="+", help="WAV (mono 16-bit 16 kHz) or raw int16 PCM, cycled over clients")
+    p.add_argument("--host", type=str, default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8790)
+    p.add_argument("--clients", type=int, default=4)
+    p.add_argument("--proto", choices=("ws", "tcp"), default="ws")
+    p.add_argument("--speed", type=float, default=1.0, help="1 = real time, 0 = as fast as possible")
+    p.add_argument("--ramp-sec", type=float, default=0.0, help="Spread client starts over this many seconds")
+    p.add_argument("--answer", action="store_true", help="Ask the server to answer questions too")
+    p.add_argument("--json", type=str, default=None)
+    args = p.parse_args(argv)
+
+    report = load_test(args.host, args.port, args.audio, args.clients, args.proto, args.speed,
+                       args.answer, ramp_sec=args.ramp_sec)
+    print("clients={clients} ({proto}, speed {speed}): {transcripts} transcripts, {answers} answers, "
+          "{rejected} rejected in {wall_sec}s".format(**report))
+    lag = report["lag_ms"]
+    if lag.get("count"):
+        print("  speech end → transcript ms: p50 {0} / p90 {1} / p99 {2}".format(lag["p50"], lag["p90"], lag["p99"]))
+    if report["ttft_ms"].get("count"):
+        t = report["ttft_ms"]
+        print("  answer TTFT ms: p50 {0} / p90 {1} / p99 {2}".format(t["p50"], t["p90"], t["p99"]))
+    for e in report["errors"]:
+        print("  ⚠️", e)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print("JSON →", args.json)
+    return report
@@ -1,6 +1,9 @@
 # src/waa/llm.py
+import asyncio
 import os
-from openai import OpenAI
+import queue
+import threading
+from typing import Callable, Iterator, Optional
 
 # --- Project-specific guardrails / constraints ---
 LIB_WHITELIST = [
@@ -33,29 +36,334 @@ Formatting:
 - If a list is helpful, keep it to 3 bullets max.
 """
 
-class ChatAssistant:
-    def __init__(self, model: str = "gpt-4o-mini"):
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
+def _api_key(base_url: Optional[str]) -> str:
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        if not base_url:
             raise RuntimeError("OPENAI_API_KEY missing")
-        self.client = OpenAI(api_key=api_key)
+        api_key = "sk-local"   # yerel/uyumlu sunucu anahtar istemeyebilir
+    return api_key
+
+
+def _messages(question: str, context=None):
+    if context is not None:
+        return context.messages(question, SYSTEM_PROMPT)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": question},
+    ]
+
+
+def _summary_messages(summary: str, lines, limit: int):
+    from .context import SUMMARY_PROMPT
+
+    body = ("Existing summary:\n" + summary + "\n\n" if summary else "") + "New transcript lines:\n" + "\n".join(lines)
+    return [
+        {"role": "system", "content": SUMMARY_PROMPT.format(limit)},
+        {"role": "user", "content": body},
+    ]
+
+
+def _token(chunk) -> Optional[str]:
+    try:
+        return getattr(chunk.choices[0].delta, "content", None)
+    except Exception:
+        return None
+
+
+def _usage(chunk) -> Optional[dict]:
+    """Final chunk's usage (stream_options include_usage) → token counts incl. provider cache hits."""
+    u = getattr(chunk, "usage", None)
+    if not u:
+        return None
+    details = getattr(u, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(u, "prompt_tokens", 0) or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0,
+        "completion_tokens": getattr(u, "completion_tokens", 0) or 0,
+    }
+
+
+class AnswerStream:
+    """Token iterator returned by stream_answer; `usage` is this call's token
+    counts (set from the final chunk when the request asked for them)."""
+    def __init__(self, tokens: Callable[[dict], Iterator[str]]):
+        # üretece yalnızca sözlük verilir: döngüsel referans yok, bırakılan akış hemen kapanır
+        self._info: dict = {}
+        self._tokens = tokens(self._info)
+
+    @property
+    def usage(self) -> Optional[dict]:
+        return self._info.get("usage")
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._tokens)
+
+    def close(self):
+        close = getattr(self._tokens, "close", None)
+        if close is not None:
+            close()
+
+    def cancel(self):
+        """Thread-safe: aborts the request without waiting for the next token
+        (close() is only safe from the consuming thread)."""
+        cancel = self._info.get("cancel")
+        if cancel is not None:
+            cancel()
+
+
+class ChatAssistant:
+    def __init__(self, model: str = "gpt-4o-mini", base_url: Optional[str] = None, context=None):
+        """`context`: waa.context.MeetingContext → rolling meeting memory in every prompt."""
+        api_key = _api_key(base_url)
+        from openai import OpenAI   # ağır import: yalnızca asistan kurulurken
+
+        self.client = OpenAI(api_key=api_key, base_url=base_url)
         self.model = model
+        self.context = context
 
-    def stream_answer(self, question: str):
+    def stream_answer(self, question: str) -> AnswerStream:
+        return AnswerStream(lambda info: self._stream(question, info))
+
+    def _stream(self, question: str, info: dict):
+        extra = {"stream_options": {"include_usage": True}} if self.context is not None else {}
         stream = self.client.chat.completions.create(
             model=self.model,
             stream=True,
             temperature=0.2,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": question},
-            ],
+            messages=_messages(question, self.context),
+            **extra,
+        )
+        info["cancel"] = stream.close
+        try:
+            for chunk in stream:
+                token = _token(chunk)
+                if token:
+                    yield token
+                elif extra:
+                    info["usage"] = _usage(chunk) or info.get("usage")
+        finally:
+            # erken bırakılan (iptal edilen) akışta HTTP bağlantısını kapat
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    def summarize(self, summary: str, lines, limit: int = 250) -> str:
+        """Running meeting summary for MeetingContext (non-streaming, small output)."""
+        resp = self.client.chat.completions.create(
+            model=self.model,
+            temperature=0.0,
+            max_tokens=int(limit * 2),
+            messages=_summary_messages(summary, lines, limit),
+        )
+        return resp.choices[0].message.content or ""
+
+
+_END = object()
+
+
+class AsyncChatAssistant:
+    """asyncio answer backend on a private event-loop thread.
+
+    - one pooled httpx.AsyncClient shared by every request (keep-alive)
+    - per-phase timeouts: connect, first token, total
+    - optional hedging: if no token arrived after `hedge_after_sec`, a second
+      identical request is sent and whichever streams first wins
+    - stream_answer() returns an AnswerStream like ChatAssistant's; closing it
+      (e.g. a newer question superseded it) cancels the request at once
+    """
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        base_url: Optional[str] = None,
+        connect_timeout: float = 3.0,
+        first_token_timeout: float = 8.0,
+        total_timeout: float = 45.0,
+        hedge_after_sec: Optional[float] = None,
+        max_connections: int = 8,
+        context=None,
+    ):
+        api_key = _api_key(base_url)
+        import httpx
+        from openai import AsyncOpenAI
+
+        self.model = model
+        self.context = context
+        self.first_token_timeout = first_token_timeout
+        self.total_timeout = total_timeout
+        self.hedge_after = hedge_after_sec or None
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="waa-llm-loop", daemon=True)
+        self._thread.start()
+
+        async def make_client():
+            http = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                timeout=httpx.Timeout(total_timeout, connect=connect_timeout),
+            )
+            return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http, max_retries=0)
+
+        self.client = asyncio.run_coroutine_threadsafe(make_client(), self.loop).result()
+        # sayaçlar
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.errors = 0
+
+    async def _tokens(self, question: str, messages):
+        self.requests += 1
+        extra = {"stream_options": {"include_usage": True}} if self.context is not None else {}
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            stream=True,
+            temperature=0.2,
+            messages=messages,
+            **extra,
         )
-        for chunk in stream:
-            try:
-                delta = chunk.choices[0].delta
-                token = getattr(delta, "content", None)
-            except Exception:
-                token = None
-            if token:
-                yield token
+        try:
+            async for chunk in stream:
+                token = _token(chunk)
+                if token:
+                    yield token
+                elif extra:
+                    usage = _usage(chunk)
+                    if usage:
+                        yield usage   # dict: tokenlardan ayrılır, yalnızca kazanan isteğinki akışa ulaşır
+        finally:
+            await stream.close()
+
+    async def _first_token(self, question: str):
+        """→ (async generator, first token); handles hedging and the first-token timeout."""
+        deadline = self.loop.time() + self.first_token_timeout
+        gens = {}
+        # mesajlar bir kez kurulur: hedge isteği aynı prompt'u (aynı önbellek önekini) gönderir
+        messages = _messages(question, self.context)
+        primary = self._tokens(question, messages)
+        t = asyncio.ensure_future(primary.__anext__())
+        gens[t] = primary
+        hedged = False
+        last_error: Optional[BaseException] = None
+        try:
+            while gens:
+                timeout = deadline - self.loop.time()
+                if self.hedge_after and not hedged:
+                    timeout = min(timeout, self.hedge_after)
+                if timeout <= 0:
+                    raise asyncio.TimeoutError("first token")
+                done, _ = await asyncio.wait(list(gens), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if self.hedge_after and not hedged and self.loop.time() < deadline:
+                        hedged = True
+                        self.hedges += 1
+                        backup = self._tokens(question, messages)
+                        gens[asyncio.ensure_future(backup.__anext__())] = backup
+                        continue
+                    raise asyncio.TimeoutError("first token")
+                for task in done:
+                    gen = gens.pop(task)
+                    if task.exception() is None:
+                        if gen is not primary:
+                            self.hedge_wins += 1
+                        return gen, task.result()
+                    last_error = task.exception()
+            raise last_error or RuntimeError("empty answer stream")
+        finally:
+            for task, gen in gens.items():   # kaybedenler
+                task.cancel()
+                try:
+                    await gen.aclose()
+                except BaseException:
+                    pass
+
+    async def _answer(self, question: str, out: "queue.Queue"):
+        deadline = self.loop.time() + self.total_timeout
+        gen = None
+        try:
+            gen, first = await self._first_token(question)
+            out.put(first)
+            while True:
+                remaining = deadline - self.loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError("total")
+                try:
+                    out.put(await asyncio.wait_for(gen.__anext__(), remaining))
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise asyncio.TimeoutError("total")
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            # cancel() ile başka iş parçacığından kesildiyse tüketici yarım cevabı tamamlanmış sanmasın
+            out.put(RuntimeError("answer cancelled"))
+        except asyncio.TimeoutError as e:
+            self.timeouts += 1
+            out.put(TimeoutError("answer timed out ({0})".format(str(e) or "phase")))
+        except Exception as e:
+            self.errors += 1
+            out.put(e)
+        finally:
+            if gen is not None:
+                try:
+                    await gen.aclose()
+                except BaseException:
+                    pass
+            out.put(_END)
+
+    def stream_answer(self, question: str) -> AnswerStream:
+        return AnswerStream(lambda info: self._stream(question, info))
+
+    def _stream(self, question: str, info: dict):
+        out: "queue.Queue" = queue.Queue()
+        fut = asyncio.run_coroutine_threadsafe(self._answer(question, out), self.loop)
+        info["cancel"] = fut.cancel
+        try:
+            while True:
+                item = out.get()
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                if isinstance(item, dict):
+                    info["usage"] = item
+                    continue
+                yield item
+        finally:
+            fut.cancel()   # erken kapatıldıysa (yeni soru geldi) isteği iptal et
+
+    def summarize(self, summary: str, lines, limit: int = 250) -> str:
+        """Running meeting summary for MeetingContext; runs on the client loop."""
+        async def _create():
+            resp = await asyncio.wait_for(self.client.chat.completions.create(
+                model=self.model,
+                temperature=0.0,
+                max_tokens=int(limit * 2),
+                messages=_summary_messages(summary, lines, limit),
+            ), self.total_timeout)
+            return resp.choices[0].message.content or ""
+
+        return asyncio.run_coroutine_threadsafe(_create(), self.loop).result()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+        }
+
+    def close(self):
+        async def _close():
+            await self.client.close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_close(), self.loop).result(timeout=2)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,300 @@
+# --- src/waa/metrics.py ---
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# saniye; Prometheus histogram kovaları (+Inf ayrıca)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def percentiles(values: Sequence[float], ps=(50, 90, 95, 99)) -> Dict[str, float]:
+    """Linear-interpolated percentiles plus count/mean/max (empty → count only)."""
+    xs = sorted(values)
+    out = {"count": len(xs)}
+    if not xs:
+        return out
+    for p in ps:
+        k = (len(xs) - 1) * p / 100.0
+        lo = int(k)
+        hi = min(lo + 1, len(xs) - 1)
+        out["p{0}".format(p)] = xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+    out["mean"] = sum(xs) / len(xs)
+    out["max"] = xs[-1]
+    return out
+
+
+def _key(name: str, labels: dict) -> Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_str(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = ['{0}="{1}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _bucket_labels(buckets: Sequence[float]):
+    return ["{0:g}".format(b) for b in buckets] + ["+Inf"]
+
+
+class Histogram:
+    """Cumulative bucket counts (for Prometheus) + a bounded reservoir of recent samples (for percentiles)."""
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, reservoir: int = 4096):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=reservoir)
+
+    def observe(self, v: float):
+        i = 0
+        while i < len(self.buckets) and v > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += v
+        self.recent.append(v)
+
+
+class Metrics:
+    """Thread-safe registry of histograms (seconds), counters and gauges.
+
+    Names are plain identifiers; optional keyword labels become Prometheus
+    labels (`inc("segments", reason="silence")`).
+    """
+    def __init__(self, prefix: str = "waa"):
+        self.prefix = prefix
+        self.t_start = time.time()
+        self._hist: Dict[Key, Histogram] = {}
+        self._counters: Counter = Counter()
+        self._gauges: Dict[Key, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, **labels):
+        k = _key(name, labels)
+        with self._lock:
+            h = self._hist.get(k)
+            if h is None:
+                h = self._hist[k] = Histogram()
+            h.observe(seconds)
+
+    def inc(self, name: str, n: int = 1, **labels):
+        with self._lock:
+            self._counters[_key(name, labels)] += n
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = float(value)
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def summary(self) -> dict:
+        """JSON-friendly snapshot: percentiles in ms per span, counters, gauges."""
+        def flat(k: Key) -> str:
+            name, labels = k
+            return name + ("{" + ",".join("{0}={1}".format(a, b) for a, b in labels) + "}" if labels else "")
+
+        with self._lock:
+            spans = {flat(k): (list(h.recent), h.count) for k, h in self._hist.items()}
+            counters = {flat(k): v for k, v in self._counters.items()}
+            gauges = {flat(k): v for k, v in self._gauges.items()}
+        out_spans = {}
+        for name, (recent, total) in sorted(spans.items()):
+            st = percentiles(recent, (50, 90, 99))
+            st = {k: (v if k == "count" else round(v * 1000.0, 2)) for k, v in st.items()}
+            st["count"] = total
+            out_spans[name] = st
+        return {
+            "uptime_sec": round(time.time() - self.t_start, 1),
+            "spans_ms": out_spans,
+            "counters": dict(sorted(counters.items())),
+            "gauges": dict(sorted(gauges.items())),
+        }
+
+    def prometheus_text(self) -> str:
+        p = self.prefix
+        lines = []
+        with self._lock:
+            hists = sorted(self._hist.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            typed = set()
+            for (name, labels), h in hists:
+                metric = "{0}_{1}_seconds".format(p, name)
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append("# TYPE {0} histogram".format(metric))
+                acc = 0
+                for le, c in zip(_bucket_labels(h.buckets), h.counts):
+                    acc += c
+                    lines.append("{0}_bucket{1} {2}".format(metric, _label_str(labels, 'le="{0}"'.format(le)), acc))
+                lines.append("{0}_sum{1} {2:.6f}".format(metric, _label_str(labels), h.sum))
+                lines.append("{0}_count{1} {2}".format(metric, _label_str(labels), h.count))
+            for (name, labels), v in counters:
+                metric = "{0}_{1}_total".format(p, name)
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append("# TYPE {0} counter".format(metric))
+                lines.append("{0}{1} {2}".format(metric, _label_str(labels), v))
+            for (name, labels), v in gauges:
+                metric = "{0}_{1}".format(p, name)
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append("# TYPE {0} gauge".format(metric))
+                lines.append("{0}{1} {2:g}".format(metric, _label_str(labels), v))
+        return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path: Path, text: str):
+    # node_exporter textfile collector yarım dosya görmesin
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(str(tmp), str(path))
+
+
+class MetricsReporter:
+    """Writes `metrics.json` (summary) and `metrics.prom` (Prometheus text) every `interval` seconds.
+
+    `collect` runs before each write to refresh gauges (queue depths etc.).
+    """
+    def __init__(self, metrics: Metrics, out_dir, interval: float = 10.0, collect: Optional[Callable[[], None]] = None):
+        self.metrics = metrics
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.json_path = self.out_dir / "metrics.json"
+        self.prom_path = self.out_dir / "metrics.prom"
+        self.interval = max(0.5, float(interval))
+        self.collect = collect
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="waa-metrics", daemon=True)
+
+    def start(self) -> "MetricsReporter":
+        self._thread.start()
+        return self
+
+    def write(self) -> dict:
+        if self.collect is not None:
+            self.collect()
+        summary = self.metrics.summary()
+        _write_atomic(self.json_path, json.dumps(summary, indent=2))
+        _write_atomic(self.prom_path, self.metrics.prometheus_text())
+        return summary
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print("⚠️ metrics write failed:", e)
+
+    def stop(self) -> dict:
+        """Stops the thread and writes the final snapshot."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(self.interval + 1.0)
+        return self.write()
+
+
+class StageProfiler:
+    """Optional profiler around the ASR / LLM stage callables.
+
+    kind="cprofile": one cProfile.Profile per stage, dumped to `<stage>.prof`
+    (open with `python -m pstats` or snakeviz). Only one cProfile can be
+    active at a time on Python 3.12+, so a call that overlaps another
+    stage's profiled call runs unprofiled and is counted as skipped.
+    kind="sample": a background thread samples the stacks of threads that
+    are inside a wrapped stage every `interval` seconds and writes
+    `profile.collapsed` (flamegraph.pl / speedscope input).
+    """
+    def __init__(self, kind: str, out_dir, interval: float = 0.005):
+        if kind not in ("cprofile", "sample"):
+            raise ValueError("profile must be cprofile or sample, got {0!r}".format(kind))
+        self.kind = kind
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        self.skipped: Counter = Counter()
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._active: Dict[int, str] = {}        # thread ident → stage
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        if kind == "sample":
+            self._sampler = threading.Thread(target=self._sample_loop, name="waa-profiler", daemon=True)
+            self._sampler.start()
+
+    def wrap(self, stage: str, fn: Callable) -> Callable:
+        if self.kind == "sample":
+            def sampled(*args, **kwargs):
+                ident = threading.get_ident()
+                self._active[ident] = stage
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self._active.pop(ident, None)
+            return sampled
+
+        prof = self._profiles.setdefault(stage, cProfile.Profile())
+
+        def profiled(*args, **kwargs):
+            with self._lock:
+                try:
+                    prof.enable()
+                    on = True
+                except ValueError:
+                    self.skipped[stage] += 1
+                    on = False
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if on:
+                    prof.disable()
+        return profiled
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for ident, stage in active.items():
+                f = frames.get(ident)
+                stack = []
+                while f is not None:
+                    code = f.f_code
+                    stack.append("{0}:{1}".format(Path(code.co_filename).name, code.co_name))
+                    f = f.f_back
+                if stack:
+                    self._stacks[stage + ";" + ";".join(reversed(stack))] += 1
+
+    def close(self) -> list:
+        """Stops sampling and writes the profile files; returns their paths."""
+        paths = []
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join(1.0)
+            path = self.out_dir / "profile.collapsed"
+            path.write_text("".join("{0} {1}\n".format(s, n) for s, n in self._stacks.most_common()), encoding="utf-8")
+            paths.append(path)
+        for stage, prof in self._profiles.items():
+            path = self.out_dir / "{0}.prof".format(stage)
+            prof.dump_stats(str(path))
+            paths.append(path)
+        return paths
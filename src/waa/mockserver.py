@@ -0,0 +1,393 @@
+# --- src/waa/mockserver.py ---
+import argparse
+import json
+import math
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import yaml
+
+DEFAULT_ANSWER = (
+    "We keep the hot path stateless, shard consumers by tenant "
+    "and scale out horizontally behind the queue."
+)
+
+
+@dataclass
+class MockSettings:
+    ttft_ms: float = 300.0
+    ttft_jitter_ms: float = 80.0
+    token_ms: float = 20.0
+    token_jitter_ms: float = 8.0
+    dist: str = "normal"              # normal | lognormal | fixed
+    p_429: float = 0.0
+    p_500: float = 0.0
+    p_disconnect: float = 0.0         # akış ortasında bağlantıyı kopar
+    max_concurrency: int = 16         # aşılırsa 429
+    default_answer: str = DEFAULT_ANSWER
+    script: List[Tuple["re.Pattern", str]] = field(default_factory=list)
+    seed: Optional[int] = None
+
+
+def load_script(path) -> List[Tuple["re.Pattern", str]]:
+    """YAML/JSON list of {match: regex, answer: text}; first match wins."""
+    data = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or []
+    return [(re.compile(item["match"], re.IGNORECASE), str(item["answer"])) for item in data]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _json(self, code: int, body: dict, headers: Optional[dict] = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, code: int, kind: str, message: str):
+        headers = {"Retry-After": "1"} if code == 429 else None
+        self._json(code, {"error": {"message": message, "type": kind, "code": kind}}, headers)
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._json(200, self.server.mock.stats())
+        elif self.path.rstrip("/").endswith("/models"):
+            self._json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        else:
+            self._error(404, "not_found", self.path)
+
+    def do_POST(self):
+        mock = self.server.mock
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        try:
+            req = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._error(400, "invalid_request_error", "bad JSON")
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._error(404, "not_found", self.path)
+            return
+        n = mock.count("requests")
+        if not mock.acquire():
+            self._error(429, "rate_limit_exceeded", "mock concurrency limit reached")
+            return
+        try:
+            self._complete(mock, req, n)
+        except (BrokenPipeError, ConnectionResetError):
+            mock.count("client_closed")
+        finally:
+            mock.release()
+
+    def _complete(self, mock: "MockOpenAIServer", req: dict, n: int):
+        fault = mock.pick_fault()
+        if fault == "429":
+            self._error(429, "rate_limit_exceeded", "injected 429")
+            return
+        if fault == "500":
+            self._error(500, "server_error", "injected 500")
+            return
+        question = ""
+        for m in req.get("messages") or []:
+            if m.get("role") == "user":
+                question = str(m.get("content") or "")
+        words = mock.answer_for(question).split(" ")
+        tokens = [w if i == 0 else " " + w for i, w in enumerate(words)]
+        model = req.get("model") or "mock"
+        cid = "chatcmpl-mock-{0}".format(n)
+        created = int(time.time())
+
+        time.sleep(mock.sample(mock.settings.ttft_ms, mock.settings.ttft_jitter_ms))
+        if not req.get("stream"):
+            self._json(200, {
+                "id": cid, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(tokens)}}],
+            })
+            mock.count("completed")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        cut = mock.cut_point(len(tokens)) if fault == "disconnect" else None
+
+        def event(delta: dict, finish=None) -> bytes:
+            chunk = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            return ("data: " + json.dumps(chunk) + "\n\n").encode("utf-8")
+
+        self._chunk(event({"role": "assistant", "content": ""}))
+        for i, tok in enumerate(tokens):
+            if i:
+                time.sleep(mock.sample(mock.settings.token_ms, mock.settings.token_jitter_ms))
+            if cut is not None and i == cut:
+                mock.count("disconnects")
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+            self._chunk(event({"content": tok}))
+        self._chunk(event({}, "stop"))
+        if (req.get("stream_options") or {}).get("include_usage"):
+            usage = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [], "usage": mock.usage(req.get("messages") or [], "".join(tokens))}
+            self._chunk(("data: " + json.dumps(usage) + "\n\n").encode("utf-8"))
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+        mock.count("completed")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    mock: "MockOpenAIServer"
+
+
+class MockOpenAIServer:
+    """Local OpenAI-compatible chat-completions server (streaming + non-streaming).
+
+    Delays, error injection and concurrency limits come from MockSettings;
+    GET /v1/stats returns counters. Point the app at it with
+    `assistant.base_url: http://127.0.0.1:<port>/v1`.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, settings: Optional[MockSettings] = None):
+        self.settings = settings or MockSettings()
+        self._rng = random.Random(self.settings.seed)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "completed": 0, "rejected": 0, "injected_429": 0,
+                          "injected_500": 0, "disconnects": 0, "client_closed": 0}
+        self.active = 0
+        self.max_active = 0
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.mock = self
+        self._thread: Optional[threading.Thread] = None
+        self._last_prompt = ""
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return "http://{0}:{1}/v1".format(host, port)
+
+    def count(self, name: str) -> int:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.active >= self.settings.max_concurrency:
+                self._counters["rejected"] += 1
+                return False
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+    def pick_fault(self) -> Optional[str]:
+        s = self.settings
+        with self._lock:
+            r = self._rng.random()
+        if r < s.p_429:
+            self.count("injected_429")
+            return "429"
+        if r < s.p_429 + s.p_500:
+            self.count("injected_500")
+            return "500"
+        if r < s.p_429 + s.p_500 + s.p_disconnect:
+            return "disconnect"
+        return None
+
+    def cut_point(self, n_tokens: int) -> int:
+        with self._lock:
+            return self._rng.randint(1, max(1, n_tokens - 1))
+
+    def sample(self, mean_ms: float, jitter_ms: float) -> float:
+        """Delay in seconds from the configured distribution (never negative)."""
+        if mean_ms <= 0:
+            return 0.0
+        with self._lock:
+            if self.settings.dist == "fixed" or jitter_ms <= 0:
+                v = mean_ms
+            elif self.settings.dist == "lognormal":
+                # ortalaması mean_ms, standart sapması ~jitter_ms olan lognormal
+                sigma2 = math.log(1.0 + (jitter_ms / mean_ms) ** 2)
+                mu = math.log(mean_ms) - sigma2 / 2.0
+                v = self._rng.lognormvariate(mu, sigma2 ** 0.5)
+            else:
+                v = self._rng.gauss(mean_ms, jitter_ms)
+        return max(0.0, v) / 1000.0
+
+    def usage(self, messages: list, completion: str) -> dict:
+        """OpenAI-style usage with prompt caching simulated: the prefix shared with
+        the previous request counts as cached, in 128-token blocks from 1024 up."""
+        prompt = "".join(str(m.get("role")) + "\x1f" + str(m.get("content") or "") + "\x1e" for m in messages)
+        with self._lock:
+            prev, self._last_prompt = self._last_prompt, prompt
+        same = 0
+        for a, b in zip(prompt, prev):
+            if a != b:
+                break
+            same += 1
+        prompt_tokens = (len(prompt) + 3) // 4
+        cached = (same // 4) // 128 * 128
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": (len(completion) + 3) // 4,
+            "total_tokens": prompt_tokens + (len(completion) + 3) // 4,
+            "prompt_tokens_details": {"cached_tokens": cached if cached >= 1024 else 0},
+        }
+
+    def answer_for(self, question: str) -> str:
+        for pattern, answer in self.settings.script:
+            if pattern.search(question):
+                return answer
+        return self.settings.default_answer
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._counters)
+            out.update(active=self.active, max_active=self.max_active)
+            return out
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="waa-mock-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def load_test(assistant, requests: int = 50, concurrency: int = 4, question: str = "How would you scale this API?") -> dict:
+    """Fire `requests` answers through `assistant.stream_answer` with `concurrency` workers."""
+    from .bench import _ms, percentiles
+
+    ttft: List[float] = []
+    total: List[float] = []
+    errors: Counter = Counter()
+    lock = threading.Lock()
+
+    def one(_):
+        t0 = time.perf_counter()
+        first = None
+        try:
+            for _tok in assistant.stream_answer(question):
+                if first is None:
+                    first = time.perf_counter() - t0
+        except Exception as e:
+            with lock:
+                errors[type(e).__name__] += 1
+            return
+        with lock:
+            if first is not None:
+                ttft.append(first)
+            total.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="waa-load") as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t0
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": len(total),
+        "errors": dict(errors),
+        "wall_sec": round(wall, 3),
+        "answers_per_sec": round(len(total) / wall, 2) if wall else 0.0,
+        "ttft_ms": _ms(percentiles(ttft)),
+        "total_ms": _ms(percentiles(total)),
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="waa mock-server", description="Local OpenAI-compatible mock for offline tests")
+    p.add_argument("--host", type=str, default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--ttft-ms", type=float, default=300.0, help="Mean time to first token")
+    p.add_argument("--ttft-jitter-ms", type=float, default=80.0)
+    p.add_argument("--token-ms", type=float, default=20.0, help="Mean inter-token delay")
+    p.add_argument("--token-jitter-ms", type=float, default=8.0)
+    p.add_argument("--dist", choices=("normal", "lognormal", "fixed"), default="normal")
+    p.add_argument("--p-429", type=float, default=0.0, help="Probability of an injected 429")
+    p.add_argument("--p-500", type=float, default=0.0, help="Probability of an injected 500")
+    p.add_argument("--p-disconnect", type=float, default=0.0, help="Probability of a mid-stream disconnect")
+    p.add_argument("--max-concurrency", type=int, default=16, help="Concurrent streams before 429")
+    p.add_argument("--script", type=str, default=None, help="YAML/JSON list of {match, answer}")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--load", type=int, default=0, help="Run N answers against the server in-process and exit")
+    p.add_argument("--concurrency", type=int, default=4, help="Parallel clients for --load")
+    p.add_argument("--backend", choices=("sync", "async"), default="async", help="Client used for --load")
+    p.add_argument("--json", type=str, default=None, help="Write the --load report as JSON to this path")
+    args = p.parse_args(argv)
+
+    settings = MockSettings(
+        ttft_ms=args.ttft_ms, ttft_jitter_ms=args.ttft_jitter_ms,
+        token_ms=args.token_ms, token_jitter_ms=args.token_jitter_ms, dist=args.dist,
+        p_429=args.p_429, p_500=args.p_500, p_disconnect=args.p_disconnect,
+        max_concurrency=args.max_concurrency,
+        script=load_script(args.script) if args.script else [],
+        seed=args.seed,
+    )
+    server = MockOpenAIServer(args.host, args.port, settings)
+    if args.load:
+        return _run_load(server, args)
+    print("🧪 Mock OpenAI server on", server.url, "(Ctrl+C to stop)")
+    print("   settings.yaml → assistant.base_url:", server.url)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping...", json.dumps(server.stats()))
+    finally:
+        server.httpd.server_close()
+
+
+def _run_load(server: MockOpenAIServer, args) -> dict:
+    from .bench import _fmt
+    from .llm import AsyncChatAssistant, ChatAssistant
+
+    server.start()
+    if args.backend == "async":
+        assistant = AsyncChatAssistant("mock", base_url=server.url, max_connections=max(1, args.concurrency))
+    else:
+        assistant = ChatAssistant("mock", base_url=server.url)
+    try:
+        report = load_test(assistant, args.load, args.concurrency)
+    finally:
+        close = getattr(assistant, "close", None)
+        if close is not None:
+            close()
+        server.stop()
+    report["backend"] = args.backend
+    report["server"] = server.stats()
+    print("[{0}] {1}/{2} ok, {3} answers/s, errors {4}".format(
+        args.backend, report["ok"], report["requests"], report["answers_per_sec"], report["errors"] or "-"))
+    print("  time to first token (ms):", _fmt(report["ttft_ms"]))
+    print("  full answer (ms):", _fmt(report["total_ms"]))
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print("JSON →", args.json)
+    return report
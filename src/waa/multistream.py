@@ -0,0 +1,466 @@
+# --- src/waa/multistream.py ---
+import argparse
+import json
+import platform
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import yaml
+
+from .audio import FileSource, MicSegmenter
+from .endpoint import AdaptiveEndpointer
+from .pipeline import QueueClosed, SegmentJob, merge_segments
+
+
+@dataclass
+class StreamSpec:
+    label: str                       # konuşmacı / kaynak etiketi (ör. "me", "remote")
+    device: Optional[int] = None     # mikrofon / loopback cihaz indeksi
+    input: Optional[str] = None      # ya da WAV / raw PCM dosyası
+    speed: float = 1.0               # dosya için oynatma hızı
+
+
+def parse_stream(spec: str) -> StreamSpec:
+    """`label=mic`, `label=mic:3` or `label=path/to/file.wav`."""
+    label, _, src = spec.partition("=")
+    if not label or not src:
+        raise ValueError("stream must look like label=mic[:index] or label=file.wav, got {0!r}".format(spec))
+    if src == "mic":
+        return StreamSpec(label)
+    if src.startswith("mic:"):
+        return StreamSpec(label, device=int(src[4:]))
+    return StreamSpec(label, input=src)
+
+
+@dataclass
+class StreamTranscript:
+    stream: str
+    seg_id: int
+    reason: str
+    text: str
+    lang: str
+    prob: float
+    audio_sec: float
+    queue_wait_sec: float
+    decode_sec: float
+    t_done: float
+
+
+class FairQueue:
+    """Per-stream bounded queues served least-attained-service first.
+
+    get() returns the head job of the non-empty stream that has received the
+    least decoded audio so far, so a talkative stream cannot starve a quiet
+    one. A stream joining late starts at the current minimum. Overflow
+    merges into the stream's last queued job (like the `merge` policy).
+    """
+    def __init__(self, maxsize_per_stream: int = 8):
+        self.maxsize = max(1, int(maxsize_per_stream))
+        self._q: Dict[str, deque] = {}
+        self._served: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._retired = set()
+        self._closed = False
+        # sayaçlar
+        self.merged = 0
+        self.max_depth = 0
+
+    def add_stream(self, label: str):
+        with self._cond:
+            if label not in self._q:
+                self._q[label] = deque()
+                self._served[label] = min(self._served.values(), default=0.0)
+
+    def remove_stream(self, label: str):
+        """Forgets a finished stream once its queued jobs have been served."""
+        with self._cond:
+            if label in self._q and not self._q[label]:
+                del self._q[label]
+                del self._served[label]
+            elif label in self._q:
+                self._retired.add(label)
+
+    def put(self, job: SegmentJob) -> bool:
+        """Queues `job`; True if it was merged into the stream's last queued job."""
+        with self._cond:
+            if self._closed:
+                raise QueueClosed(job.stream)
+            q = self._q[job.stream]
+            merged = len(q) >= self.maxsize
+            if merged:
+                q[-1] = merge_segments(q[-1], job)
+                self.merged += 1
+            else:
+                q.append(job)
+                self.max_depth = max(self.max_depth, len(q))
+            self._cond.notify()
+            return merged
+
+    def get(self) -> SegmentJob:
+        with self._cond:
+            while True:
+                ready = [s for s, q in self._q.items() if q]
+                if ready:
+                    label = min(ready, key=self._served.__getitem__)
+                    job = self._q[label].popleft()
+                    self._served[label] += len(job.pcm16) / 2.0
+                    if label in self._retired and not self._q[label]:
+                        self._retired.discard(label)
+                        del self._q[label]
+                        del self._served[label]
+                    return job
+                if self._closed:
+                    raise QueueClosed("multistream")
+                self._cond.wait()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def depth(self) -> Dict[str, int]:
+        with self._cond:
+            return {s: len(q) for s, q in self._q.items()}
+
+
+class MultiStreamASR:
+    """Several capture streams → one FairQueue → a pool of ASR worker threads.
+
+    Every stream has its own MicSegmenter (own VAD/endpointer state) and
+    label. The workers share one WhisperModel loaded with
+    num_workers=workers, each with its own WhisperASR wrapper (float32
+    buffer), so decodes of different streams run in parallel.
+    `on_transcript` is called from the worker threads.
+    """
+    def __init__(
+        self,
+        streams: Sequence[StreamSpec],
+        make_segmenter: Callable[[StreamSpec], MicSegmenter],
+        asr_workers: Sequence,
+        on_transcript: Callable[[StreamTranscript], None],
+        language: Optional[str] = None,
+        queue_size: int = 8,
+        samplerate: int = 16000,
+    ):
+        self.streams = list(streams)
+        self.sr = samplerate
+        self.language = language
+        self.on_transcript = on_transcript
+        self.queue = FairQueue(queue_size)
+        self.error: Optional[BaseException] = None
+        self.segments: Dict[str, int] = {}
+        self.decoded_audio_sec = 0.0
+        self.decode_sec = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._captures = []
+        for spec in self.streams:
+            self.queue.add_stream(spec.label)
+            self.segments[spec.label] = 0
+            self._captures.append(threading.Thread(
+                target=self._capture_loop, args=(spec, make_segmenter(spec)),
+                name="waa-capture-" + spec.label, daemon=True,
+            ))
+        self._workers = [
+            threading.Thread(target=self._worker_loop, args=(asr,), name="waa-asr-{0}".format(i), daemon=True)
+            for i, asr in enumerate(asr_workers)
+        ]
+
+    def _capture_loop(self, spec: StreamSpec, seg: MicSegmenter):
+        seg_id = 0
+        try:
+            for pcm16, reason in seg.segments():
+                if reason == "partial":
+                    continue
+                # ring görünümü değil kopya: işçiler ne zaman alacağını bilmiyoruz
+                self.queue.put(SegmentJob(bytes(pcm16), reason, time.time(), seg_id, stream=spec.label))
+                seg_id += 1
+                with self._lock:
+                    self.segments[spec.label] += 1
+        except QueueClosed:
+            pass
+        except BaseException as e:
+            self.error = e
+
+    def _worker_loop(self, asr):
+        while True:
+            try:
+                job = self.queue.get()
+            except QueueClosed:
+                return
+            try:
+                t0 = time.perf_counter()
+                wait = max(0.0, time.time() - job.t_end)
+                text, lang, prob = asr.transcribe_segment(job.pcm16, language=self.language)
+                dt = time.perf_counter() - t0
+                audio_sec = len(job.pcm16) / 2.0 / self.sr
+                with self._lock:
+                    self.decoded_audio_sec += audio_sec
+                    self.decode_sec += dt
+                self.on_transcript(StreamTranscript(
+                    job.stream, job.seg_id, job.reason, text, lang, prob, audio_sec, wait, dt, time.time(),
+                ))
+            except Exception as e:
+                # tek segmentin hatası işçiyi (ve tüm çalışmayı) durdurmasın
+                with self._lock:
+                    self.errors += 1
+                print("⚠️ [{0}] ASR error (segment {1}): {2}".format(job.stream, job.seg_id, e))
+
+    def start(self):
+        for t in self._workers + self._captures:
+            t.start()
+
+    def wait_captures(self, poll: float = 0.2):
+        """Until every (file) stream is exhausted; mic streams run until stop()."""
+        for t in self._captures:
+            while t.is_alive() and self.error is None:
+                t.join(poll)
+
+    def stop(self, drain: bool = True):
+        """Closes the queue; with `drain` the workers finish what is already queued."""
+        if not drain:
+            with self.queue._cond:
+                for q in self.queue._q.values():
+                    q.clear()
+        self.queue.close()
+        for t in self._workers:
+            t.join()
+        if self.error is not None:
+            raise self.error
+
+    def stats(self) -> dict:
+        return {
+            "streams": len(self.streams),
+            "workers": len(self._workers),
+            "segments": dict(self.segments),
+            "decoded_audio_sec": round(self.decoded_audio_sec, 2),
+            "decode_sec": round(self.decode_sec, 2),
+            "errors": self.errors,
+            "merged": self.queue.merged,
+            "max_depth": self.queue.max_depth,
+        }
+
+
+def _audio_cfg(config_path: Optional[str]) -> dict:
+    audio = {"sample_rate": 16000, "frame_ms": 20, "vad_aggressiveness": 2,
+             "max_segment_sec": 12.0, "silence_follow_sec": 0.30, "preroll_ms": 0}
+    cfg = {}
+    if config_path and Path(config_path).exists():
+        cfg = yaml.safe_load(Path(config_path).read_text(encoding="utf-8")) or {}
+        audio.update(cfg.get("audio", {}) or {})
+    return {"audio": audio, "multistream": cfg.get("multistream", {}) or {}, "assistant": cfg.get("assistant", {}) or {}}
+
+
+def segmenter_factory(audio: dict):
+    sr = int(audio["sample_rate"])
+    silence = float(audio["silence_follow_sec"])
+
+    def make(spec: StreamSpec) -> MicSegmenter:
+        return MicSegmenter(
+            samplerate=sr,
+            frame_ms=audio["frame_ms"],
+            vad_aggressiveness=audio["vad_aggressiveness"],
+            max_segment_sec=audio["max_segment_sec"],
+            silence_follow_sec=silence,
+            preroll_ms=audio.get("preroll_ms", 0),
+            endpointer=AdaptiveEndpointer(
+                sr, silence, audio.get("min_silence_sec"), audio.get("max_silence_sec"),
+                int(audio.get("onset_frames", 1)),
+                on_db=audio.get("energy_on_db"), off_db=audio.get("energy_off_db"),
+            ),
+            device=spec.device,
+            source=(FileSource(spec.input, sr, int(sr * audio["frame_ms"] / 1000), speed=spec.speed)
+                    if spec.input else None),
+            capture_rate=audio.get("capture_rate"),
+            capture_channels=int(audio.get("capture_channels") or 0),
+        )
+    return make
+
+
+def make_workers(model_name: str, workers: int, cpu_threads: int = 0) -> list:
+    """One shared WhisperModel (num_workers=workers) and one WhisperASR wrapper per worker thread."""
+    from .asr import WhisperASR
+
+    first = WhisperASR(model_name, cpu_threads=cpu_threads, num_workers=workers)
+    return [first] + [WhisperASR(model_name, model=first.model) for _ in range(workers - 1)]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="waa multi", description="Transcribe several inputs at once with a shared ASR pool")
+    p.add_argument("--stream", action="append", default=[], metavar="LABEL=SRC",
+                   help="LABEL=mic, LABEL=mic:<index> or LABEL=<file.wav> (repeatable; default: settings multistream.streams)")
+    p.add_argument("--whisper-model", type=str, default="base")
+    p.add_argument("--config", type=str, default="configs/settings.yaml")
+    p.add_argument("--workers", type=int, default=None, help="ASR worker threads (shared model)")
+    p.add_argument("--cpu-threads", type=int, default=None, help="CTranslate2 threads per worker (0 = default)")
+    p.add_argument("--speed", type=float, default=1.0, help="Replay speed for file streams (0 = max)")
+    p.add_argument("--language", type=str, default=None, help="Force ASR language (e.g. en)")
+    p.add_argument("--answer-from", type=str, default=None,
+                   help="Comma separated labels whose English questions are answered (default: none)")
+    args = p.parse_args(argv)
+
+    cfg = _audio_cfg(args.config)
+    ms_cfg = cfg["multistream"]
+    specs = [parse_stream(s) for s in args.stream] or [
+        StreamSpec(str(s["label"]), s.get("device"), s.get("input")) for s in (ms_cfg.get("streams") or [])
+    ]
+    if not specs:
+        p.error("no streams: pass --stream LABEL=SRC or set multistream.streams in settings")
+    for s in specs:
+        s.speed = args.speed
+    workers = int(args.workers if args.workers is not None else ms_cfg.get("workers", 2))
+    cpu_threads = int(args.cpu_threads if args.cpu_threads is not None else ms_cfg.get("cpu_threads", 0))
+    answer_from = set((args.answer_from or ",".join(ms_cfg.get("answer_from") or [])).split(",")) - {""}
+
+    print("🎧 Multi-stream:", ", ".join("{0}={1}".format(s.label, s.input or "mic:{0}".format(
+        s.device if s.device is not None else "default")) for s in specs))
+    print("ASR pool: {0} x {1} (cpu_threads={2})".format(workers, args.whisper_model, cpu_threads or "auto"))
+
+    from .detect import is_english_question
+    assistant = None
+    if answer_from:
+        from .llm import ChatAssistant
+        assistant = ChatAssistant(cfg["assistant"].get("openai_model", "gpt-4o-mini"),
+                                  base_url=cfg["assistant"].get("base_url"))
+    # tek cevap iş parçacığı: cevaplar sırayla yazılır, ASR işçileri beklemez
+    answers = ThreadPoolExecutor(1, thread_name_prefix="waa-answer") if assistant is not None else None
+    print_lock = threading.Lock()
+    mid_answer = [False]    # bir cevap satırı yarım mı (araya transkript girerse satırı kır)
+
+    def answer(t: StreamTranscript):
+        with print_lock:
+            print("🤖 [{0}] ".format(t.stream), end="", flush=True)
+            mid_answer[0] = True
+        try:
+            for tok in assistant.stream_answer(t.text):
+                with print_lock:
+                    if not mid_answer[0]:
+                        print("🤖 [{0}] …".format(t.stream), end="")
+                        mid_answer[0] = True
+                    print(tok, end="", flush=True)
+        except Exception as e:
+            with print_lock:
+                print("⚠️ OpenAI error:", e, end="")
+        with print_lock:
+            print()
+            mid_answer[0] = False
+
+    def on_transcript(t: StreamTranscript):
+        if not t.text.strip():
+            return
+        with print_lock:
+            if mid_answer[0]:
+                print()
+                mid_answer[0] = False
+            print("[{0}] [{1}] ({2}, p={3:.2f}, wait {4:.0f} ms, decode {5:.0f} ms): {6}".format(
+                time.strftime("%H:%M:%S"), t.stream, t.lang, t.prob,
+                t.queue_wait_sec * 1000.0, t.decode_sec * 1000.0, t.text))
+        if answers is not None and t.stream in answer_from and is_english_question(t.text, t.lang):
+            answers.submit(answer, t)
+
+    runner = MultiStreamASR(
+        specs, segmenter_factory(cfg["audio"]), make_workers(args.whisper_model, workers, cpu_threads),
+        on_transcript, language=args.language, queue_size=int(ms_cfg.get("queue_size", 8)),
+        samplerate=int(cfg["audio"]["sample_rate"]),
+    )
+    runner.start()
+    interrupted = False
+    try:
+        runner.wait_captures()
+    except KeyboardInterrupt:
+        interrupted = True
+        print("\n🛑 Stopping...")
+    finally:
+        runner.stop()
+        if answers is not None:
+            # dosya akışları: bekleyen cevaplar bitsin; Ctrl+C: sıradakiler iptal
+            answers.shutdown(wait=not interrupted, cancel_futures=interrupted)
+        print("Multi-stream:", ", ".join("{0}={1}".format(k, v) for k, v in runner.stats().items()))
+
+
+def bench(
+    audio_paths: Sequence[str],
+    make_asr_workers: Callable[[int], list],
+    stream_counts: Sequence[int],
+    worker_counts: Sequence[int],
+    audio_cfg: dict,
+    language: Optional[str] = None,
+) -> List[dict]:
+    """Offline capacity: N copies of the input as N streams at max speed through W workers.
+
+    `realtime_streams` = decoded audio seconds per wall second; with the
+    clip's speech density that is how many live streams the pool keeps up
+    with (queues would grow beyond it).
+    """
+    from .metrics import percentiles
+
+    make_seg = segmenter_factory(audio_cfg)
+    rows = []
+    for w in worker_counts:
+        asr_workers = make_asr_workers(w)
+        for n in stream_counts:
+            specs = [StreamSpec("s{0}".format(i), input=audio_paths[i % len(audio_paths)], speed=0.0) for i in range(n)]
+            waits: List[float] = []
+            lock = threading.Lock()
+
+            def on_t(t: StreamTranscript):
+                with lock:
+                    waits.append(t.queue_wait_sec + t.decode_sec)
+
+            runner = MultiStreamASR(specs, make_seg, asr_workers, on_t, language=language, queue_size=10 ** 6,
+                                    samplerate=int(audio_cfg["sample_rate"]))
+            t0 = time.perf_counter()
+            runner.start()
+            runner.wait_captures()
+            runner.stop()
+            wall = time.perf_counter() - t0
+            st = runner.stats()
+            lat = percentiles(waits, (50, 95))
+            rows.append({
+                "workers": w,
+                "streams": n,
+                "segments": sum(st["segments"].values()),
+                "audio_sec": st["decoded_audio_sec"],
+                "wall_sec": round(wall, 3),
+                "realtime_streams": round(st["decoded_audio_sec"] / wall, 2) if wall else None,
+                "latency_p50_ms": round(lat.get("p50", 0.0) * 1000.0, 1),
+                "latency_p95_ms": round(lat.get("p95", 0.0) * 1000.0, 1),
+            })
+            r = rows[-1]
+            print("workers={workers} streams={streams}: {segments} segments, {audio_sec}s speech in {wall_sec}s "
+                  "→ {realtime_streams}x real time (p50 {latency_p50_ms} ms, p95 {latency_p95_ms} ms)".format(**r))
+    return rows
+
+
+def bench_main(argv=None):
+    p = argparse.ArgumentParser(prog="waa bench-streams", description="How many real-time streams the ASR pool sustains")
+    p.add_argument("audio", nargs="+", help="WAV (mono 16-bit) or raw int16 PCM files (one per stream, cycled)")
+    p.add_argument("--whisper-model", type=str, default="base")
+    p.add_argument("--config", type=str, default="configs/settings.yaml")
+    p.add_argument("--streams", type=str, default="1,2,4", help="Comma separated concurrent stream counts")
+    p.add_argument("--workers", type=str, default="1,2", help="Comma separated worker counts")
+    p.add_argument("--cpu-threads", type=int, default=0, help="CTranslate2 threads per worker (0 = default)")
+    p.add_argument("--language", type=str, default="en")
+    p.add_argument("--json", type=str, default=None)
+    args = p.parse_args(argv)
+
+    cfg = _audio_cfg(args.config)
+    rows = bench(
+        args.audio,
+        lambda w: make_workers(args.whisper_model, w, args.cpu_threads),
+        [int(x) for x in args.streams.split(",") if x.strip()],
+        [int(x) for x in args.workers.split(",") if x.strip()],
+        cfg["audio"],
+        language=args.language,
+    )
+    report = {"model": args.whisper_model, "cpu_threads": args.cpu_threads,
+              "machine": platform.machine(), "python": platform.python_version(), "runs": rows}
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print("JSON →", args.json)
+    return report
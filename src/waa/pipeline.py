@@ -0,0 +1,332 @@
+# --- src/waa/pipeline.py ---
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "merge")
+
+
+class QueueClosed(Exception):
+    pass
+
+
+@dataclass
+class SegmentJob:
+    pcm16: bytes          # kuyruğa girmeden önce ring görünümünden kopyalanır
+    reason: str
+    t_end: float          # segment kapandığı an (time.time())
+    seg_id: int = 0       # partial snapshot'lar kendi segmentinin id'sini taşır
+    result: Optional[Tuple[str, str, float]] = None   # scheduler önceden çözdüyse (text, lang, prob)
+    stream: str = ""      # çoklu akışta konuşmacı / kaynak etiketi
+    overlap_sec: float = 0.0   # baştaki, önceki (maxlen ile kesilmiş) segmentle ortak ses
+
+
+def merge_segments(old: SegmentJob, new: SegmentJob) -> SegmentJob:
+    """Kuyruktaki son segmente yenisini ekler (ASR tek seferde çözer).
+
+    Partials are cumulative snapshots: a newer job of the same segment
+    replaces the queued one, and a partial never displaces a final.
+    """
+    if old.seg_id == new.seg_id:
+        return new
+    if new.reason == "partial":
+        return old
+    head = bytes(new.pcm16)
+    if new.overlap_sec and new.seg_id == old.seg_id + 1:
+        # yeni segmentin başı eskinin sonu: birleştirirken ikinci kez ekleme (Whisper sesi 16 kHz)
+        head = head[int(new.overlap_sec * 16000) * 2:]
+    return SegmentJob(bytes(old.pcm16) + head, new.reason, new.t_end, new.seg_id, stream=new.stream,
+                      overlap_sec=old.overlap_sec)
+
+
+def merge_texts(old: str, new: str) -> str:
+    return "{0} {1}".format(old.rstrip(), new.lstrip())
+
+
+def merge_questions(old: Tuple[int, str], new: Tuple[int, str]) -> Tuple[int, str]:
+    """(seg_id, question) answer items: both texts, the newer segment id."""
+    return new[0], merge_texts(old[1], new[1])
+
+
+def _norm_word(word: str) -> str:
+    return word.strip().strip(".,!?;:\"'…").lower()
+
+
+class OverlapStitcher:
+    """Removes the words decoded twice across an overlapping maxlen cut.
+
+    After a "maxlen" cut the next segment starts `overlap_sec` before the
+    cut (MicSegmenter overlap_sec), so the word straddling the cut is heard
+    whole by one of the two. Both are split at the middle of the overlap by
+    word timestamps: the cut segment keeps the words whose midpoint lies
+    before it, the next one the words from it on. Without timestamps
+    (joined / batched / streaming decodes) only the text check runs: the
+    longest head of the next segment that repeats the tail of the cut one
+    (up to `max_words`) is dropped. Meant for one ASR thread.
+    """
+    def __init__(self, overlap_sec: float, samplerate: int = 16000, max_words: int = 6):
+        self.overlap_sec = float(overlap_sec)
+        self.sr = samplerate
+        self.max_words = max_words
+        self._tail: List[str] = []     # kesilen segmentin son kelimeleri (normalize)
+        # sayaçlar
+        self.cuts = 0
+        self.trimmed_words = 0
+        self.repeated_words = 0
+
+    def needs_words(self, job: SegmentJob) -> bool:
+        """Whether `job` should be decoded with word timestamps."""
+        return self.overlap_sec > 0 and job.result is None and (job.reason == "maxlen" or job.overlap_sec > 0)
+
+    def stitch(self, job: SegmentJob, text: str, words: Optional[Sequence[Tuple[float, float, str]]] = None) -> str:
+        """Text of `job` without the words that belong to its overlapping neighbour."""
+        if self.overlap_sec <= 0:
+            return text
+        limit = len(self._tail)
+        if words:
+            lo = job.overlap_sec / 2.0
+            hi = len(job.pcm16) / 2.0 / self.sr - self.overlap_sec / 2.0 if job.reason == "maxlen" else float("inf")
+            kept = [(s + e) / 2.0 for s, e, _ in words if lo <= (s + e) / 2.0 < hi]
+            text = "".join(w for s, e, w in words if lo <= (s + e) / 2.0 < hi).strip()
+            self.trimmed_words += len(words) - len(kept)
+            # zaman damgası varken metin kontrolü yalnızca hâlâ ortak bölgedeki kelimelere bakar
+            limit = min(limit, sum(1 for mid in kept if mid < job.overlap_sec))
+        toks = text.split()
+        if job.overlap_sec > 0 and limit:
+            head = [_norm_word(t) for t in toks[:limit]]
+            k = self._repeated(head)
+            if k:
+                toks = toks[k:]
+                self.repeated_words += k
+                text = " ".join(toks)
+        if job.reason == "maxlen":
+            self.cuts += 1
+            self._tail = [_norm_word(t) for t in toks[-self.max_words:]]
+        elif job.reason != "partial":
+            self._tail = []
+        return text
+
+    def _repeated(self, head: List[str]) -> int:
+        """How many head words repeat the end of the tail.
+
+        Either side may have one extra word cut in half at its edge (the
+        tail's last, the head's first); a match after skipping the head's
+        first word needs two words to count.
+        """
+        for h in (0, 1):
+            for t in (0, 1):
+                tail = self._tail[:len(self._tail) - t]
+                for k in range(min(len(head) - h, len(tail)), h, -1):
+                    if head[h:h + k] == tail[-k:]:
+                        return h + k
+        return 0
+
+    def stats(self) -> dict:
+        return {"cuts": self.cuts, "trimmed_words": self.trimmed_words, "repeated_words": self.repeated_words}
+
+
+class BoundedQueue:
+    """Bounded FIFO between stages with an overflow policy and depth counters."""
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 4,
+        policy: str = "block",
+        merge: Optional[Callable[[Any, Any], Any]] = None,
+    ):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}; use one of {OVERFLOW_POLICIES}")
+        if policy == "merge" and merge is None:
+            raise ValueError(f"Queue {name!r}: 'merge' policy needs a merge function")
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.merge = merge
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        # sayaçlar
+        self.put_count = 0
+        self.get_count = 0
+        self.dropped = 0
+        self.merged = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def put(self, item):
+        with self._cond:
+            if self._closed:
+                raise QueueClosed(self.name)
+            self.put_count += 1
+            while len(self._items) >= self.maxsize:
+                if self.policy == "drop_oldest":
+                    self._items.popleft()
+                    self.dropped += 1
+                elif self.policy == "merge":
+                    self._items[-1] = self.merge(self._items[-1], item)
+                    self.merged += 1
+                    self._cond.notify_all()
+                    return
+                else:
+                    self._cond.wait()
+                    if self._closed:
+                        raise QueueClosed(self.name)
+            self._items.append(item)
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+
+    def get(self, timeout: Optional[float] = None):
+        """Blocks until an item is available; raises QueueClosed once closed and drained."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._items:
+                if self._closed:
+                    raise QueueClosed(self.name)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            item = self._items.popleft()
+            self.get_count += 1
+            self._cond.notify_all()
+            return item
+
+    def get_nowait_if(self, predicate: Callable[[Any], bool]):
+        """Pops the head item only if it is there and predicate(item) holds; else None."""
+        with self._cond:
+            if not self._items or not predicate(self._items[0]):
+                return None
+            item = self._items.popleft()
+            self.get_count += 1
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "name": self.name,
+                "policy": self.policy,
+                "depth": len(self._items),
+                "max_depth": self.max_depth,
+                "maxsize": self.maxsize,
+                "put": self.put_count,
+                "get": self.get_count,
+                "dropped": self.dropped,
+                "merged": self.merged,
+            }
+
+
+class Pipeline:
+    """capture/VAD thread → asr_q → ASR worker → answer_q → answer worker.
+
+    `source` yields (pcm16, reason) like MicSegmenter.segments(). `asr_stage`
+    maps a SegmentJob to an item for the answer stage (or None to drop it);
+    `answer_stage` consumes those items.
+    """
+    def __init__(
+        self,
+        source: Iterable,
+        asr_stage: Callable[[SegmentJob], Any],
+        answer_stage: Callable[[Any], None],
+        asr_queue: BoundedQueue,
+        answer_queue: BoundedQueue,
+        scheduler=None,
+        overlap_sec: float = 0.0,
+    ):
+        """`scheduler`: optional object with next_jobs(asr_q) → [SegmentJob] (e.g. CoalescingScheduler).
+
+        `overlap_sec`: the source's carry after a "maxlen" cut; the next
+        segment's jobs get it as SegmentJob.overlap_sec.
+        """
+        self.source = source
+        self.overlap_sec = overlap_sec
+        self.asr_stage = asr_stage
+        self.answer_stage = answer_stage
+        self.asr_q = asr_queue
+        self.answer_q = answer_queue
+        self.scheduler = scheduler
+        self.stop_evt = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="waa-capture", daemon=True),
+            threading.Thread(target=self._asr_loop, name="waa-asr", daemon=True),
+            threading.Thread(target=self._answer_loop, name="waa-answer", daemon=True),
+        ]
+
+    def _capture_loop(self):
+        seg_id = 0
+        overlap = 0.0
+        try:
+            for pcm16, reason in self.source:
+                if self.stop_evt.is_set():
+                    break
+                # Kuyruk boş olsa da ASR o an çözüyor / model yüklüyor olabilir ve ring
+                # görünümü bu sürede üzerine yazılabilir → kuyruğa her zaman kopya girer
+                # (segment başına tek memcpy; kare başına kopya yok)
+                pcm16 = bytes(pcm16)
+                self.asr_q.put(SegmentJob(pcm16, reason, time.time(), seg_id, overlap_sec=overlap))
+                if reason != "partial":
+                    seg_id += 1
+                    overlap = self.overlap_sec if reason == "maxlen" else 0.0
+        except QueueClosed:
+            pass
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.asr_q.close()
+
+    def _asr_loop(self):
+        try:
+            while True:
+                jobs = self.scheduler.next_jobs(self.asr_q) if self.scheduler else [self.asr_q.get()]
+                for job in jobs:
+                    out = self.asr_stage(job)
+                    if out is not None:
+                        self.answer_q.put(out)
+        except QueueClosed:
+            pass
+        except BaseException as e:
+            self.error = e
+            self.stop_evt.set()
+        finally:
+            self.answer_q.close()
+
+    def _answer_loop(self):
+        try:
+            while True:
+                self.answer_stage(self.answer_q.get())
+        except QueueClosed:
+            pass
+        except BaseException as e:
+            self.error = e
+            self.stop_evt.set()
+
+    def start(self):
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        self.stop_evt.set()
+        self.asr_q.close()
+        self.answer_q.close()
+
+    def wait(self, poll: float = 0.2):
+        """Blocks until every stage has drained (or one failed); re-raises stage errors."""
+        for t in self._threads:
+            while t.is_alive() and not (self.error and self.stop_evt.is_set()):
+                t.join(poll)
+        if self.error is not None:
+            raise self.error
+
+    def stats(self) -> list:
+        return [self.asr_q.stats(), self.answer_q.stats()]
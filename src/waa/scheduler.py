@@ -0,0 +1,170 @@
+# --- src/waa/scheduler.py ---
+import time
+from typing import List, Optional
+
+from .pipeline import BoundedQueue, SegmentJob
+
+
+class CoalescingScheduler:
+    """Pulls work for the ASR worker and merges adjacent short segments.
+
+    Whisper pads every call to a 30 s window, so many sub-second segments
+    each pay the full encoder cost. When the worker comes back and finds
+    more short finals already waiting (ASR was busy), they are decoded as
+    one call with `gap_sec` of silence between them and the text is split
+    back per segment by word timestamps (`job.result`). An idle ASR — one
+    job waiting — keeps the plain single-segment decode.
+    """
+    def __init__(
+        self,
+        asr,
+        short_sec: float = 2.0,
+        max_total_sec: float = 20.0,
+        gap_sec: float = 0.3,
+        language: Optional[str] = None,
+        samplerate: int = 16000,
+        metrics=None,
+    ):
+        self.asr = asr
+        self.metrics = metrics
+        self.short_bytes = int(short_sec * samplerate) * 2
+        self.max_total_bytes = int(max_total_sec * samplerate) * 2
+        self.gap_bytes = int(gap_sec * samplerate) * 2
+        self.gap_sec = gap_sec
+        self.language = language
+        # sayaçlar
+        self.single_decodes = 0
+        self.joined_decodes = 0
+        self.joined_segments = 0
+        self.failed_joins = 0
+
+    def _short(self, job: SegmentJob) -> bool:
+        return job.reason != "partial" and len(job.pcm16) <= self.short_bytes
+
+    def next_jobs(self, q: BoundedQueue) -> List[SegmentJob]:
+        """Blocks for the next job; returns it plus any short neighbours decoded together."""
+        job = q.get()
+        if not self._short(job):
+            return [job]
+        jobs = [job]
+        total = len(job.pcm16)
+
+        def fits(nxt):
+            return self._short(nxt) and total + self.gap_bytes + len(nxt.pcm16) <= self.max_total_bytes
+
+        while True:
+            nxt = q.get_nowait_if(fits)
+            if nxt is None:
+                break
+            jobs.append(nxt)
+            total += self.gap_bytes + len(nxt.pcm16)
+        if len(jobs) == 1:
+            self.single_decodes += 1
+            return jobs
+        t0 = time.perf_counter()
+        try:
+            results = self.asr.transcribe_joined([j.pcm16 for j in jobs], language=self.language, gap_sec=self.gap_sec)
+        except Exception as e:
+            # işler kaybolmasın: result=None → ASR aşaması tek tek çözer
+            self.failed_joins += 1
+            if self.metrics is not None:
+                self.metrics.inc("errors", stage="asr", kind="joined")
+            print("⚠️ Joined decode failed, decoding {0} segments one by one: {1}".format(len(jobs), e))
+            return jobs
+        if self.metrics is not None:
+            self.metrics.observe("asr_decode", time.perf_counter() - t0, kind="joined")
+        for j, r in zip(jobs, results):
+            j.result = r
+        self.joined_decodes += 1
+        self.joined_segments += len(jobs)
+        return jobs
+
+    def stats(self) -> dict:
+        return {
+            "single_decodes": self.single_decodes,
+            "joined_decodes": self.joined_decodes,
+            "joined_segments": self.joined_segments,
+            "failed_joins": self.failed_joins,
+        }
+
+
+class BatchingScheduler:
+    """Backlog catch-up: decode queued segments together with the batched pipeline.
+
+    Policy: if at least `min_batch` final segments are already waiting when
+    the worker frees up, up to `max_batch` of them (and at most
+    `max_batch_sec` of audio) are decoded in one WhisperASR.transcribe_batch
+    call. Otherwise the job is decoded immediately — through `fallback`
+    (e.g. a CoalescingScheduler) when given — so an idle assistant never
+    waits to fill a batch.
+    """
+    def __init__(
+        self,
+        asr,
+        max_batch: int = 8,
+        min_batch: int = 3,
+        max_batch_sec: float = 120.0,
+        language: Optional[str] = None,
+        samplerate: int = 16000,
+        fallback=None,
+        metrics=None,
+    ):
+        self.asr = asr
+        self.metrics = metrics
+        self.max_batch = max(1, int(max_batch))
+        self.min_batch = max(2, int(min_batch))
+        self.max_batch_bytes = int(max_batch_sec * samplerate) * 2
+        self.language = language
+        self.fallback = fallback
+        # sayaçlar
+        self.batches = 0
+        self.batched_segments = 0
+        self.max_seen_batch = 0
+        self.failed_batches = 0
+
+    def next_jobs(self, q: BoundedQueue) -> List[SegmentJob]:
+        if len(q) < self.min_batch:
+            return self.fallback.next_jobs(q) if self.fallback else [q.get()]
+        jobs: List[SegmentJob] = []
+        total = 0
+
+        def fits(nxt):
+            return nxt.reason != "partial" and (not jobs or total + len(nxt.pcm16) <= self.max_batch_bytes)
+
+        while len(jobs) < self.max_batch:
+            nxt = q.get_nowait_if(fits)
+            if nxt is None:
+                break
+            jobs.append(nxt)
+            total += len(nxt.pcm16)
+        if len(jobs) < 2:
+            return jobs or [q.get()]
+        t0 = time.perf_counter()
+        try:
+            results = self.asr.transcribe_batch([j.pcm16 for j in jobs], language=self.language, batch_size=len(jobs))
+        except Exception as e:
+            # işler kaybolmasın: result=None → ASR aşaması tek tek çözer
+            self.failed_batches += 1
+            if self.metrics is not None:
+                self.metrics.inc("errors", stage="asr", kind="batch")
+            print("⚠️ Batched decode failed, decoding {0} segments one by one: {1}".format(len(jobs), e))
+            return jobs
+        if self.metrics is not None:
+            self.metrics.observe("asr_decode", time.perf_counter() - t0, kind="batch")
+        for j, r in zip(jobs, results):
+            j.result = r
+        self.batches += 1
+        self.batched_segments += len(jobs)
+        self.max_seen_batch = max(self.max_seen_batch, len(jobs))
+        return jobs
+
+    def stats(self) -> dict:
+        out = {
+            "batches": self.batches,
+            "batched_segments": self.batched_segments,
+            "max_batch": self.max_seen_batch,
+            "failed_batches": self.failed_batches,
+        }
+        if self.fallback is not None:
+            out.update(self.fallback.stats())
+        return out
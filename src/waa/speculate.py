@@ -0,0 +1,195 @@
+# --- src/waa/speculate.py ---
+import difflib
+import threading
+import time
+from typing import Callable, Iterator, List, Optional
+
+from .cache import normalize_question
+
+
+def similarity(a: str, b: str) -> float:
+    """0..1 similarity of two questions after cache-style normalization."""
+    na, nb = normalize_question(a), normalize_question(b)
+    if na == nb:
+        return 1.0
+    return difflib.SequenceMatcher(None, na.split(), nb.split()).ratio()
+
+
+class Prefetch:
+    """One speculative answer stream running on its own thread.
+
+    Tokens are buffered so a later consumer can replay them (and then follow
+    the live stream); cancel() aborts the underlying request right away when
+    the stream supports it (AnswerStream.cancel), else after the current token.
+    """
+    def __init__(self, seg_id: int, question: str, stream_fn: Callable[[str], Iterator[str]], restarts: int = 0):
+        self.seg_id = seg_id
+        self.question = question
+        self.restarts = restarts
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.t_start = time.perf_counter()
+        self.t_first: Optional[float] = None
+        self._cancel = threading.Event()
+        self._cond = threading.Condition()
+        self._stream_fn = stream_fn
+        self._gen = None
+        threading.Thread(target=self._run, name="waa-prefetch", daemon=True).start()
+
+    def _run(self):
+        gen = None
+        try:
+            gen = self._stream_fn(self.question)
+            with self._cond:
+                self._gen = gen
+            if self._cancel.is_set():
+                return
+            for tok in gen:
+                if self._cancel.is_set():
+                    break
+                with self._cond:
+                    if self.t_first is None:
+                        self.t_first = time.perf_counter()
+                    self.tokens.append(tok)
+                    self._cond.notify_all()
+        except Exception as e:
+            if not self._cancel.is_set():   # iptal sonrası okuma hatası beklenen sonuç
+                self.error = e
+        finally:
+            close = getattr(gen, "close", None)
+            if close is not None:
+                close()   # HTTP akışını da kapatır (ChatAssistant.stream_answer finally)
+            with self._cond:
+                self.done = True
+                self._cond.notify_all()
+
+    def cancel(self):
+        self._cancel.set()
+        with self._cond:
+            gen = self._gen
+        # bir sonraki token'ı beklemeden HTTP isteğini/akışını kapat (başka iş parçacığından güvenli)
+        abort = getattr(gen, "cancel", None)
+        if abort is not None:
+            try:
+                abort()
+            except Exception:
+                pass
+
+    def replay(self) -> Iterator[str]:
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self.tokens) and not self.done:
+                    self._cond.wait()
+                if i < len(self.tokens):
+                    tok = self.tokens[i]
+                    i += 1
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            yield tok
+
+
+class Speculator:
+    """Starts answers from partial transcripts and hands them over on the final.
+
+    on_partial(): the ASR stage calls it with a partial that already passes
+    the question filters; a prefetch starts (or is reissued if the question
+    text drifted, at most `max_restarts` times per segment).
+    claim(): the answer stage calls it with the final question and its
+    segment; a prefetch of that segment that is similar enough is kept and
+    replayed, otherwise it is cancelled and None tells the caller to send a
+    fresh request.
+    """
+    def __init__(
+        self,
+        stream_fn: Callable[[str], Iterator[str]],
+        min_similarity: float = 0.85,
+        max_restarts: int = 2,
+    ):
+        self.stream_fn = stream_fn
+        self.min_similarity = min_similarity
+        self.max_restarts = max(0, int(max_restarts))
+        self._cur: Optional[Prefetch] = None
+        self._lock = threading.Lock()
+        # sayaçlar
+        self.started = 0
+        self.reissued = 0
+        self.cancelled = 0
+        self.won = 0
+        self.lost = 0
+        self.not_prefetched = 0
+        self.saved_ms: List[float] = []
+
+    def on_partial(self, seg_id: int, text: str):
+        with self._lock:
+            cur = self._cur
+            restarts = 0
+            if cur is not None and cur.seg_id == seg_id:
+                if similarity(cur.question, text) >= self.min_similarity:
+                    return
+                if cur.restarts >= self.max_restarts:
+                    return
+                restarts = cur.restarts + 1
+                self.reissued += 1
+            if cur is not None:
+                cur.cancel()
+                self.cancelled += 1
+            self._cur = Prefetch(seg_id, text, self.stream_fn, restarts)
+            self.started += 1
+
+    def cancel_pending(self):
+        """Final transcript was not a question (or was filtered) → drop the prefetch."""
+        with self._lock:
+            cur, self._cur = self._cur, None
+            if cur is not None:
+                cur.cancel()
+                self.cancelled += 1
+
+    def claim(self, question: str, seg_id: int) -> Optional[Iterator[str]]:
+        with self._lock:
+            cur, self._cur = self._cur, None
+            if cur is not None and cur.seg_id != seg_id:
+                # başka bir segmentin partial'ından: bu soru için prefetch yok
+                cur.cancel()
+                self.cancelled += 1
+                cur = None
+            if cur is None:
+                self.not_prefetched += 1
+                return None
+            if similarity(cur.question, question) < self.min_similarity:
+                cur.cancel()
+                self.lost += 1
+                return None
+            self.won += 1
+        return self._measured(cur, time.perf_counter())
+
+    def _measured(self, pf: Prefetch, t_final: float) -> Iterator[str]:
+        first = True
+        try:
+            for tok in pf.replay():
+                if first:
+                    first = False
+                    # taze istek: final anı + prefetch'in kendi TTFT'si; kazanç = o an − şimdi
+                    ttft = (pf.t_first or time.perf_counter()) - pf.t_start
+                    self.saved_ms.append(max(0.0, (t_final + ttft - time.perf_counter()) * 1000.0))
+                yield tok
+        finally:
+            pf.cancel()   # tüketici erken bıraktıysa (yeni soru) akışı durdur
+
+    def stats(self) -> dict:
+        decided = self.won + self.lost
+        saved = self.saved_ms
+        return {
+            "started": self.started,
+            "reissued": self.reissued,
+            "cancelled": self.cancelled,
+            "won": self.won,
+            "lost": self.lost,
+            "not_prefetched": self.not_prefetched,
+            "win_rate": round(self.won / decided, 3) if decided else 0.0,
+            "ttft_saved_ms_mean": round(sum(saved) / len(saved), 1) if saved else 0.0,
+            "ttft_saved_ms_total": round(sum(saved), 1),
+        }
@@ -0,0 +1,86 @@
+# --- src/waa/startup.py ---
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+
+class StartupTimer:
+    """Records named startup phases relative to t0 and prints a one-line report."""
+    def __init__(self, t0: Optional[float] = None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.phases: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.phases.append((name, seconds))
+
+    def since_start(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def report(self, label: str = "ready") -> str:
+        with self._lock:
+            parts = ", ".join("{0} {1:.2f}s".format(n, s) for n, s in self.phases)
+        return "⏱ Startup: {0} → {1} in {2:.2f}s".format(parts, label, self.since_start())
+
+
+class BackgroundLoader:
+    """Builds a heavy object (Whisper model, API client) on a daemon thread.
+
+    Attribute access blocks until it is ready, so the loader can be handed to
+    code expecting the object itself (e.g. the ASR stage) while capture/VAD
+    already buffers audio. A failed build is re-raised on every access.
+    """
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], object],
+        warmup: Optional[Callable[[object], None]] = None,
+        timer: Optional[StartupTimer] = None,
+        on_ready: Optional[Callable[[object], None]] = None,
+    ):
+        self.name = name
+        self._factory = factory
+        self._warmup = warmup
+        self._timer = timer
+        self._on_ready = on_ready
+        self._obj = None
+        self._error: Optional[BaseException] = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._load, name="waa-load-" + name, daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        try:
+            t = time.perf_counter()
+            obj = self._factory()
+            if self._timer:
+                self._timer.add(self.name + " load", time.perf_counter() - t)
+            if self._warmup is not None:
+                t = time.perf_counter()
+                self._warmup(obj)
+                if self._timer:
+                    self._timer.add(self.name + " warm-up", time.perf_counter() - t)
+            self._obj = obj
+            if self._on_ready is not None:
+                self._on_ready(obj)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._ready.set()
+
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def get(self, timeout: Optional[float] = None):
+        if not self._ready.wait(timeout):
+            raise TimeoutError("{0} still loading".format(self.name))
+        if self._error is not None:
+            raise self._error
+        return self._obj
+
+    def __getattr__(self, attr):
+        # yalnızca bilinmeyen özellikler buraya düşer → hazır nesneye yönlendir
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
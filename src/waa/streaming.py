@@ -0,0 +1,99 @@
+# --- src/waa/streaming.py ---
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+_NORM_RE = re.compile(r"[^\w']+")
+
+
+def _norm(word: str) -> str:
+    return _NORM_RE.sub("", word.lower())
+
+
+def common_prefix(hyps: Sequence[Sequence[str]]) -> List[str]:
+    """Longest word prefix shared by every hypothesis (case/punctuation-insensitive)."""
+    if not hyps:
+        return []
+    out = []
+    for words in zip(*hyps):
+        if len({_norm(w) for w in words}) != 1:
+            break
+        out.append(words[-1])
+    return out
+
+
+class LocalAgreement:
+    """LocalAgreement-n: a word is committed once n consecutive decodes agree on it."""
+    def __init__(self, n: int = 2):
+        self.n = max(1, int(n))
+        self.history = deque(maxlen=self.n)
+        self.committed: List[str] = []
+
+    def update(self, words: List[str]) -> Tuple[List[str], List[str]]:
+        """Returns (committed, tentative) for the latest hypothesis."""
+        self.history.append(words)
+        done = len(self.committed)
+        if len(self.history) == self.n:
+            prefix = common_prefix(list(self.history))
+            # yalnızca commit edilmiş öneki uzatan uzlaşma kabul edilir
+            if len(prefix) > done and len(common_prefix([prefix, self.committed])) == done:
+                self.committed = self.committed + prefix[done:]
+        # tentative, son hipotezin commit edilmiş önekle uyuştuğu yerden başlar
+        agreed = len(common_prefix([words, self.committed]))
+        return list(self.committed), words[agreed:]
+
+    def reset(self):
+        self.history.clear()
+        self.committed = []
+
+
+@dataclass
+class TranscriptEvent:
+    kind: str             # partial | final
+    seg_id: int
+    text: str             # committed + tentative (final'de tam metin)
+    stable: str           # yalnızca commit edilmiş önek
+    lang: str
+    prob: float
+    t: float
+
+
+class StreamingASR:
+    """Re-decodes the open segment on every partial snapshot and emits events.
+
+    Feed it the SegmentJobs produced by the pipeline (MicSegmenter.segments
+    with partial_every_sec): "partial" jobs yield partial events whose stable
+    prefix only grows, any other reason yields the final event.
+    """
+    def __init__(self, asr, agreement: int = 2, language: Optional[str] = None):
+        self.asr = asr
+        self.language = language
+        self.agreement = LocalAgreement(agreement)
+        self._seg_id: Optional[int] = None
+
+    def process(self, job) -> Optional[TranscriptEvent]:
+        if job.seg_id != self._seg_id:
+            self.agreement.reset()
+            self._seg_id = job.seg_id
+        if job.result is not None:
+            text, lang, prob = job.result
+        else:
+            text, lang, prob = self.asr.transcribe_segment(job.pcm16, language=self.language)
+        if job.reason != "partial":
+            self.agreement.reset()
+            self._seg_id = None
+            return TranscriptEvent("final", job.seg_id, text, text, lang, prob, time.time())
+        committed, tentative = self.agreement.update(text.split())
+        if not committed and not tentative:
+            return None
+        return TranscriptEvent(
+            "partial",
+            job.seg_id,
+            " ".join(committed + tentative),
+            " ".join(committed),
+            lang,
+            prob,
+            time.time(),
+        )
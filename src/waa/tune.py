@@ -0,0 +1,354 @@
+# --- src/waa/tune.py ---
+import argparse
+import json
+import os
+import platform
+import re
+import threading
+import time
+import wave
+from dataclasses import asdict, dataclass
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .detect import DATA_DIR
+
+PROMPT_PATH = DATA_DIR / "tune_prompt.en.txt"
+DEFAULT_PROFILE_PATH = ".waa/asr_tune.json"
+DEFAULT_CLIP_PATH = ".waa/tune_clip.wav"
+# küçükten büyüğe: bir model bütçeyi en hızlı ayarında bile aşarsa büyükleri denenmez
+MODEL_ORDER = ("tiny.en", "tiny", "base.en", "base", "small.en", "small", "distil-small.en",
+               "medium.en", "medium", "distil-medium.en", "distil-large-v3", "large-v3")
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def normalize_words(text: str) -> List[str]:
+    return _WORD_RE.findall((text or "").lower().replace("-", " "))
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """(substitutions + deletions + insertions) / reference words, on normalized words."""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    # Levenshtein, tek satır bellekle
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i]
+        for j, h in enumerate(hyp, 1):
+            cur.append(min(prev[j - 1] + (r != h), prev[j] + 1, cur[j - 1] + 1))
+        prev = cur
+    return float(prev[-1]) / len(ref)
+
+
+def machine_fingerprint() -> Dict[str, str]:
+    cpu = platform.processor() or ""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    try:
+        from importlib.metadata import version
+        fw = version("faster-whisper")
+    except Exception:
+        fw = "unknown"
+    return {"machine": platform.machine(), "cpu": cpu, "cores": str(os.cpu_count() or 1), "faster_whisper": fw}
+
+
+@dataclass
+class Candidate:
+    model: str
+    compute_type: str
+    cpu_threads: int
+    num_workers: int
+    beam_size: int
+
+
+@dataclass
+class TuneResult:
+    candidate: Candidate
+    rtf: float                 # çözüm süresi / konuşma süresi (akış başına, num_workers paralel akışla)
+    p95_ms: float              # segment başına çözüm gecikmesi
+    wer: float
+    load_sec: float
+    meets_budget: bool
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        d = asdict(self.candidate)
+        d.update({k: v for k, v in asdict(self).items() if k != "candidate"})
+        return d
+
+
+def load_clip(path) -> bytes:
+    """Mono 16-bit 16 kHz WAV or raw int16 → PCM bytes."""
+    path = Path(path)
+    if path.suffix.lower() != ".wav":
+        return path.read_bytes()
+    with wave.open(str(path), "rb") as w:
+        if w.getsampwidth() != 2 or w.getnchannels() != 1 or w.getframerate() != 16000:
+            raise RuntimeError("{0}: need mono 16-bit PCM at 16000 Hz".format(path))
+        return w.readframes(w.getnframes())
+
+
+def record_clip(path, seconds: float, device: Optional[int] = None) -> Path:
+    """Records the bundled prompt being read aloud → mono 16 kHz WAV."""
+    import sounddevice as sd
+
+    print("🎙  Read this aloud at a normal pace ({0:.0f} s, starts in 3 s):\n".format(seconds))
+    print(PROMPT_PATH.read_text(encoding="utf-8").strip() + "\n")
+    time.sleep(3.0)
+    print("● recording…")
+    rec = sd.rec(int(seconds * 16000), samplerate=16000, channels=1, dtype="int16", device=device)
+    sd.wait()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(rec.tobytes())
+    print("✅ saved", path)
+    return path
+
+
+def split_segments(pcm16: bytes, audio: dict) -> List[bytes]:
+    """The clip cut the way the live segmenter would cut it (same VAD settings)."""
+    from .batch import vad_segments
+
+    x = np.frombuffer(pcm16, dtype=np.int16).reshape(-1, 1)
+    segs = vad_segments(
+        x, 16000, int(audio.get("frame_ms", 20)), int(audio.get("vad_aggressiveness", 2)),
+        float(audio.get("silence_follow_sec", 0.3)), float(audio.get("max_segment_sec", 12.0)),
+        int(audio.get("onset_frames", 1)), int(audio.get("preroll_ms", 0) or 0), audio.get("energy_on_db", 6.0),
+    )
+    return [pcm16[a * 2:b * 2] for a, b, _ in segs] or [pcm16]
+
+
+def measure(asr_wrappers: Sequence, segments: Sequence[bytes], language: Optional[str]):
+    """Every wrapper (one per num_workers) decodes all segments in parallel → (text, rtf, p95_ms)."""
+    from .metrics import percentiles
+
+    speech_sec = sum(len(s) for s in segments) / 2.0 / 16000
+    lat: List[float] = []
+    texts: List[str] = []
+    errors: List[Exception] = []
+    lock = threading.Lock()
+
+    def one(asr, keep_text: bool):
+        out = []
+        try:
+            for seg in segments:
+                t0 = time.perf_counter()
+                text, _, _ = asr.transcribe_segment(seg, language=language)
+                dt = time.perf_counter() - t0
+                with lock:
+                    lat.append(dt)
+                out.append(text)
+        except Exception as e:
+            errors.append(e)
+        if keep_text:
+            texts.extend(out)
+
+    threads = [threading.Thread(target=one, args=(a, i == 0)) for i, a in enumerate(asr_wrappers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    if errors:
+        raise errors[0]
+    return " ".join(texts), wall / speech_sec if speech_sec else 0.0, percentiles(lat, (95,)).get("p95", 0.0) * 1000.0
+
+
+def tune(
+    segments: Sequence[bytes],
+    reference: Optional[str],
+    models: Sequence[str],
+    compute_types: Sequence[str],
+    threads: Sequence[int],
+    workers: Sequence[int],
+    beams: Sequence[int],
+    max_rtf: float = 0.5,
+    max_p95_ms: float = 1500.0,
+    language: Optional[str] = "en",
+    make_asr=None,
+) -> List[TuneResult]:
+    """Benchmarks the grid; with no reference, the largest model's beam-5 output is the reference.
+
+    Each (model, compute_type, cpu_threads, num_workers) is loaded once and
+    tried with every beam size. Models are tried smallest first; once a
+    model misses the budget even in its fastest setting, larger ones are skipped.
+    """
+    from .asr import WhisperASR
+
+    make_asr = make_asr or (lambda c: WhisperASR(c.model, c.cpu_threads, c.num_workers,
+                                                  compute_type=c.compute_type, beam_size=c.beam_size))
+    models = sorted(models, key=lambda m: MODEL_ORDER.index(m) if m in MODEL_ORDER else len(MODEL_ORDER))
+    if reference is None:
+        c = Candidate(models[-1], "float32" if "float32" in compute_types else compute_types[-1],
+                      max(threads), 1, max(max(beams), 5))
+        print("📏 No reference transcript → using {0} ({1}, beam {2}) as reference".format(c.model, c.compute_type, c.beam_size))
+        ref_asr = make_asr(c)
+        reference = " ".join(ref_asr.transcribe_segment(s, language=language)[0] for s in segments)
+        del ref_asr
+
+    results: List[TuneResult] = []
+    for model in models:
+        model_ok = False
+        # hızlıdan yavaşa: int8 önce, çok thread önce
+        for ct, th, nw in product(compute_types, sorted(threads, reverse=True), sorted(workers)):
+            base = Candidate(model, ct, th, nw, 1)
+            t0 = time.perf_counter()
+            try:
+                first = make_asr(base)
+                # num_workers > 1: aynı modeli paylaşan sarmalayıcılar paralel çözer (waa multi / serve gibi)
+                wrappers = [first] + [type(first)(model, model=first.model) for _ in range(nw - 1)]
+                load = time.perf_counter() - t0
+                first.warmup()
+            except Exception as e:
+                results.append(TuneResult(base, float("inf"), float("inf"), 1.0, 0.0, False, str(e)))
+                print("  ✗ {0} {1} threads={2} workers={3}: {4}".format(model, ct, th, nw, e))
+                continue
+            for beam in sorted(beams):
+                for w in wrappers:
+                    w.beam_size = beam
+                cand = Candidate(model, ct, th, nw, beam)
+                try:
+                    text, rtf, p95 = measure(wrappers, segments, language)
+                except Exception as e:
+                    results.append(TuneResult(cand, float("inf"), float("inf"), 1.0, round(load, 2), False, str(e)))
+                    print("  ✗ {0} {1} threads={2} workers={3} beam={4}: {5}".format(model, ct, th, nw, beam, e))
+                    continue
+                err = word_error_rate(reference, text)
+                ok = rtf <= max_rtf and p95 <= max_p95_ms
+                model_ok = model_ok or ok
+                results.append(TuneResult(cand, round(rtf, 3), round(p95, 1), round(err, 4), round(load, 2), ok))
+                print("  {0} {1:<8} {2:<14} threads={3:<2} workers={4} beam={5}: RTF {6:.3f}, p95 {7:.0f} ms, "
+                      "WER {8:.1%}".format("✓" if ok else "·", model, ct, th, nw, beam, rtf, p95, err))
+            del wrappers, first
+        if not model_ok:
+            print("  ⏭  {0} misses the budget in every setting → skipping larger models".format(model))
+            break
+    return results
+
+
+def pick(results: Sequence[TuneResult]) -> Optional[TuneResult]:
+    """Most accurate result within the budget (ties → faster); none within → fastest overall."""
+    ok = [r for r in results if r.meets_budget and r.error is None]
+    if ok:
+        return min(ok, key=lambda r: (r.wer, r.rtf))
+    valid = [r for r in results if r.error is None]
+    return min(valid, key=lambda r: r.rtf) if valid else None
+
+
+def save_profile(path, choice: TuneResult, results: Sequence[TuneResult], budget: dict, clip: str) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fingerprint": machine_fingerprint(),
+        "budget": budget,
+        "clip": clip,
+        "choice": choice.to_dict(),
+        "results": [r.to_dict() for r in results],
+    }
+    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    return path
+
+
+def load_profile(path=DEFAULT_PROFILE_PATH) -> Optional[dict]:
+    """The tuned choice if the profile exists and was made on this machine/faster-whisper, else None."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return None
+    if data.get("fingerprint") != machine_fingerprint():
+        print("⚠️ ASR profile {0} was tuned on another machine / faster-whisper → ignored (rerun `waa tune`)".format(path))
+        return None
+    return data.get("choice")
+
+
+def _csv(s: str, cast=str) -> List:
+    return [cast(x.strip()) for x in s.split(",") if x.strip()]
+
+
+def main(argv=None):
+    cores = os.cpu_count() or 1
+    p = argparse.ArgumentParser(prog="waa tune", description="Pick the most accurate ASR setting that meets a latency budget")
+    p.add_argument("--clip", type=str, default=None, help="Mono 16 kHz WAV / raw PCM (default: recorded clip)")
+    p.add_argument("--reference", type=str, default=None,
+                   help="Reference transcript file (default: bundled prompt for the recorded clip, else largest model)")
+    p.add_argument("--record", type=float, default=0.0, metavar="SEC",
+                   help="Record yourself reading the bundled prompt for SEC seconds first (~60)")
+    p.add_argument("--device", type=int, default=None, help="Mic device for --record")
+    p.add_argument("--config", type=str, default="configs/settings.yaml")
+    p.add_argument("--models", type=str, default=None)
+    p.add_argument("--compute-types", type=str, default=None)
+    p.add_argument("--threads", type=str, default=None, help="Comma separated cpu_threads candidates")
+    p.add_argument("--workers", type=str, default=None, help="Comma separated num_workers candidates")
+    p.add_argument("--beams", type=str, default=None)
+    p.add_argument("--max-rtf", type=float, default=None, help="Decode seconds per speech second")
+    p.add_argument("--max-p95-ms", type=float, default=None, help="p95 decode time per segment")
+    p.add_argument("--out", type=str, default=None, help="Profile path (default: tune.profile_path)")
+    args = p.parse_args(argv)
+
+    cfg = {}
+    if args.config and Path(args.config).exists():
+        import yaml
+        cfg = yaml.safe_load(Path(args.config).read_text(encoding="utf-8")) or {}
+    tcfg = cfg.get("tune", {}) or {}
+    audio = cfg.get("audio", {}) or {}
+    models = _csv(args.models or ",".join(tcfg.get("models") or ["tiny.en", "base.en", "small.en"]))
+    cts = _csv(args.compute_types or ",".join(tcfg.get("compute_types") or ["int8", "int8_float32", "float32"]))
+    threads = _csv(args.threads or ",".join(str(t) for t in (tcfg.get("cpu_threads") or sorted({max(1, cores // 2), cores}))), int)
+    workers = _csv(args.workers or ",".join(str(w) for w in (tcfg.get("num_workers") or [1])), int)
+    beams = _csv(args.beams or ",".join(str(b) for b in (tcfg.get("beam_sizes") or [1, 5])), int)
+    max_rtf = float(args.max_rtf if args.max_rtf is not None else tcfg.get("max_rtf", 0.5))
+    max_p95 = float(args.max_p95_ms if args.max_p95_ms is not None else tcfg.get("max_p95_ms", 1500))
+    out = args.out or tcfg.get("profile_path") or DEFAULT_PROFILE_PATH
+    force_en = bool((cfg.get("assistant", {}) or {}).get("force_language_en", True))
+
+    clip = args.clip
+    reference = None
+    if args.record:
+        clip = str(record_clip(DEFAULT_CLIP_PATH, args.record, args.device))
+    if clip is None and Path(DEFAULT_CLIP_PATH).exists():
+        clip = DEFAULT_CLIP_PATH
+    if clip is None:
+        p.error("no clip: pass --clip FILE or --record 60 (reads the bundled prompt aloud)")
+    if args.reference:
+        reference = Path(args.reference).read_text(encoding="utf-8")
+    elif Path(clip).resolve() == Path(DEFAULT_CLIP_PATH).resolve():
+        reference = PROMPT_PATH.read_text(encoding="utf-8")
+
+    segments = split_segments(load_clip(clip), audio)
+    speech = sum(len(s) for s in segments) / 32000.0
+    print("🔧 Tuning on {0} ({1} segments, {2:.1f}s speech); budget RTF ≤ {3}, p95 ≤ {4:.0f} ms".format(
+        clip, len(segments), speech, max_rtf, max_p95))
+    results = tune(segments, reference, models, cts, threads, workers, beams, max_rtf, max_p95,
+                   language=("en" if force_en else None))
+    choice = pick(results)
+    if choice is None:
+        print("❌ No candidate could be loaded.")
+        return None
+    if not choice.meets_budget:
+        print("⚠️ Nothing met the budget; using the fastest setting.")
+    path = save_profile(out, choice, results, {"max_rtf": max_rtf, "max_p95_ms": max_p95}, clip)
+    c = choice.candidate
+    print("🏁 {0} {1}, cpu_threads={2}, num_workers={3}, beam={4}: RTF {5}, p95 {6} ms, WER {7:.1%}".format(
+        c.model, c.compute_type, c.cpu_threads, c.num_workers, c.beam_size, choice.rtf, choice.p95_ms, choice.wer))
+    print("   saved →", path, "(`waa` uses it when --whisper-model is not given)")
+    return choice
@@ -0,0 +1,40 @@
+# --- tests/conftest.py ---
+import wave
+
+import numpy as np
+import pytest
+
+SR = 16000
+
+
+def voiced(seconds: float, sr: int = SR, f0: float = 150.0) -> np.ndarray:
+    """Harmonic, amplitude-modulated tone that webrtcvad classifies as speech."""
+    t = np.arange(int(sr * seconds)) / float(sr)
+    x = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 12)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    return (x / np.abs(x).max() * 10000).astype(np.int16)
+
+
+def silence(seconds: float, sr: int = SR) -> np.ndarray:
+    return np.zeros(int(sr * seconds), dtype=np.int16)
+
+
+def write_wav(path, pcm: np.ndarray, sr: int = SR, channels: int = 1):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(pcm.astype(np.int16).tobytes())
+    return path
+
+
+@pytest.fixture
+def make_wav(tmp_path):
+    """make_wav([("speech", 1.0), ("silence", 0.5), ...]) → path of a 16 kHz mono WAV."""
+    count = [0]
+
+    def make(parts, sr: int = SR, name: str = None):
+        pcm = np.concatenate([voiced(sec, sr) if kind == "speech" else silence(sec, sr) for kind, sec in parts])
+        count[0] += 1
+        return write_wav(tmp_path / (name or "clip{0}.wav".format(count[0])), pcm, sr)
+
+    return make
@@ -0,0 +1,137 @@
+# --- tests/test_asr.py ---
+from types import SimpleNamespace
+
+import numpy as np
+
+from waa.asr import WHISPER_SR, LanguageGate, WhisperASR, pcm_float32_from_int16
+
+
+def test_pcm_conversion_scales_and_reuses_the_buffer():
+    pcm = np.array([0, 16384, -32768, 32767], dtype=np.int16)
+    buf = np.full(8, 7.0, dtype=np.float32)
+    out = pcm_float32_from_int16(memoryview(pcm.tobytes()), out=buf)
+    assert out.dtype == np.float32 and len(out) == 4
+    assert np.shares_memory(out, buf)
+    assert out.tolist() == [0.0, 0.5, -1.0, 32767 / 32768.0]
+    assert buf[4:].tolist() == [7.0] * 4
+    assert pcm_float32_from_int16(pcm.tobytes()).tolist() == out.tolist()
+
+
+class WordModel:
+    """Stands in for WhisperModel: returns fixed words with timestamps."""
+    def __init__(self, words):
+        self.words = words
+        self.audio_len = None
+
+    def transcribe(self, audio, **kw):
+        self.audio_len = len(audio)
+        ws = [SimpleNamespace(word=w, start=s, end=e) for w, s, e in self.words]
+        text = "".join(w.word for w in ws)
+        return [SimpleNamespace(text=text, words=ws)], SimpleNamespace(language="en", language_probability=0.9)
+
+
+def _asr(model):
+    return WhisperASR(model=model)
+
+
+def test_joined_decode_splits_words_back_by_timestamp():
+    # 1 s + 0.3 s boşluk + 0.5 s → ikinci segment 1.3 s'de başlar
+    model = WordModel([(" What", 0.1, 0.4), (" is", 0.5, 0.8), (" Kafka?", 1.35, 1.7)])
+    asr = _asr(model)
+    out = asr.transcribe_joined([b"\x00\x00" * 16000, b"\x00\x00" * 8000], gap_sec=0.3)
+    assert out == [("What is", "en", 0.9), ("Kafka?", "en", 0.9)]
+    assert model.audio_len == 16000 + 4800 + 8000
+
+
+def test_batch_without_batched_pipeline_falls_back_to_joined_decodes():
+    model = WordModel([(" hi", 0.1, 0.3)])
+    asr = _asr(model)
+    asr._batched = False                         # faster-whisper < 1.1
+    pcms = [b"\x00\x00" * 16000 * 10] * 4        # 4 × 10 s → iki birleşik çağrı
+    out = asr.transcribe_batch(pcms)
+    assert len(out) == 4
+    assert [t for t, _, _ in out] == ["hi", "", "hi", ""]
+    assert asr.transcribe_batch([]) == []
+
+
+class LangASR:
+    """Fake WhisperASR for the gate: scripted language ID, records full decodes."""
+    def __init__(self, langs):
+        self.langs = list(langs)
+        self.decodes = []
+
+    def detect_language(self, pcm16, prefix_sec=2.0):
+        return self.langs.pop(0)
+
+    def decode(self, pcm16, language=None, words=None):
+        self.decodes.append(language)
+        return "text", language or "en", 0.95
+
+
+def test_language_gate_skips_confident_foreign_segments():
+    gate = LanguageGate(min_prob=0.8, prior_skip=2.0)      # prior hiç atlatmasın
+    asr = LangASR([("tr", 0.95), ("en", 0.9), ("de", 0.5)])
+    pcm = b"\x00\x00" * 16000
+    assert gate.transcribe(asr, pcm) == ("", "tr", 0.95)
+    assert gate.transcribe(asr, pcm) == ("text", "en", 0.95)
+    assert gate.transcribe(asr, pcm)[0] == "text"             # düşük güven → tam çözüm
+    assert asr.decodes == ["en", None]                        # İngilizce dil sabitlenerek çözülür
+    s = gate.stats()
+    assert (s["prepass"], s["skipped_decodes"], s["skipped_audio_sec"]) == (3, 1, 1.0)
+
+
+def test_language_gate_trusts_an_english_prior():
+    gate = LanguageGate(prior_skip=0.85, prior_alpha=0.5)
+    asr = LangASR([("en", 0.99)] * 3)
+    pcm = b"\x00\x00" * 8000
+    for _ in range(5):
+        gate.transcribe(asr, pcm)
+    s = gate.stats()
+    assert s["prepass"] == 3 and s["prior_skips"] == 2
+    assert gate.prior >= 0.85
+
+
+def test_segment_decode_can_return_word_timestamps():
+    asr = _asr(WordModel([(" We", 0.0, 0.2), (" shard", 0.3, 0.6)]))
+    words = []
+    assert asr.transcribe_segment(b"\x00\x00" * 16000, language="en", words=words)[0] == "We shard"
+    assert words == [(0.0, 0.2, " We"), (0.3, 0.6, " shard")]
+
+
+class StubBatchedPipeline:
+    """Slices each clip like faster-whisper's BatchedInferencePipeline and
+    emits one word per clip at the clip's midpoint."""
+    def __init__(self):
+        self.clips = None
+
+    def transcribe(self, audio, clip_timestamps=None, **kw):
+        self.clips = clip_timestamps
+        segments = []
+        for i, c in enumerate(clip_timestamps):
+            chunk = audio[c["start"]:c["end"]]          # float ofsetlerde TypeError
+            assert len(chunk) == c["end"] - c["start"]
+            mid = (c["start"] + c["end"]) / 2.0 / WHISPER_SR
+            word = SimpleNamespace(start=mid - 0.05, end=mid + 0.05, word=" w{0}".format(i))
+            segments.append(SimpleNamespace(text=word.word, words=[word]))
+        return segments, SimpleNamespace(language="en", language_probability=0.97)
+
+
+def _pcm(seconds):
+    return (np.ones(int(seconds * WHISPER_SR), dtype=np.int16) * 1000).tobytes()
+
+
+def test_transcribe_batch_uses_integer_sample_offsets():
+    asr = _asr(object())
+    stub = StubBatchedPipeline()
+    asr._batched = stub
+    pcms = [_pcm(1.0), _pcm(0.37), _pcm(2.5)]
+
+    out = asr.transcribe_batch(pcms, language="en", batch_size=4)
+
+    assert [t for t, _, _ in out] == ["w0", "w1", "w2"]
+    assert all(lang == "en" for _, lang, _ in out)
+    for c, pcm in zip(stub.clips, pcms):
+        assert isinstance(c["start"], int) and isinstance(c["end"], int)
+        assert c["end"] - c["start"] == len(pcm) // 2
+    # klipler arasında 0.5 s sessizlik
+    assert stub.clips[1]["start"] - stub.clips[0]["end"] == WHISPER_SR // 2
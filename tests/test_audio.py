@@ -0,0 +1,187 @@
+# --- tests/test_audio.py ---
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from waa.audio import FileSource, MicSegmenter, PcmRing
+from waa.resample import PolyphaseResampler
+
+from conftest import voiced, write_wav
+
+
+def test_file_source_yields_padded_frames(tmp_path):
+    path = write_wav(tmp_path / "a.wav", np.arange(700, dtype=np.int16))
+    src = FileSource(path, 16000, frame_samples=320)
+    frames = list(src.frames())
+    assert [len(f) for f in frames] == [640, 640, 640]
+    assert np.frombuffer(frames[-1], dtype=np.int16)[:60].tolist() == list(range(640, 700))
+    assert not np.frombuffer(frames[-1], dtype=np.int16)[60:].any()
+    assert src.duration_sec() == pytest.approx(700 / 16000.0)
+
+
+def test_file_source_reads_raw_pcm(tmp_path):
+    path = tmp_path / "a.pcm"
+    path.write_bytes(np.arange(640, dtype=np.int16).tobytes())
+    src = FileSource(path, 16000, frame_samples=320)
+    assert b"".join(src.frames()) == np.arange(640, dtype=np.int16).tobytes()
+    assert src.duration_sec() == pytest.approx(0.04)
+
+
+def test_file_source_rejects_other_formats(tmp_path):
+    path = write_wav(tmp_path / "a.wav", np.zeros(320, dtype=np.int16), sr=8000)
+    with pytest.raises(RuntimeError, match="mono 16-bit"):
+        list(FileSource(path, 16000).frames())
+    with pytest.raises(FileNotFoundError):
+        FileSource(tmp_path / "missing.wav")
+
+
+def _segments(path, **kw):
+    seg = MicSegmenter(source=FileSource(path, 16000, 320), **kw)
+    return [(reason, len(pcm) / 32000.0) for pcm, reason in seg.segments()]
+
+
+def test_segments_split_on_silence_and_flush_at_eof(make_wav):
+    path = make_wav([("silence", 0.5), ("speech", 1.0), ("silence", 1.0), ("speech", 0.6)])
+    out = _segments(path, silence_follow_sec=0.3)
+    assert [r for r, _ in out] == ["silence", "eof"]
+    # VAD kuyruğu birkaç kare uzatabilir, sessizlik bekleme süresi segmente girmez
+    assert 0.95 <= out[0][1] <= 1.25
+    assert 0.55 <= out[1][1] <= 0.7
+
+
+def test_long_speech_is_cut_at_max_segment(make_wav):
+    path = make_wav([("speech", 2.5), ("silence", 0.6)])
+    out = _segments(path, max_segment_sec=1.0, silence_follow_sec=0.3)
+    assert [r for r, _ in out][:2] == ["maxlen", "maxlen"]
+    assert all(sec <= 1.05 for _, sec in out)
+    assert sum(sec for _, sec in out) == pytest.approx(2.5, abs=0.15)
+
+
+def test_partials_are_timed_on_the_sample_clock(make_wav):
+    path = make_wav([("speech", 1.1), ("silence", 0.6)])
+    seg = MicSegmenter(source=FileSource(path, 16000, 320), silence_follow_sec=0.3)
+    reasons = [reason for _, reason in seg.segments(partial_every_sec=0.5)]
+    assert reasons == ["partial", "partial", "silence"]
+
+
+def _samples(view):
+    return np.frombuffer(view, dtype=np.int16).tolist()
+
+
+def test_ring_view_is_contiguous_across_the_wrap():
+    ring = PcmRing(8)
+    ring.write(np.arange(6, dtype=np.int16).tobytes())
+    ring.write(np.arange(6, 11, dtype=np.int16).tobytes())     # 6..10 → sarar
+    assert ring.written == 11
+    assert ring.oldest() == 3
+    assert _samples(ring.view(3, 11)) == list(range(3, 11))
+    assert _samples(ring.view(5, 9)) == list(range(5, 9))
+
+
+def test_ring_view_clamps_to_the_oldest_sample():
+    ring = PcmRing(4)
+    ring.write(np.arange(10, dtype=np.int16).tobytes())
+    assert ring.oldest() == 6
+    assert _samples(ring.view(0, 10)) == [6, 7, 8, 9]
+    assert _samples(ring.view(8, 7)) == []
+
+
+def test_ring_oversized_write_keeps_the_tail():
+    ring = PcmRing(4)
+    assert ring.write(np.arange(7, dtype=np.int16).tobytes()) == 4
+    assert ring.written == 7
+    assert _samples(ring.view(ring.oldest(), ring.written)) == [3, 4, 5, 6]
+
+
+def test_ring_view_is_zero_copy_until_overwritten():
+    ring = PcmRing(4)
+    ring.write(np.array([1, 2, 3, 4], dtype=np.int16).tobytes())
+    view = ring.view(0, 4)
+    kept = bytes(view)
+    ring.write(np.array([9, 9], dtype=np.int16).tobytes())
+    assert _samples(view) != _samples(kept)        # görünüm ring'in kendisi
+    assert _samples(kept) == [1, 2, 3, 4]
+
+
+def test_preroll_starts_the_segment_before_onset(make_wav):
+    path = make_wav([("silence", 0.5), ("speech", 1.0), ("silence", 0.6)])
+    plain = _segments(path, silence_follow_sec=0.3)
+    early = _segments(path, silence_follow_sec=0.3, preroll_ms=200)
+    assert early[0][1] == pytest.approx(plain[0][1] + 0.2, abs=0.021)
+
+
+class FakeInputStream:
+    """sounddevice.RawInputStream stand-in: serves a fixed int16 buffer, interleaved as opened."""
+    opened = []
+
+    def __init__(self, samplerate, blocksize, device, channels, dtype):
+        FakeInputStream.opened.append((samplerate, blocksize, channels))
+        self.channels = channels
+        self.pos = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def read(self, n):
+        step = n * self.channels
+        block = FakeInputStream.data[self.pos:self.pos + step]
+        if len(block) < step:
+            raise StopIteration
+        self.pos += step
+        return block.tobytes(), False
+
+
+def _fake_sounddevice(rate, channels, data):
+    FakeInputStream.opened = []
+    FakeInputStream.data = data
+    return SimpleNamespace(
+        default=SimpleNamespace(device=(0, 0)),
+        query_devices=lambda dev: {"max_input_channels": channels, "default_samplerate": float(rate)},
+        RawInputStream=FakeInputStream,
+    )
+
+
+def _mic_frames(n, **kw):
+    seg = MicSegmenter(samplerate=16000, frame_ms=20, vad_aggressiveness=2, max_segment_sec=5.0,
+                       silence_follow_sec=0.3, **kw)
+    frames = seg.frames()
+    return [next(frames) for _ in range(n)]
+
+
+def test_native_rate_capture_is_resampled_to_fixed_frames(monkeypatch):
+    tone = voiced(1.0, sr=44100)
+    stereo = np.stack([tone, tone], axis=1).reshape(-1)
+    monkeypatch.setitem(sys.modules, "sounddevice", _fake_sounddevice(44100, 2, stereo))
+    frames = _mic_frames(40, capture_rate="native")
+    assert FakeInputStream.opened == [(44100, 882, 2)]
+    assert all(len(f) == 320 * 2 for f in frames)             # 20 ms @ 16 kHz, mono
+    out = np.frombuffer(b"".join(frames), dtype=np.int16)
+    ref = PolyphaseResampler(44100, 16000).process(tone.tobytes())[:len(out)]
+    assert np.array_equal(out, ref)
+
+
+@pytest.mark.parametrize("kw", [{}, {"capture_rate": 16000, "capture_channels": 1}])
+def test_default_and_forced_16k_mono_capture_pass_frames_through(monkeypatch, kw):
+    pcm = voiced(0.5)
+    monkeypatch.setitem(sys.modules, "sounddevice", _fake_sounddevice(48000, 2, pcm))
+    frames = _mic_frames(10, **kw)
+    assert FakeInputStream.opened == [(16000, 320, 1)]
+    assert b"".join(frames) == pcm[:3200].tobytes()
+
+
+def test_overlap_repeats_the_audio_around_a_maxlen_cut(make_wav):
+    path = make_wav([("speech", 2.5), ("silence", 0.6)])
+    seg = MicSegmenter(source=FileSource(path, 16000, 320), max_segment_sec=1.0,
+                       silence_follow_sec=0.3, overlap_sec=0.3)
+    out = [(bytes(pcm), reason) for pcm, reason in seg.segments()]
+    assert [r for _, r in out][:2] == ["maxlen", "maxlen"]
+    # her kesimden sonraki segment, kesimden 0.3 s önce başlar
+    for (prev, reason), (cur, _) in zip(out, out[1:]):
+        if reason == "maxlen":
+            assert cur[:9600] == prev[-9600:]
+    assert out[-1][1] == "silence"
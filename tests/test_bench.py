@@ -0,0 +1,27 @@
+# --- tests/test_bench.py ---
+import pytest
+
+from waa.bench import StandInAssistant, _audio_settings, bench_model
+
+
+class FakeASR:
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe_segment(self, pcm16, language=None):
+        self.calls += 1
+        return "how do we scale this service", "en", 0.95
+
+
+def test_bench_model_times_every_segment(make_wav):
+    path = make_wav([("speech", 0.8), ("silence", 0.6), ("speech", 0.8), ("silence", 0.6)])
+    asr = FakeASR()
+    res = bench_model(asr, [str(path)], _audio_settings(None), StandInAssistant(0.0, 0.0))
+    assert res["segments"] == asr.calls == 2
+    assert res["audio_sec"] == pytest.approx(1.6, abs=0.3)
+    assert res["speech_end_to_transcript_ms"]["count"] == 2
+    assert res["transcript_to_first_token_ms"]["count"] == 2      # ikisi de soru
+
+
+def test_stand_in_assistant_streams_words():
+    assert "".join(StandInAssistant(0.0, 0.0, answer="use a queue").stream_answer("q")) == "use a queue"
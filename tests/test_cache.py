@@ -0,0 +1,134 @@
+# --- tests/test_cache.py ---
+import threading
+
+from waa.cache import AnswerCache, CachedAssistant, normalize_question
+
+
+def test_normalize_drops_filler_and_lead_ins():
+    assert normalize_question("So, um, can you tell me what Kafka is?") == "what kafka is"
+    assert normalize_question("Well okay, you know, WHAT is Kafka") == "what is kafka"
+    assert normalize_question("What is Kafka?") == "what is kafka"
+
+
+def test_normalize_keeps_lead_words_that_carry_meaning():
+    assert normalize_question("And what is Kafka?") == "and what is kafka"
+    assert normalize_question("Please explain the CAP theorem") == "please explain the cap theorem"
+    assert normalize_question("Like what is Kafka?") != normalize_question("What is Kafka?")
+    assert normalize_question("Right, what is Kafka?") != normalize_question("What is Kafka?")
+
+
+def test_lru_keeps_the_recently_used_entries():
+    cache = AnswerCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"                  # a en son kullanılan
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+
+def test_expired_entries_miss():
+    cache = AnswerCache(ttl_sec=0.0)
+    cache.put("a", "A")
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_store_survives_a_restart(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = AnswerCache(path, max_entries=2)
+    for k in ("a", "b", "c"):
+        cache.put(k, k.upper(), "q " + k)
+    cache.close()
+    again = AnswerCache(path, max_entries=2)
+    assert again.get("a") is None
+    assert again.get("b") == "B" and again.get("c") == "C"
+    again.close()
+
+
+def test_disk_store_is_pruned_in_batches(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "cache.sqlite"
+    cache = AnswerCache(path, max_entries=16)       # 2 satır pay
+    rows = []
+    for i in range(40):
+        cache.put("k{0}".format(i), "A{0}".format(i))
+        rows.append(sqlite3.connect(str(path)).execute("SELECT COUNT(*) FROM answers").fetchone()[0])
+    cache.close()
+    assert max(rows) == 18 and rows[-1] <= 18
+    assert rows.count(16) < 10                      # her eklemede değil, birkaç eklemede bir budanır
+    again = AnswerCache(path, max_entries=16)
+    assert again.get("k39") == "A39" and again.get("k23") is None
+    again.close()
+
+
+def test_keys_depend_on_model_and_prompt():
+    k = AnswerCache.make_key("What is Kafka?", "gpt-4o-mini", "sys")
+    assert k == AnswerCache.make_key("so, what is kafka", "gpt-4o-mini", "sys")
+    assert k != AnswerCache.make_key("What is Kafka?", "gpt-4o", "sys")
+    assert k != AnswerCache.make_key("What is Kafka?", "gpt-4o-mini", "other")
+
+
+class CountingAssistant:
+    model = "m"
+
+    def __init__(self):
+        self.calls = 0
+
+    def stream_answer(self, question):
+        self.calls += 1
+        yield "It"
+        yield " is"
+        yield " a log."
+
+
+def test_second_ask_replays_from_the_cache():
+    inner = CountingAssistant()
+    cached = CachedAssistant(inner, AnswerCache(), "sys")
+    first = cached.stream_answer("What is Kafka?")
+    assert "".join(first) == "It is a log."
+    assert first.cache_hit is False
+    again = cached.stream_answer("so what is kafka")
+    assert "".join(again) == "It is a log."
+    assert again.cache_hit is True and inner.calls == 1
+
+
+class SlowAssistant:
+    model = "test-model"
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def stream_answer(self, question):
+        yield "Use"
+        self.release.wait(5)
+        yield " an index."
+
+
+def test_cache_hit_is_reported_per_stream():
+    chat = SlowAssistant()
+    cached = CachedAssistant(chat, AnswerCache(), "system")
+    cached.cache.put(cached.cache.make_key("What is a B-tree?", chat.model, "system"), "A balanced tree.")
+
+    live = cached.stream_answer("How do I speed up this query?")
+    assert next(live) == "Use"
+    # ikinci (ör. prefetch) çağrı canlı akış sürerken isabet eder
+    hit = cached.stream_answer("so, um, what is a B-tree")
+    assert "".join(hit) == "A balanced tree."
+    chat.release.set()
+    assert "".join(live) == " an index."
+
+    assert hit.cache_hit is True
+    assert live.cache_hit is False
+
+
+def test_abandoned_live_stream_closes_the_inner_stream_and_is_not_cached():
+    chat = SlowAssistant()
+    cached = CachedAssistant(chat, AnswerCache(), "system")
+    live = cached.stream_answer("How do I speed up this query?")
+    assert next(live) == "Use"
+    live.close()
+    assert live._source.gi_frame is None          # iç üreteç de kapandı
+    assert cached.stream_answer("How do I speed up this query?").cache_hit is False
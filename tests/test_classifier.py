@@ -0,0 +1,66 @@
+# --- tests/test_classifier.py ---
+import numpy as np
+
+from waa.detect import QuestionClassifier
+from waa.detect_train import load_corpus, main, metrics, split, train
+
+
+def test_shipped_weights_separate_questions_from_statements():
+    clf = QuestionClassifier.load()
+    assert clf.is_question("How would you shard this table?")
+    assert clf.is_question("Walk me through your deployment pipeline")
+    assert not clf.is_question("Thanks, that was all from my side.")
+    assert not clf.is_question("How would you shard this table?", lang="de")
+    assert not clf.is_question("   ")
+
+
+def test_batch_scores_match_single_scores():
+    clf = QuestionClassifier.load()
+    texts = ["What is Kafka?", "okay", "Tell me about a time you failed"]
+    batch = clf.score_batch(texts)
+    assert np.allclose(batch, [clf.score(t) for t in texts], atol=1e-6)
+    assert len(clf.score_batch([])) == 0
+
+
+def test_training_fits_a_small_corpus_and_round_trips(tmp_path):
+    texts = ["what is a queue", "how does caching work", "why use kafka", "which db would you pick",
+             "thanks everyone", "that sounds good", "let us move on", "great see you tomorrow"]
+    labels = np.array([1, 1, 1, 1, 0, 0, 0, 0], dtype=np.float32)
+    clf = train(texts, labels, dim=1 << 12, epochs=200)
+    assert metrics(clf.score_batch(texts) >= 0.5, labels)["accuracy"] == 1.0
+    path = tmp_path / "clf.npz"
+    clf.save(path)
+    again = QuestionClassifier.load(path, threshold=0.7)
+    assert again.threshold == 0.7
+    assert np.allclose(again.score_batch(texts), clf.score_batch(texts), atol=1e-2)
+
+
+def test_split_is_stratified_and_disjoint():
+    labels = np.array([1] * 10 + [0] * 30, dtype=np.float32)
+    tr, te = split(len(labels), labels, 0.2, seed=0)
+    assert len(te) == 8 and labels[te].sum() == 2
+    assert not set(tr) & set(te) and len(tr) + len(te) == 40
+
+
+def test_metrics_and_bundled_corpus():
+    m = metrics(np.array([1, 1, 0, 0]), np.array([1, 0, 1, 0]))
+    assert m == {"accuracy": 0.5, "precision": 0.5, "recall": 0.5, "f1": 0.5, "false_positives": 1}
+    texts, labels = load_corpus()
+    assert len(texts) == len(labels) and 0 < labels.sum() < len(labels)
+
+
+def test_eval_only_keeps_the_stored_threshold_and_labels_training_numbers():
+    report = main(["--eval-only"])
+    assert report["threshold"] == QuestionClassifier.load().threshold
+    assert "training-set" in report["note"]
+
+
+def test_training_writes_to_the_given_path_not_the_bundled_weights(tmp_path):
+    corpus = tmp_path / "corpus.tsv"
+    corpus.write_text("\n".join(["1\twhat is kafka", "1\thow does raft work", "1\twhy use a queue",
+                                 "0\tthanks everyone", "0\tlet me share my screen", "0\tok sounds good"]),
+                      encoding="utf-8")
+    out = tmp_path / "sub" / "clf.npz"
+    report = main(["--corpus", str(corpus), "--out", str(out), "--epochs", "20", "--test-frac", "0.34"])
+    assert out.exists() and report["weights"] == str(out)
+    assert QuestionClassifier.load(str(out)).threshold == 0.5
@@ -0,0 +1,83 @@
+# --- tests/test_context.py ---
+import time
+
+from waa.context import MeetingContext, count_tokens
+
+SYSTEM = "You are a concise interview assistant."
+
+
+def _line(i: int) -> str:
+    return "Line {0}: we discussed partitioning the orders table by tenant.".format(i)
+
+
+def _wait_for(cond, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cond()
+
+
+def test_messages_are_laid_out_most_stable_first():
+    ctx = MeetingContext(max_tokens=1000)
+    ctx.add_transcript("We use Postgres for orders.")
+    ctx.add_answer("Partition by tenant.")
+    ctx.add_transcript("How would you shard it?")
+    msgs = ctx.messages("How would you shard it?", SYSTEM)
+    assert [m["role"] for m in msgs] == ["system", "user", "assistant", "user"]
+    assert msgs[1]["content"] == "Meeting transcript:\nWe use Postgres for orders."
+    assert msgs[-1]["content"] == "How would you shard it?"     # son satır tekrar edilmez
+    assert ctx.last_report.recent_messages == 2
+
+
+def test_folding_keeps_recent_turns_within_budget():
+    per = count_tokens(_line(0))
+    ctx = MeetingContext(max_tokens=per * 10, keep_tokens=per * 5, summary_tokens=40)
+    for i in range(11):
+        ctx.add_transcript(_line(i))
+    assert ctx.folds == 1
+    assert _wait_for(lambda: ctx.summaries == 1)
+    s = ctx.stats()
+    assert s["recent_turns"] == 5 and s["recent_tokens"] <= per * 5
+    assert ctx.summary.startswith("… ") and count_tokens(ctx.summary) <= 45
+    msgs = ctx.messages("What did we decide?", SYSTEM)
+    assert msgs[1]["content"].startswith("Meeting summary so far:\n")
+    assert _line(10) in msgs[2]["content"] and _line(5) not in msgs[2]["content"]
+
+
+def test_summarize_fn_is_used_and_failures_fall_back():
+    calls = []
+
+    def summarize(summary, lines, limit):
+        calls.append(len(lines))
+        return "Orders are sharded by tenant."
+
+    per = count_tokens(_line(0))
+    ctx = MeetingContext(max_tokens=per * 4, keep_tokens=per * 2, summarize_fn=summarize)
+    for i in range(5):
+        ctx.add_transcript(_line(i))
+    assert _wait_for(lambda: ctx.summaries == 1)
+    assert ctx.summary == "Orders are sharded by tenant." and calls == [3]
+
+    def broken(summary, lines, limit):
+        raise RuntimeError("API down")
+
+    ctx = MeetingContext(max_tokens=per * 4, keep_tokens=per * 2, summarize_fn=broken)
+    for i in range(5):
+        ctx.add_transcript(_line(i))
+    assert _wait_for(lambda: ctx.summaries == 1)
+    assert ctx.summary_errors == 1 and "Line 2" in ctx.summary
+
+
+def test_prefix_stays_stable_between_folds():
+    per = count_tokens(_line(0))
+    ctx = MeetingContext(max_tokens=per * 20, keep_tokens=per * 10)
+    ctx.add_transcript(_line(0))
+    first = ctx.messages("Question one?", SYSTEM)
+    assert ctx.last_report.stable_prefix_tokens == 0
+    ctx.add_transcript(_line(1))
+    ctx.messages("Question two?", SYSTEM)
+    r = ctx.last_report
+    # system aynı, transkript mesajı sona eklenerek büyüdü → eski içeriği önek
+    assert r.stable_prefix_tokens == count_tokens(first[0]["content"]) + 4 + count_tokens(first[1]["content"])
+    assert r.total_tokens == r.system_tokens + r.summary_tokens + r.recent_tokens + r.question_tokens
+    assert 0.0 < ctx.stats()["stable_prefix_ratio"] < 1.0
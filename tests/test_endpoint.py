@@ -0,0 +1,75 @@
+# --- tests/test_endpoint.py ---
+import numpy as np
+import pytest
+
+from waa.audio import FileSource, MicSegmenter
+from waa.endpoint import AdaptiveEndpointer, frame_dbfs, looks_finished_question, looks_unfinished
+
+from conftest import voiced
+
+
+def test_frame_dbfs():
+    assert frame_dbfs(np.zeros(0, dtype=np.int16)) == -100.0
+    assert frame_dbfs(np.zeros(320, dtype=np.int16)) < -90.0
+    full = np.full(320, 32767, dtype=np.int16)
+    assert frame_dbfs(full) == pytest.approx(0.0, abs=0.01)
+    assert frame_dbfs(full // 10) == pytest.approx(-20.0, abs=0.1)
+
+
+def test_transcript_shape_checks():
+    assert looks_finished_question("How do you scale the write path")
+    assert looks_finished_question("really?")
+    assert not looks_finished_question("How do you scale the")
+    assert not looks_finished_question("what now")               # çok kısa
+    assert looks_unfinished("we shard by tenant and")
+    assert looks_unfinished("so first,")
+    assert not looks_unfinished("we shard by tenant")
+    assert not looks_unfinished("")
+
+
+def test_hangover_follows_the_hint():
+    ep = AdaptiveEndpointer(16000, silence_sec=0.4, min_silence_sec=0.2, max_silence_sec=1.0)
+    assert ep.hangover_sec() == 0.4
+    ep.hint("How would you design the cache layer")
+    assert ep.hangover_sec() == 0.2
+    ep.hint("we would put it behind the")
+    assert ep.hangover_samples() == 16000
+    ep.reset()
+    assert ep.hangover_sec() == 0.4
+
+
+def test_energy_gate_rejects_quiet_vad_hits():
+    ep = AdaptiveEndpointer(16000, on_db=6.0, off_db=3.0)
+    noise = (np.random.default_rng(0).normal(0, 300, 320)).astype(np.int16)
+    for _ in range(60):
+        assert not ep.is_speech(noise, False)       # gürültü tabanını öğren
+    assert not ep.is_speech(noise, True)             # VAD "konuşma" dese de taban seviyesinde
+    loud = voiced(0.02)
+    assert ep.is_speech(loud, True)
+    assert AdaptiveEndpointer(on_db=None).is_speech(noise, True)
+
+
+def _segments(path, **kw):
+    seg = MicSegmenter(source=FileSource(path, 16000, 320), **kw)
+    return [(reason, len(pcm) / 32000.0) for pcm, reason in seg.segments()]
+
+
+def test_short_blips_need_onset_frames(make_wav):
+    path = make_wav([("silence", 0.3), ("speech", 0.04), ("silence", 0.5), ("speech", 0.6), ("silence", 0.6)])
+    assert len(_segments(path)) == 2
+    ep = AdaptiveEndpointer(16000, 0.3, onset_frames=10, on_db=None)   # ≥ 200 ms
+    out = _segments(path, endpointer=ep)
+    assert len(out) == 1 and 0.55 <= out[0][1] <= 0.8      # + VAD kuyruğu
+
+
+def test_a_slow_consumer_does_not_change_segments(make_wav):
+    import time
+
+    path = make_wav([("speech", 0.7), ("silence", 0.5), ("speech", 0.5), ("silence", 0.5)])
+    fast = _segments(path)
+    seg = MicSegmenter(source=FileSource(path, 16000, 320))
+    slow = []
+    for pcm, reason in seg.segments():
+        slow.append((reason, len(pcm) / 32000.0))
+        time.sleep(0.2)                               # tüketici takılsa da saat örnek sayısı
+    assert slow == fast
@@ -0,0 +1,42 @@
+# --- tests/test_eventlog.py ---
+import json
+
+from waa.eventlog import EventLog
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_close_drains_every_queued_record(tmp_path):
+    path = tmp_path / "events.jsonl"
+    log = EventLog(path, flush_interval=60.0)
+    for i in range(500):
+        log.write("transcript", seg=i, text="ş{0}".format(i))
+    log.close()
+    recs = _records(path)
+    assert [r["seg"] for r in recs] == list(range(500))
+    assert recs[0]["kind"] == "transcript" and recs[0]["text"] == "ş0"
+    assert log.stats()["written"] == 500 and log.stats()["dropped"] == 0
+    log.write("late")                      # kapandıktan sonra yok sayılır
+    assert len(_records(path)) == 500
+
+
+def test_rotates_by_size_and_keeps_n_backups(tmp_path):
+    path = tmp_path / "events.jsonl"
+    log = EventLog(path, max_bytes=200, backups=2, batch_size=1, flush_interval=0.01)
+    for i in range(40):
+        log.write("answer", seg=i, text="x" * 40)
+    log.close()
+    assert log.stats()["rotations"] >= 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["events.jsonl", "events.jsonl.1", "events.jsonl.2"]
+    assert _records(path)[-1]["seg"] == 39
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    log = EventLog(tmp_path / "events.jsonl", max_queue=1, flush_interval=60.0)
+    for i in range(200):
+        log.write("transcript", seg=i)
+    log.close()
+    s = log.stats()
+    assert s["dropped"] > 0 and s["written"] + s["dropped"] == 200
@@ -0,0 +1,88 @@
+# --- tests/test_history.py ---
+import pytest
+
+from waa.history import MeetingHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    h = MeetingHistory(tmp_path / "history.sqlite", batch_size=64, flush_interval=60.0)
+    yield h
+    h.close()
+
+
+def test_lookup_sees_unflushed_questions(history):
+    history.add_answer("How do we shard the Kafka consumers?", "By tenant id.")
+    hit = history.lookup("so how do we shard kafka consumers")
+    assert hit["answer"] == "By tenant id."
+    assert hit["score"] == 1.0
+    assert history.written == 0
+
+
+def test_lookup_after_commit_and_across_sessions(tmp_path):
+    path = tmp_path / "history.sqlite"
+    first = MeetingHistory(path, batch_size=1, flush_interval=0.05)
+    first.add_transcript("We talked about the cache layer.")
+    first.add_answer("What eviction policy does the cache use?", "LRU with a TTL.")
+    first.close()
+    assert first.written == 2
+
+    second = MeetingHistory(path)
+    try:
+        hit = second.lookup("Which eviction policy does the cache use?")
+        assert hit["answer"] == "LRU with a TTL."
+        assert hit["session"] == first.session
+        assert second.lookup("How do we deploy the frontend?") is None
+    finally:
+        second.close()
+
+
+def test_lookup_ignores_unanswered_and_superseded(history):
+    history.add_answer("How do we rotate the API keys?", "")
+    history.add_answer("How do we rotate the API keys?", "Half an ans", outcome="superseded")
+    assert history.lookup("How do we rotate the API keys?") is None
+    history.add_answer("How do we rotate the API keys?", "With the vault job.")
+    assert history.lookup("how do we rotate API keys")["answer"] == "With the vault job."
+
+
+def test_lookup_respects_min_score(history):
+    history.add_answer("How does the billing service scale under load?", "Horizontally.")
+    assert history.lookup("How does the billing service handle retries?", min_score=0.8) is None
+    assert history.lookup("How does the billing service scale?", min_score=0.5)["answer"] == "Horizontally."
+
+
+def test_search_filters_by_kind_and_session(tmp_path):
+    path = tmp_path / "history.sqlite"
+    h = MeetingHistory(path, source="test")
+    h.add_transcript("We moved the Kafka consumers to the new cluster.")
+    h.add_answer("Why did we move the Kafka consumers?", "To isolate noisy tenants.")
+    h.close()
+    h2 = MeetingHistory(path)
+    try:
+        assert {r["kind"] for r in h2.search("kafka consumers")} == {"transcript", "question"}
+        rows = h2.search("kafka", kind="question", session=h.session)
+        assert len(rows) == 1 and rows[0]["answer"] == "To isolate noisy tenants."
+        assert "[" in rows[0]["snippet"]
+        assert h2.search("kafka", session=h2.session) == []
+        assert h2.search("...") == []
+        started = {s["id"]: s for s in h2.sessions()}
+        assert started[h.session]["source"] == "test"
+        assert (started[h.session]["transcripts"], started[h.session]["questions"]) == (1, 1)
+    finally:
+        h2.close()
+
+
+def test_import_jsonl_backfills_an_event_log(tmp_path):
+    log = tmp_path / "events.jsonl"
+    log.write_text("\n".join([
+        '{"ts": 1.0, "kind": "transcript", "seg_id": 3, "text": "The cache uses LRU."}',
+        '{"ts": 2.0, "kind": "answer", "question": "What does the cache use?", "answer": "LRU.", "outcome": "ok"}',
+        '{"ts": 3.0, "kind": "error", "stage": "asr"}',
+        "not json",
+    ]), encoding="utf-8")
+    h = MeetingHistory(tmp_path / "history.sqlite")
+    try:
+        assert h.import_jsonl(log) == 2
+        assert h.lookup("what does the cache use")["answer"] == "LRU."
+    finally:
+        h.close()
@@ -0,0 +1,204 @@
+# --- tests/test_ingest.py ---
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from conftest import silence, voiced
+from waa.ingest import (
+    OP_BINARY, OP_CLOSE, OP_PING, OP_PONG, OP_TEXT, TCP_HEADER,
+    IngestServer, _client, ws_accept_key, ws_frame, ws_recv,
+)
+from waa.multistream import segmenter_factory
+
+AUDIO = {"sample_rate": 16000, "frame_ms": 20, "vad_aggressiveness": 2,
+         "max_segment_sec": 12.0, "silence_follow_sec": 0.3, "preroll_ms": 0}
+
+
+def _pcm(*parts) -> bytes:
+    return np.concatenate([voiced(sec) if kind == "speech" else silence(sec) for kind, sec in parts]).tobytes()
+
+
+def _recv(data: bytes, max_size: int = 1 << 20, on_ping=lambda d: None):
+    async def go():
+        r = asyncio.StreamReader()
+        r.feed_data(data)
+        r.feed_eof()
+        return await ws_recv(r, max_size, on_ping)
+    return asyncio.run(go())
+
+
+def test_accept_key_matches_rfc_6455_example():
+    assert ws_accept_key("dGhlIHNhbXBsZSBub25jZQ==") == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+
+
+@pytest.mark.parametrize("n", [0, 5, 125, 126, 70000])
+def test_masked_frames_round_trip(n):
+    payload = bytes(range(256)) * (n // 256) + bytes(range(n % 256))
+    frame = ws_frame(OP_BINARY, payload, mask=True)
+    assert frame[1] & 0x80                       # istemci çerçevesi maskeli
+    if n >= 8:
+        assert payload not in frame
+    op, data = _recv(frame)
+    assert (op, data) == (OP_BINARY, payload)
+
+
+def test_fragments_join_and_pings_are_answered():
+    pings = []
+    first = bytearray(ws_frame(OP_TEXT, b"hel", mask=True))
+    first[0] &= 0x7F                             # FIN yok → devamı gelecek
+    cont = bytearray(ws_frame(OP_TEXT, b"lo", mask=True))
+    cont[0] = 0x80                               # devam çerçevesi (opcode 0)
+    data = bytes(first) + ws_frame(OP_PING, b"hb", mask=True) + bytes(cont) + ws_frame(OP_PONG, b"")
+    op, msg = _recv(data, on_ping=pings.append)
+    assert (op, msg, pings) == (OP_TEXT, b"hello", [b"hb"])
+    with pytest.raises(ValueError):
+        _recv(ws_frame(OP_BINARY, b"x" * 200, mask=True), 100)
+
+
+class EchoASR:
+    def __init__(self, text="What is the difference between Kafka and RabbitMQ?"):
+        self.text = text
+
+    def transcribe_segment(self, pcm16, language=None):
+        return self.text, "en", 0.9
+
+
+def _server(**kw):
+    return IngestServer([EchoASR()], segmenter_factory(AUDIO), port=0, samplerate=16000, **kw)
+
+
+def _run(server, scenario):
+    async def main():
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+
+async def _tcp_events(port, payload: bytes, header=None, eof=True, timeout=5.0):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    if header is not None:
+        writer.write(TCP_HEADER + json.dumps(header).encode("utf-8") + b"\n")
+    writer.write(payload)
+    if eof:
+        writer.write_eof()
+    await writer.drain()
+    events = []
+    try:
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout)
+            if not line:
+                break
+            events.append(json.loads(line))
+            if events[-1]["type"] == "done":
+                break
+    finally:
+        writer.close()
+    return events
+
+
+@pytest.mark.parametrize("proto", ["ws", "tcp"])
+def test_sessions_get_transcripts_back(proto):
+    pcm = _pcm(("speech", 0.6), ("silence", 0.5), ("speech", 0.6), ("silence", 0.4))
+
+    async def scenario(server):
+        return await _client("127.0.0.1", server.port, pcm, proto, 0.0, "alice", False, 16000)
+
+    server = _server()
+    res = _run(server, scenario)
+    assert res["transcripts"] == 2 and not res["rejected"] and res["error"] is None
+    s = server.stats()
+    assert (s["accepted"], s["finished"], s["transcripts"]) == (1, 1, 2)
+
+
+
+def test_segmenter_runs_off_the_event_loop():
+    make = segmenter_factory(AUDIO)
+    threads = set()
+
+    def factory(spec):
+        seg = make(spec)
+        push = seg.push
+
+        def recording_push(frame):
+            threads.add(threading.current_thread().name)
+            return push(frame)
+        seg.push = recording_push
+        return seg
+
+    async def scenario(server):
+        return await _tcp_events(server.port, _pcm(("speech", 0.6), ("silence", 0.5)))
+
+    server = IngestServer([EchoASR()], factory, port=0, samplerate=16000, feed_workers=1)
+    events = _run(server, scenario)
+    assert [e["type"] for e in events] == ["transcript", "done"]
+    assert threads and all(name.startswith("waa-feed") for name in threads)
+
+def test_full_server_rejects_websocket_with_503_and_tcp_with_busy():
+    async def scenario(server):
+        ws = await _client("127.0.0.1", server.port, b"", "ws", 0.0, "a", False, 16000)
+        tcp = await _tcp_events(server.port, b"", header={"label": "b"})
+        return ws, tcp
+
+    server = _server(max_sessions=0)
+    ws, tcp = _run(server, scenario)
+    assert ws["rejected"]
+    assert tcp[0]["type"] == "error" and tcp[0]["error"].startswith("busy")
+    assert server.stats()["rejected"] == 2 and server.stats()["accepted"] == 0
+
+
+def test_idle_session_is_closed():
+    async def scenario(server):
+        t0 = time.monotonic()
+        events = await _tcp_events(server.port, b"", header={"label": "idle"}, eof=False)
+        return events, time.monotonic() - t0
+
+    events, took = _run(_server(idle_timeout=0.2), scenario)
+    assert [e["type"] for e in events] == ["error", "done"]
+    assert events[0]["error"] == "idle timeout" and took < 2.0
+
+
+def test_oversized_websocket_message_ends_the_session():
+    async def scenario(server):
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(
+            b"GET /?label=big HTTP/1.1\r\nHost: x\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        )
+        assert b" 101 " in await reader.readuntil(b"\r\n\r\n")
+        writer.write(ws_frame(OP_BINARY, b"\x00" * 4096, mask=True))
+        events = []
+        while True:
+            op, data = await asyncio.wait_for(ws_recv(reader, 1 << 20, lambda d: None), 5.0)
+            if op == OP_CLOSE:
+                break
+            events.append(json.loads(data))
+        writer.close()
+        return events
+
+    events = _run(_server(max_message_bytes=1024), scenario)
+    assert events[0]["type"] == "error" and "larger than 1024" in events[0]["error"]
+    assert events[-1]["type"] == "done"
+
+
+def test_newer_question_supersedes_the_running_answer():
+    def slow_answer(question):
+        for i in range(40):
+            time.sleep(0.02)
+            yield " w{0}".format(i)
+
+    pcm = _pcm(("speech", 0.6), ("silence", 0.6), ("speech", 0.6), ("silence", 0.6))
+
+    async def scenario(server):
+        return await _tcp_events(server.port, pcm, header={"label": "q", "answer": True})
+
+    events = _run(_server(stream_fn=slow_answer), scenario)
+    done = {e["seg_id"]: e["outcome"] for e in events if e["type"] == "answer_done"}
+    assert done == {0: "superseded", 1: "ok"}
+    assert events[-1]["type"] == "done" and events[-1]["answers"] == 2
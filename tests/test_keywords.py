@@ -0,0 +1,27 @@
+# --- tests/test_keywords.py ---
+from waa.detect import KeywordMatcher, contains_keyword, load_keywords
+
+
+def test_matches_on_word_boundaries_only():
+    m = KeywordMatcher(["api", "sql"])
+    assert m.search("Which API should we call?")
+    assert not m.search("That was a rapid answer")
+    assert not m.search("We moved to NoSQL last year")
+
+
+def test_phrases_plurals_and_leftmost_longest():
+    m = KeywordMatcher(["event", "event sourcing", "ci/cd", "query"])
+    assert m.match("Do you use event sourcing with your CI/CD?") == (["event sourcing", "ci/cd"], 4.0)
+    assert m.match("How are these queries planned?") == (["query"], 1.0)
+    # aynı terim ikinci kez sayılmaz
+    assert m.match("event after event") == (["event"], 1.0)
+
+
+def test_behaves_like_a_keyword_set(tmp_path):
+    path = tmp_path / "kw.txt"
+    path.write_text("# comment\nKafka\n\nredis\n", encoding="utf-8")
+    m = load_keywords(path)
+    assert len(m) == 2 and "kafka" in m and set(m) == {"kafka", "redis"}
+    assert contains_keyword("Why Redis here?", m)
+    assert not contains_keyword("Why here?", m)
+    assert len(load_keywords(tmp_path / "missing.txt")) == 0
@@ -0,0 +1,151 @@
+# --- tests/test_llm.py ---
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from waa.llm import AsyncChatAssistant
+
+WORDS = ["Shard", " the", " consumers", " by", " tenant."]
+ANSWER = "".join(WORDS)
+
+
+class FakeStream:
+    def __init__(self, ttft, token_sec, usage=None):
+        self.ttft = ttft
+        self.token_sec = token_sec
+        self.usage = usage
+        self.closed = False
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.ttft)
+        for i, w in enumerate(WORDS):
+            if i:
+                await asyncio.sleep(self.token_sec)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=w))])
+        if self.usage is not None:
+            yield SimpleNamespace(choices=[], usage=self.usage)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    """Stands in for AsyncOpenAI: one FakeStream per request, TTFTs from `ttfts`."""
+    def __init__(self, ttfts=(), token_sec=0.0):
+        self.ttfts = list(ttfts)
+        self.token_sec = token_sec
+        self.streams = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kw):
+        usage = None
+        if kw.get("stream_options", {}).get("include_usage"):
+            # istek başına farklı sayılar: soru uzunluğu
+            usage = SimpleNamespace(prompt_tokens=len(kw["messages"][-1]["content"]), completion_tokens=len(WORDS),
+                                    prompt_tokens_details=SimpleNamespace(cached_tokens=0))
+        s = FakeStream(self.ttfts.pop(0) if self.ttfts else 0.0, self.token_sec, usage)
+        self.streams.append(s)
+        return s
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def make_assistant():
+    made = []
+
+    def make(client, **kw):
+        a = AsyncChatAssistant("fake", "http://127.0.0.1:9", **kw)
+        a.client = client
+        made.append(a)
+        return a
+
+    yield make
+    for a in made:
+        a.close()
+
+
+def _wait_for(cond, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return cond()
+
+
+def test_streams_the_full_answer(make_assistant):
+    client = FakeClient()
+    a = make_assistant(client)
+    assert "".join(a.stream_answer("How would you scale this?")) == ANSWER
+    assert a.stats()["requests"] == 1
+    assert client.streams[0].closed
+
+
+def test_first_token_timeout(make_assistant):
+    a = make_assistant(FakeClient(ttfts=[1.5]), first_token_timeout=0.2, total_timeout=5.0)
+    t0 = time.monotonic()
+    with pytest.raises(TimeoutError, match="timed out"):
+        list(a.stream_answer("How would you scale this?"))
+    assert time.monotonic() - t0 < 1.0
+    assert a.stats()["timeouts"] == 1
+
+
+def test_total_timeout_after_first_tokens(make_assistant):
+    a = make_assistant(FakeClient(token_sec=0.2), first_token_timeout=2.0, total_timeout=0.3)
+    got = []
+    with pytest.raises(TimeoutError, match=r"timed out \(total\)"):
+        for tok in a.stream_answer("How would you scale this?"):
+            got.append(tok)
+    assert got and "".join(got) != ANSWER
+    assert a.stats()["timeouts"] == 1
+
+
+def test_hedged_request_wins_when_primary_is_slow(make_assistant):
+    client = FakeClient(ttfts=[2.0, 0.0])
+    a = make_assistant(client, first_token_timeout=3.0, total_timeout=5.0, hedge_after_sec=0.15)
+    t0 = time.monotonic()
+    assert "".join(a.stream_answer("How would you scale this?")) == ANSWER
+    assert time.monotonic() - t0 < 1.5
+    stats = a.stats()
+    assert (stats["requests"], stats["hedges"], stats["hedge_wins"]) == (2, 1, 1)
+    assert _wait_for(lambda: all(s.closed for s in client.streams))   # kaybeden de kapanır
+
+
+def test_closing_the_stream_cancels_the_request(make_assistant):
+    client = FakeClient(token_sec=0.2)
+    a = make_assistant(client, first_token_timeout=2.0, total_timeout=10.0)
+    tokens = a.stream_answer("How would you scale this?")
+    assert next(tokens)
+    tokens.close()
+    assert _wait_for(lambda: a.stats()["cancelled"] == 1)
+    assert _wait_for(lambda: client.streams[0].closed)
+    assert a.stats()["timeouts"] == a.stats()["errors"] == 0
+
+
+def test_cancel_from_another_thread_aborts_the_request(make_assistant):
+    client = FakeClient(token_sec=1.0)
+    a = make_assistant(client, first_token_timeout=2.0, total_timeout=10.0)
+    tokens = a.stream_answer("How would you scale this?")
+    assert next(tokens)
+    threading.Timer(0.1, tokens.cancel).start()
+    t0 = time.monotonic()
+    with pytest.raises(RuntimeError, match="cancelled"):
+        list(tokens)
+    assert time.monotonic() - t0 < 0.8
+    assert _wait_for(lambda: client.streams[0].closed)
+    assert a.stats()["cancelled"] == 1
+
+def test_usage_belongs_to_each_stream(make_assistant):
+    from waa.context import MeetingContext
+
+    a = make_assistant(FakeClient(token_sec=0.01), context=MeetingContext())
+    short, long_ = a.stream_answer("Why?"), a.stream_answer("How would you shard the consumers?")
+    # iki akış aynı anda tüketilir; sayılar paylaşılan bir alana değil akışa yazılır
+    got = [x + y for x, y in zip(short, long_)]
+    assert len(got) == len(WORDS) and next(short, None) is None and next(long_, None) is None
+    assert short.usage["prompt_tokens"] == len("Why?")
+    assert long_.usage["prompt_tokens"] == len("How would you shard the consumers?")
+    assert short.usage["completion_tokens"] == len(WORDS)
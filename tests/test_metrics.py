@@ -0,0 +1,65 @@
+# --- tests/test_metrics.py ---
+import json
+
+import pytest
+
+from waa.metrics import Metrics, MetricsReporter, StageProfiler, percentiles
+
+
+def test_percentiles_interpolate():
+    p = percentiles([1.0, 2.0, 3.0, 4.0])
+    assert p["count"] == 4
+    assert p["p50"] == pytest.approx(2.5)
+    assert p["p90"] == pytest.approx(3.7)
+    assert (p["mean"], p["max"]) == (2.5, 4.0)
+    assert percentiles([]) == {"count": 0}
+
+
+def test_summary_reports_spans_counters_and_gauges():
+    m = Metrics()
+    for v in (0.010, 0.020, 0.030):
+        m.observe("asr_decode", v, kind="single")
+    with m.span("answer_ttft"):
+        pass
+    m.inc("segments", reason="silence")
+    m.inc("segments", 2, reason="silence")
+    m.set("queue_depth", 3, queue="asr")
+    s = m.summary()
+    assert s["spans_ms"]["asr_decode{kind=single}"]["p50"] == 20.0
+    assert s["spans_ms"]["asr_decode{kind=single}"]["count"] == 3
+    assert s["spans_ms"]["answer_ttft"]["count"] == 1
+    assert s["counters"] == {"segments{reason=silence}": 3}
+    assert s["gauges"] == {"queue_depth{queue=asr}": 3.0}
+
+
+def test_prometheus_text_has_cumulative_buckets():
+    m = Metrics(prefix="waa")
+    m.observe("asr_decode", 0.004)
+    m.observe("asr_decode", 0.2)
+    m.inc("errors", stage="asr")
+    text = m.prometheus_text()
+    assert "# TYPE waa_asr_decode_seconds histogram" in text
+    assert 'waa_asr_decode_seconds_bucket{le="0.005"} 1' in text
+    assert 'waa_asr_decode_seconds_bucket{le="+Inf"} 2' in text
+    assert "waa_asr_decode_seconds_count 2" in text
+    assert 'waa_errors_total{stage="asr"} 1' in text
+
+
+def test_reporter_writes_json_and_prom_files(tmp_path):
+    m = Metrics()
+    calls = []
+    rep = MetricsReporter(m, tmp_path, interval=60.0, collect=lambda: calls.append(1) or m.set("up", 1))
+    summary = rep.stop()
+    assert calls == [1] and summary["gauges"] == {"up": 1.0}
+    assert json.loads((tmp_path / "metrics.json").read_text())["gauges"] == {"up": 1.0}
+    assert "waa_up 1" in (tmp_path / "metrics.prom").read_text()
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_cprofile_profiler_dumps_one_file_per_stage(tmp_path):
+    prof = StageProfiler("cprofile", tmp_path)
+    asr = prof.wrap("asr", lambda x: sum(range(x)))
+    assert asr(1000) == sum(range(1000))
+    assert [p.name for p in prof.close()] == ["asr.prof"]
+    with pytest.raises(ValueError):
+        StageProfiler("perf", tmp_path)
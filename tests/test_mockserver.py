@@ -0,0 +1,97 @@
+# --- tests/test_mockserver.py ---
+import re
+import time
+
+import pytest
+
+from waa.llm import AsyncChatAssistant, ChatAssistant
+from waa.mockserver import MockOpenAIServer, MockSettings, load_test
+
+ANSWER = "Shard the consumers by tenant and scale out behind the queue."
+
+
+def _settings(**kw):
+    base = dict(ttft_ms=0.0, ttft_jitter_ms=0.0, token_ms=0.0, token_jitter_ms=0.0,
+                dist="fixed", default_answer=ANSWER, seed=1)
+    base.update(kw)
+    return MockSettings(**base)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(**kw):
+        server = MockOpenAIServer(port=0, settings=_settings(**kw)).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_sync_client_streams_the_answer(serve):
+    server = serve()
+    a = ChatAssistant("mock", server.url)
+    assert "".join(a.stream_answer("How would you scale this?")) == ANSWER
+    assert server.stats()["completed"] == 1 and server.stats()["active"] == 0
+
+
+def test_script_picks_the_answer_by_question(serve):
+    server = serve(script=[(re.compile("kafka", re.IGNORECASE), "A partitioned log.")])
+    a = ChatAssistant("mock", server.url)
+    assert "".join(a.stream_answer("What is Kafka?")) == "A partitioned log."
+    assert "".join(a.stream_answer("What is Redis?")) == ANSWER
+
+
+def test_injected_429_surfaces_as_an_error(serve):
+    server = serve(p_429=1.0)
+    a = AsyncChatAssistant("mock", server.url, connect_timeout=1.0)   # max_retries=0
+    try:
+        report = load_test(a, requests=4, concurrency=2)
+    finally:
+        a.close()
+    assert report["ok"] == 0 and sum(report["errors"].values()) == 4
+    assert server.stats()["injected_429"] >= 4
+
+
+def test_load_test_reports_latency_percentiles(serve):
+    server = serve(ttft_ms=30.0)
+    a = AsyncChatAssistant("mock", server.url, connect_timeout=1.0)
+    try:
+        report = load_test(a, requests=8, concurrency=4)
+    finally:
+        a.close()
+    assert report["ok"] == 8 and report["errors"] == {}
+    assert report["ttft_ms"]["p50"] >= 30.0
+    assert server.stats()["max_active"] <= 4
+
+
+def test_fixed_delays_follow_the_settings(serve):
+    server = serve(ttft_ms=200.0)
+    a = ChatAssistant("mock", server.url)
+    t0 = time.monotonic()
+    assert next(iter(a.stream_answer("q")))
+    assert time.monotonic() - t0 >= 0.2
+    assert server.sample(50.0, 10.0) == 0.05
+
+
+def test_usage_counts_the_shared_prefix_as_cached(serve):
+    server = serve()
+    long_ctx = [{"role": "system", "content": "x" * 6000}]
+    first = server.usage(long_ctx + [{"role": "user", "content": "q1"}], "answer")
+    second = server.usage(long_ctx + [{"role": "user", "content": "q2"}], "answer")
+    assert first["prompt_tokens_details"]["cached_tokens"] == 0
+    cached = second["prompt_tokens_details"]["cached_tokens"]
+    assert cached >= 1024 and cached % 128 == 0 and cached <= second["prompt_tokens"]
+
+
+def test_streamed_usage_reaches_the_stream(serve):
+    from waa.context import MeetingContext
+
+    server = serve()
+    a = ChatAssistant("mock", server.url, context=MeetingContext())
+    stream = a.stream_answer("How would you scale this?")
+    assert "".join(stream) == ANSWER
+    assert stream.usage["prompt_tokens"] > 0 and stream.usage["completion_tokens"] > 0
@@ -0,0 +1,97 @@
+# --- tests/test_multistream.py ---
+import threading
+
+import pytest
+
+from waa.multistream import FairQueue, MultiStreamASR, StreamSpec, parse_stream, segmenter_factory
+from waa.pipeline import QueueClosed, SegmentJob
+
+AUDIO = {"sample_rate": 16000, "frame_ms": 20, "vad_aggressiveness": 2,
+         "max_segment_sec": 12.0, "silence_follow_sec": 0.3, "preroll_ms": 0}
+
+
+def _job(stream, sec, seg_id=0):
+    return SegmentJob(b"\x00\x00" * int(sec * 16000), "silence", 0.0, seg_id, stream=stream)
+
+
+def test_parse_stream_specs():
+    assert parse_stream("me=mic") == StreamSpec("me")
+    assert parse_stream("remote=mic:3") == StreamSpec("remote", device=3)
+    assert parse_stream("call=rec/call.wav") == StreamSpec("call", input="rec/call.wav")
+    with pytest.raises(ValueError):
+        parse_stream("mic")
+
+
+def test_fair_queue_serves_the_least_served_stream_first():
+    q = FairQueue(maxsize_per_stream=8)
+    q.add_stream("loud")
+    q.add_stream("quiet")
+    for i in range(3):
+        q.put(_job("loud", 2.0, i))
+    q.put(_job("quiet", 0.5))
+    order = [q.get().stream for _ in range(4)]
+    assert order == ["loud", "quiet", "loud", "loud"]
+    q.close()
+    with pytest.raises(QueueClosed):
+        q.get()
+
+
+def test_fair_queue_merges_on_overflow():
+    q = FairQueue(maxsize_per_stream=2)
+    q.add_stream("me")
+    for i in range(4):
+        q.put(_job("me", 1.0, i))
+    assert q.depth() == {"me": 2} and q.merged == 2
+    q.get()
+    assert len(q.get().pcm16) == 3 * 16000 * 2
+
+
+class EchoASR:
+    def transcribe_segment(self, pcm16, language=None):
+        return "{0:.1f}s".format(len(pcm16) / 32000.0), "en", 0.9
+
+
+def test_streams_are_segmented_and_decoded_separately(make_wav):
+    specs = [
+        StreamSpec("me", input=str(make_wav([("speech", 0.6), ("silence", 0.5), ("speech", 0.6)])), speed=0.0),
+        StreamSpec("remote", input=str(make_wav([("silence", 0.2), ("speech", 0.8)])), speed=0.0),
+    ]
+    got = []
+    lock = threading.Lock()
+
+    def on_t(t):
+        with lock:
+            got.append(t)
+
+    asr = EchoASR()
+    ms = MultiStreamASR(specs, segmenter_factory(AUDIO), [asr, asr], on_t)
+    ms.start()
+    ms.wait_captures()
+    ms.stop()
+    by_stream = {s: sorted(t.seg_id for t in got if t.stream == s) for s in ("me", "remote")}
+    assert by_stream == {"me": [0, 1], "remote": [0]}
+    assert all(t.text.endswith("s") and t.audio_sec > 0 for t in got)
+    s = ms.stats()
+    assert s["segments"] == {"me": 2, "remote": 1} and s["workers"] == 2
+
+
+class FlakyASR:
+    def transcribe_segment(self, pcm16, language=None):
+        if pcm16 == b"\x01\x00":
+            raise RuntimeError("decode failed")
+        return "segment of {0} bytes".format(len(pcm16)), "en", 0.99
+
+
+def test_worker_survives_a_failing_segment():
+    seen = []
+    runner = MultiStreamASR([], None, [FlakyASR()], seen.append)
+    runner.queue.add_stream("a")
+    for i, pcm in enumerate((b"\x00\x00" * 4, b"\x01\x00", b"\x00\x00" * 8)):
+        runner.queue.put(SegmentJob(pcm, "silence", 0.0, i, stream="a"))
+
+    runner.start()
+    runner.stop()          # kuyruğu boşaltır; hata yükseltmemeli
+
+    assert [t.seg_id for t in seen] == [0, 2]
+    assert runner.stats()["errors"] == 1
+    assert runner.error is None
@@ -0,0 +1,156 @@
+# --- tests/test_pipeline.py ---
+import threading
+import time
+
+import pytest
+
+from waa.pipeline import (
+    BoundedQueue, OverlapStitcher, Pipeline, QueueClosed, SegmentJob, merge_questions, merge_segments, merge_texts,
+)
+
+
+def test_block_policy_waits_for_room():
+    q = BoundedQueue("t", maxsize=1, policy="block")
+    q.put(1)
+    done = threading.Event()
+
+    def producer():
+        q.put(2)
+        done.set()
+
+    threading.Thread(target=producer, daemon=True).start()
+    assert not done.wait(0.1)           # kuyruk dolu → bekler
+    assert q.get() == 1
+    assert done.wait(1.0)
+    assert q.get() == 2
+    assert q.stats()["dropped"] == 0
+
+
+def test_drop_oldest_keeps_the_newest():
+    q = BoundedQueue("t", maxsize=2, policy="drop_oldest")
+    for i in range(5):
+        q.put(i)
+    assert [q.get(), q.get()] == [3, 4]
+    assert q.stats()["dropped"] == 3
+    assert q.stats()["max_depth"] == 2
+
+
+def test_merge_folds_into_the_last_item():
+    q = BoundedQueue("t", maxsize=2, policy="merge", merge=lambda old, new: old + new)
+    for s in ("a", "b", "c", "d"):
+        q.put(s)
+    assert [q.get(), q.get()] == ["a", "bcd"]
+    assert q.stats()["merged"] == 2
+
+
+def test_merge_needs_a_function_and_policy_is_checked():
+    with pytest.raises(ValueError):
+        BoundedQueue("t", policy="merge")
+    with pytest.raises(ValueError):
+        BoundedQueue("t", policy="lifo")
+
+
+def test_get_timeout_and_close():
+    q = BoundedQueue("t")
+    t0 = time.monotonic()
+    assert q.get(timeout=0.05) is None
+    assert time.monotonic() - t0 >= 0.04
+    q.put("last")
+    q.close()
+    assert q.get() == "last"            # kapanınca önce kalanlar boşaltılır
+    with pytest.raises(QueueClosed):
+        q.get()
+    with pytest.raises(QueueClosed):
+        q.put("late")
+
+
+def test_merge_helpers():
+    a = SegmentJob(b"\x01\x00", "maxlen", 1.0, 0)
+    b = SegmentJob(b"\x02\x00", "silence", 2.0, 1)
+    merged = merge_segments(a, b)
+    assert (merged.pcm16, merged.reason, merged.t_end, merged.seg_id) == (b"\x01\x00\x02\x00", "silence", 2.0, 1)
+    assert merge_texts("how do ", " we scale") == "how do we scale"
+    assert merge_questions((1, "how do "), (2, " we scale")) == (2, "how do we scale")
+
+
+def test_merge_keeps_partials_from_displacing_finals():
+    final = SegmentJob(b"\x01\x00", "silence", 1.0, 0)
+    partial = SegmentJob(b"\x02\x00", "partial", 2.0, 1)
+    newer = SegmentJob(b"\x02\x00\x03\x00", "partial", 3.0, 1)
+    assert merge_segments(final, partial) is final
+    assert merge_segments(partial, newer) is newer      # aynı segmentin yeni anlık görüntüsü
+
+
+def _run(source, asr_stage, answer_stage, asr_q=None):
+    p = Pipeline(source, asr_stage, answer_stage, asr_q or BoundedQueue("asr", 4), BoundedQueue("answer", 2))
+    p.start()
+    p.wait(poll=0.02)
+    return p
+
+
+def test_pipeline_runs_every_segment_through_both_stages():
+    source = [(b"\x00\x00" * n, "silence") for n in (1, 2, 3)]
+    answered = []
+    p = _run(source, lambda job: len(job.pcm16), answered.append)
+    assert answered == [2, 4, 6]
+    asr, answer = p.stats()
+    assert (asr["put"], asr["get"], answer["put"]) == (3, 3, 3)
+
+
+def test_partials_carry_their_segment_id():
+    source = [(b"\x00\x00", "partial"), (b"\x00\x00", "silence"), (b"\x00\x00", "partial"), (b"\x00\x00", "maxlen")]
+    seen = []
+    _run(source, lambda job: (job.reason, job.seg_id), seen.append)
+    assert seen == [("partial", 0), ("silence", 0), ("partial", 1), ("maxlen", 1)]
+
+
+def test_asr_stage_can_drop_and_errors_propagate():
+    answered = []
+    p = _run([(b"\x00\x00", "silence"), (b"", "silence")], lambda job: job.pcm16 or None, answered.append)
+    assert answered == [b"\x00\x00"]
+    assert p.error is None
+
+    def boom(job):
+        raise RuntimeError("decoder crashed")
+
+    with pytest.raises(RuntimeError, match="decoder crashed"):
+        _run([(b"\x00\x00", "silence")], boom, answered.append)
+
+
+def test_merge_segments_trims_the_overlap():
+    sr = 16000
+    old = SegmentJob(b"\x01\x00" * sr, "maxlen", 0.0, 0)
+    new = SegmentJob(b"\x02\x00" * (sr // 2) + b"\x03\x00" * sr, "silence", 1.0, 1, overlap_sec=0.5)
+    merged = merge_segments(old, new)
+    assert merged.pcm16 == b"\x01\x00" * sr + b"\x03\x00" * sr
+    assert (merged.seg_id, merged.reason) == (1, "silence")
+
+
+def _job(reason, seconds, overlap=0.0, sr=16000):
+    return SegmentJob(b"\x00\x00" * int(seconds * sr), reason, 0.0, overlap_sec=overlap)
+
+
+def test_stitcher_splits_words_at_the_middle_of_the_overlap():
+    st = OverlapStitcher(1.0)
+    cut = _job("maxlen", 10.0)
+    # son kelime kesimin ortasından (9.5 s) sonra → sonraki segmente ait
+    words = [(8.0, 8.4, " we"), (8.5, 9.2, " shard"), (9.4, 9.9, " consumers")]
+    assert st.stitch(cut, "we shard consumers", words) == "we shard"
+    nxt = _job("silence", 4.0, overlap=1.0)
+    words = [(0.0, 0.3, " shard"), (0.6, 1.0, " consumers"), (1.1, 1.5, " by"), (1.6, 2.0, " tenant")]
+    assert st.stitch(nxt, "shard consumers by tenant", words) == "consumers by tenant"
+    assert st.stats()["trimmed_words"] == 2
+
+
+def test_stitcher_drops_repeated_head_without_timestamps():
+    st = OverlapStitcher(1.0)
+    assert st.stitch(_job("maxlen", 10.0), "we keep the hot path") == "we keep the hot path"
+    assert st.stitch(_job("silence", 3.0, overlap=1.0), "hot path, stateless.") == "stateless."
+    assert st.stats()["repeated_words"] == 2
+    # kesim olmadan gelen segment dokunulmadan geçer
+    assert st.stitch(_job("silence", 2.0), "hot path again") == "hot path again"
+
+
+def test_stitcher_off_is_a_no_op():
+    st = OverlapStitcher(0.0)
+    assert st.stitch(_job("maxlen", 10.0), "anything at all") == "anything at all"
@@ -0,0 +1,48 @@
+# --- tests/test_resample.py ---
+import numpy as np
+import pytest
+
+from waa.resample import PolyphaseResampler
+
+
+def _noise(rate, channels, seconds=0.5, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(-12000, 12000, int(rate * seconds) * channels, dtype=np.int16)
+
+
+@pytest.mark.parametrize("rate,channels", [(44100, 2), (48000, 1), (22050, 1), (96000, 2)])
+def test_output_does_not_depend_on_chunking(rate, channels):
+    x = _noise(rate, channels)
+    whole = PolyphaseResampler(rate, 16000, channels).process(x.tobytes())
+    r = PolyphaseResampler(rate, 16000, channels)
+    step = 1234 * channels
+    parts = [r.process(x[i:i + step].tobytes()) for i in range(0, len(x), step)]
+    assert np.array_equal(np.concatenate(parts), whole)
+    assert abs(len(whole) - len(x) // channels * 16000 / rate) <= 1
+
+
+def test_passthrough_and_reset():
+    x = _noise(16000, 1)
+    r = PolyphaseResampler(16000, 16000)
+    assert r.passthrough
+    assert np.array_equal(r.process(x.tobytes()), x)
+
+    r = PolyphaseResampler(48000, 16000)
+    first = r.process(x.tobytes())
+    r.reset()
+    assert np.array_equal(r.process(x.tobytes()), first)
+
+
+def _tone(rate, hz, seconds=1.0):
+    t = np.arange(int(rate * seconds)) / float(rate)
+    return (np.sin(2 * np.pi * hz * t) * 10000).astype(np.int16)
+
+
+def test_keeps_speech_band_and_rejects_aliases():
+    r = PolyphaseResampler(48000, 16000)
+    y = r.process(_tone(48000, 1000).tobytes()).astype(np.float64)
+    spec = np.abs(np.fft.rfft(y[2000:]))
+    assert abs(np.argmax(spec) * 16000 / len(y[2000:]) - 1000) < 5
+    # 12 kHz, 16 kHz'de 4 kHz'e katlanırdı → süzgeç bastırmalı
+    alias = PolyphaseResampler(48000, 16000).process(_tone(48000, 12000).tobytes()).astype(np.float64)
+    assert np.sqrt(np.mean(alias[2000:] ** 2)) < 0.01 * np.sqrt(np.mean(y[2000:] ** 2))
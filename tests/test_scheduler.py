@@ -0,0 +1,134 @@
+# --- tests/test_scheduler.py ---
+from waa.pipeline import BoundedQueue, SegmentJob
+from waa.scheduler import BatchingScheduler, CoalescingScheduler
+
+SR = 16000
+
+
+class JoinASR:
+    """Records joined calls and echoes one transcript per segment."""
+    def __init__(self):
+        self.calls = []
+
+    def transcribe_joined(self, pcms, language=None, gap_sec=0.3):
+        self.calls.append(len(pcms))
+        return [("seg{0}".format(i), "en", 0.9) for i in range(len(pcms))]
+
+
+def _job(sec, reason="silence", seg_id=0):
+    return SegmentJob(b"\x00\x00" * int(sec * SR), reason, 0.0, seg_id)
+
+
+def _queue(*jobs):
+    q = BoundedQueue("asr", maxsize=16)
+    for j in jobs:
+        q.put(j)
+    return q
+
+
+def test_lone_short_segment_decodes_alone():
+    asr = JoinASR()
+    sched = CoalescingScheduler(asr)
+    jobs = sched.next_jobs(_queue(_job(0.5)))
+    assert len(jobs) == 1 and jobs[0].result is None
+    assert asr.calls == []
+    assert sched.stats()["single_decodes"] == 1
+
+
+def test_waiting_short_finals_share_one_decode():
+    asr = JoinASR()
+    sched = CoalescingScheduler(asr)
+    q = _queue(_job(0.5, seg_id=1), _job(0.8, seg_id=2), _job(1.0, seg_id=3))
+    jobs = sched.next_jobs(q)
+    assert [j.seg_id for j in jobs] == [1, 2, 3]
+    assert [j.result[0] for j in jobs] == ["seg0", "seg1", "seg2"]
+    assert asr.calls == [3]
+    assert sched.stats() == {"single_decodes": 0, "joined_decodes": 1, "joined_segments": 3,
+                             "failed_joins": 0}
+
+
+def test_long_segments_and_partials_are_not_joined():
+    asr = JoinASR()
+    sched = CoalescingScheduler(asr, short_sec=2.0)
+    q = _queue(_job(3.0), _job(0.5), _job(0.5, "partial"), _job(0.5))
+    assert len(sched.next_jobs(q)) == 1          # uzun segment tek başına
+    assert len(sched.next_jobs(q)) == 1          # arkasında partial var → katılmaz
+    assert len(sched.next_jobs(q)) == 1          # partial
+    assert asr.calls == []
+
+
+def test_joined_audio_respects_the_total_budget():
+    asr = JoinASR()
+    sched = CoalescingScheduler(asr, short_sec=2.0, max_total_sec=3.0, gap_sec=0.3)
+    q = _queue(_job(1.5), _job(1.0), _job(1.0))
+    assert len(sched.next_jobs(q)) == 2          # 1.5 + 0.3 + 1.0 ≤ 3.0
+    assert len(q) == 1
+
+
+class BatchASR(JoinASR):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def transcribe_batch(self, pcms, language=None, batch_size=8):
+        self.batches.append(len(pcms))
+        return [("b{0}".format(i), "en", 0.9) for i in range(len(pcms))]
+
+
+def test_backlog_is_decoded_as_one_batch():
+    asr = BatchASR()
+    sched = BatchingScheduler(asr, max_batch=3, min_batch=3)
+    q = _queue(*[_job(3.0, seg_id=i) for i in range(5)])
+    jobs = sched.next_jobs(q)
+    assert [j.result[0] for j in jobs] == ["b0", "b1", "b2"]
+    assert asr.batches == [3] and len(q) == 2
+    assert sched.stats()["batched_segments"] == 3 and sched.stats()["max_batch"] == 3
+
+
+def test_short_backlog_uses_the_fallback_scheduler():
+    asr = BatchASR()
+    sched = BatchingScheduler(asr, min_batch=3, fallback=CoalescingScheduler(asr))
+    jobs = sched.next_jobs(_queue(_job(0.5), _job(0.5)))
+    assert len(jobs) == 2 and asr.batches == [] and asr.calls == [2]
+    assert sched.stats()["joined_decodes"] == 1 and sched.stats()["batches"] == 0
+
+
+def test_batch_stops_at_a_partial():
+    asr = BatchASR()
+    sched = BatchingScheduler(asr, min_batch=3)
+    q = _queue(_job(3.0), _job(3.0), _job(0.5, "partial"), _job(3.0))
+    assert len(sched.next_jobs(q)) == 2
+    assert q.get().reason == "partial"
+
+
+class FailingASR:
+    def transcribe_batch(self, pcms, language=None, batch_size=8):
+        raise RuntimeError("CUDA out of memory")
+
+    def transcribe_joined(self, pcms, language=None, gap_sec=0.3):
+        raise RuntimeError("CUDA out of memory")
+
+
+def test_failed_batch_returns_jobs_undecoded():
+    sched = BatchingScheduler(FailingASR(), max_batch=8, min_batch=3)
+    q = _queue(*[_job(1.0, seg_id=i) for i in range(4)])
+
+    jobs = sched.next_jobs(q)
+
+    assert [j.seg_id for j in jobs] == [0, 1, 2, 3]
+    assert all(j.result is None for j in jobs)
+    assert len(q) == 0
+    assert sched.stats()["failed_batches"] == 1
+    assert sched.stats()["batches"] == 0
+
+
+def test_failed_join_returns_jobs_undecoded():
+    sched = CoalescingScheduler(FailingASR(), short_sec=2.0)
+    q = _queue(*[_job(0.5, seg_id=i) for i in range(3)])
+
+    jobs = sched.next_jobs(q)
+
+    assert [j.seg_id for j in jobs] == [0, 1, 2]
+    assert all(j.result is None for j in jobs)
+    assert sched.stats()["failed_joins"] == 1
+    assert sched.stats()["joined_decodes"] == 0
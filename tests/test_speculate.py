@@ -0,0 +1,132 @@
+# --- tests/test_speculate.py ---
+import threading
+import time
+
+from waa.speculate import Prefetch, Speculator, similarity
+
+
+class Streams:
+    """Answer source: records questions; each stream yields three tokens."""
+    def __init__(self, ttft=0.0):
+        self.ttft = ttft
+        self.questions = []
+
+    def __call__(self, question):
+        self.questions.append(question)
+        time.sleep(self.ttft)
+        for tok in ("A", " B", " C"):
+            yield tok
+
+
+def test_similarity_ignores_filler_and_case():
+    assert similarity("So, what is Kafka?", "what is kafka") == 1.0
+    assert similarity("what is kafka", "how does redis work") < 0.5
+
+
+def test_prefetch_replays_buffered_and_live_tokens():
+    pf = Prefetch(1, "q", Streams())
+    assert "".join(pf.replay()) == "A B C"
+    assert "".join(pf.replay()) == "A B C"       # tekrar oynatılabilir
+
+
+def test_claim_keeps_a_similar_prefetch():
+    streams = Streams(ttft=0.05)
+    spec = Speculator(streams)
+    spec.on_partial(1, "what is kafka")
+    spec.on_partial(1, "what is kafka")          # aynı soru → yeniden başlamaz
+    stream = spec.claim("What is Kafka?", 1)
+    assert "".join(stream) == "A B C"
+    assert streams.questions == ["what is kafka"]
+    s = spec.stats()
+    assert s["won"] == 1 and s["lost"] == 0 and s["win_rate"] == 1.0
+    assert len(spec.saved_ms) == 1 and spec.saved_ms[0] >= 0.0
+
+
+def test_claim_drops_a_different_question():
+    spec = Speculator(Streams())
+    spec.on_partial(1, "what is kafka")
+    assert spec.claim("how does redis replicate data", 1) is None
+    assert spec.claim("anything", 1) is None
+    s = spec.stats()
+    assert s["lost"] == 1 and s["not_prefetched"] == 1 and s["win_rate"] == 0.0
+
+
+def test_drifting_partials_reissue_up_to_the_limit():
+    streams = Streams()
+    spec = Speculator(streams, max_restarts=1)
+    spec.on_partial(1, "what is")
+    spec.on_partial(1, "what is the difference between kafka and rabbitmq")
+    spec.on_partial(1, "how do you scale postgres reads")   # sınır aşıldı → yok sayılır
+    s = spec.stats()
+    assert s["started"] == 2 and s["reissued"] == 1 and s["cancelled"] == 1
+
+
+def test_cancel_stops_the_stream():
+    release = threading.Event()
+    closed = threading.Event()
+
+    def slow(question):
+        try:
+            yield "A"
+            release.wait(2.0)
+            yield " B"
+            yield " C"
+        finally:
+            closed.set()
+
+    spec = Speculator(slow)
+    spec.on_partial(1, "what is kafka")
+    spec.cancel_pending()
+    release.set()
+    assert closed.wait(1.0)
+    assert spec.stats()["cancelled"] == 1
+
+
+def test_claim_ignores_a_prefetch_of_another_segment():
+    spec = Speculator(Streams())
+    spec.on_partial(1, "what is kafka")
+    assert spec.claim("what is kafka", 2) is None
+    s = spec.stats()
+    assert s["won"] == 0 and s["not_prefetched"] == 1 and s["cancelled"] == 1
+
+
+class BlockingStream:
+    """AnswerStream stand-in: blocks before its second token until cancel() aborts it."""
+    def __init__(self):
+        self.aborted = threading.Event()
+        self.sent = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.sent:
+            self.sent = True
+            return "A"
+        if self.aborted.wait(5.0):
+            raise ConnectionError("aborted")
+        return " B"
+
+    def cancel(self):
+        self.aborted.set()
+
+
+def test_cancel_aborts_the_underlying_stream_without_waiting():
+    stream = BlockingStream()
+    pf = Prefetch(1, "what is kafka", lambda q: stream)
+    while not pf.tokens:
+        time.sleep(0.01)
+    t0 = time.monotonic()
+    pf.cancel()
+    assert stream.aborted.is_set()
+    assert "".join(pf.replay()) == "A"          # iptal kaynaklı hata yüzeye çıkmaz
+    assert time.monotonic() - t0 < 1.0 and pf.error is None
+
+
+def test_claimed_prefetch_reports_the_saved_time():
+    spec = Speculator(Streams(ttft=0.2))
+    spec.on_partial(3, "how do you scale postgres reads")
+    time.sleep(0.25)                              # final geldiğinde ilk token hazır
+    assert "".join(spec.claim("How do you scale Postgres reads?", 3)) == "A B C"
+    assert spec.saved_ms[0] > 100.0
+    assert spec.stats()["ttft_saved_ms_total"] == round(spec.saved_ms[0], 1)
@@ -0,0 +1,64 @@
+# --- tests/test_startup.py ---
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from waa.startup import BackgroundLoader, StartupTimer
+
+
+class Model:
+    def __init__(self):
+        self.warm = False
+
+    def decode(self):
+        return "ok"
+
+
+def test_loader_blocks_attribute_access_until_ready():
+    gate = threading.Event()
+
+    def factory():
+        gate.wait(2.0)
+        return Model()
+
+    loader = BackgroundLoader("asr", factory, warmup=lambda m: setattr(m, "warm", True))
+    assert not loader.ready()
+    with pytest.raises(TimeoutError):
+        loader.get(timeout=0.05)
+    gate.set()
+    assert loader.decode() == "ok"               # hazır olana kadar bekler
+    assert loader.ready() and loader.get().warm
+
+
+def test_loader_reraises_the_build_error():
+    def factory():
+        raise RuntimeError("no model")
+
+    loader = BackgroundLoader("asr", factory)
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="no model"):
+            loader.get(timeout=1.0)
+
+
+def test_timer_reports_load_and_warmup_phases():
+    timer = StartupTimer()
+    ready = []
+    loader = BackgroundLoader("asr", Model, warmup=lambda m: None, timer=timer, on_ready=ready.append)
+    loader.get(timeout=1.0)
+    assert [n for n, _ in timer.phases] == ["asr load", "asr warm-up"]
+    assert ready == [loader.get()]
+    assert timer.report().startswith("⏱ Startup: asr load")
+
+
+def test_cli_import_skips_heavy_modules():
+    code = (
+        "import sys, waa, waa.cli\n"
+        "heavy = [m for m in ('faster_whisper', 'openai', 'sounddevice', 'whisper_answer_assistant') if m in sys.modules]\n"
+        "print(','.join(heavy))\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+    assert out.stdout.strip() == ""
@@ -0,0 +1,60 @@
+# --- tests/test_streaming.py ---
+from waa.pipeline import SegmentJob
+from waa.streaming import LocalAgreement, StreamingASR, common_prefix
+
+
+def test_common_prefix_ignores_case_and_punctuation():
+    assert common_prefix([["How", "do", "we"], ["how", "do,", "you"]]) == ["how", "do,"]
+    assert common_prefix([["a"], []]) == []
+    assert common_prefix([]) == []
+
+
+def test_words_commit_once_two_decodes_agree():
+    la = LocalAgreement(2)
+    assert la.update(["how", "do"]) == ([], ["how", "do"])
+    assert la.update(["how", "do", "we"]) == (["how", "do"], ["we"])
+    assert la.update(["how", "do", "we", "scale"]) == (["how", "do", "we"], ["scale"])
+    la.reset()
+    assert la.update(["next"]) == ([], ["next"])
+
+
+def test_committed_prefix_does_not_shrink_on_a_shorter_decode():
+    la = LocalAgreement(2)
+    la.update(["how", "do", "we"])
+    la.update(["how", "do", "we", "scale"])
+    committed, tentative = la.update(["how", "do"])
+    assert committed == ["how", "do", "we"]
+    assert tentative == []
+
+
+
+def test_diverging_decodes_do_not_rewrite_the_committed_prefix():
+    la = LocalAgreement(2)
+    la.update(["how", "do", "you"])
+    assert la.update(["how", "do", "you"]) == (["how", "do", "you"], [])
+    assert la.update(["what", "is", "your", "name"]) == (["how", "do", "you"], ["what", "is", "your", "name"])
+    committed, _ = la.update(["what", "is", "your", "name"])
+    assert committed == ["how", "do", "you"]
+    assert la.update(["how", "do", "you", "scale"]) == (["how", "do", "you"], ["scale"])
+
+class ScriptedASR:
+    def __init__(self, texts):
+        self.texts = list(texts)
+
+    def transcribe_segment(self, pcm16, language=None):
+        return self.texts.pop(0), "en", 0.9
+
+
+def _job(reason, seg_id):
+    return SegmentJob(b"\x00\x00", reason, 0.0, seg_id)
+
+
+def test_streaming_asr_emits_partials_then_the_final():
+    s = StreamingASR(ScriptedASR(["how do", "how do we", "how do we scale", "How do we scale?", "next"]))
+    events = [s.process(_job("partial", 0)) for _ in range(3)] + [s.process(_job("silence", 0))]
+    assert [e.kind for e in events] == ["partial"] * 3 + ["final"]
+    assert [e.stable for e in events[:3]] == ["", "how do", "how do we"]
+    assert events[2].text == "how do we scale"
+    assert (events[3].text, events[3].stable) == ("How do we scale?", "How do we scale?")
+    # yeni segment: uzlaşma sıfırdan başlar
+    assert s.process(_job("partial", 1)).stable == ""
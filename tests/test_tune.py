@@ -0,0 +1,74 @@
+# --- tests/test_tune.py ---
+import json
+import time
+
+import pytest
+
+from waa.tune import (
+    Candidate, TuneResult, load_profile, pick, save_profile, tune, word_error_rate,
+)
+
+REFERENCE = "we shard the consumers by tenant"
+SEGMENTS = [b"\x00\x00" * 8000, b"\x00\x00" * 8000]      # 2 × 0.5 s
+
+
+def test_word_error_rate():
+    assert word_error_rate("The cat sat.", "the cat sat") == 0.0
+    assert word_error_rate("the cat sat", "the cat sit") == pytest.approx(1 / 3)
+    assert word_error_rate("the cat sat", "the black cat sat down") == pytest.approx(2 / 3)
+    assert word_error_rate("real-time", "real time") == 0.0
+    assert word_error_rate("", "") == 0.0 and word_error_rate("", "x") == 1.0
+
+
+class FakeASR:
+    """Bigger model → slower and more accurate; `tiny` drops a word."""
+    DELAY = {"tiny": 0.005, "base": 0.02, "small": 0.4, "medium": 1.0}
+
+    def __init__(self, model_name="tiny", model=None, beam_size=1):
+        self.name = model_name
+        self.model = model or model_name
+        self.beam_size = beam_size
+
+    def warmup(self):
+        pass
+
+    def transcribe_segment(self, pcm16, language=None):
+        time.sleep(self.DELAY[self.name])
+        words = REFERENCE.split()
+        half = words[:3] if pcm16 is SEGMENTS[0] else words[3:]
+        if self.name == "tiny":
+            half = half[1:]
+        return " ".join(half), "en", 0.99
+
+
+def _tune(models, **kw):
+    return tune(SEGMENTS, REFERENCE, models, ["int8"], [2], [1], [1], max_rtf=0.5,
+                make_asr=lambda c: FakeASR(c.model), **kw)
+
+
+def test_tune_skips_models_larger_than_the_first_miss():
+    results = _tune(["medium", "tiny", "small", "base"])
+    assert [r.candidate.model for r in results] == ["tiny", "base", "small"]
+    assert [r.meets_budget for r in results] == [True, True, False]
+    assert results[0].wer == pytest.approx(2 / 6, abs=1e-4) and results[1].wer == 0.0
+
+
+def test_pick_prefers_accuracy_within_budget():
+    results = _tune(["tiny", "base"])
+    assert pick(results).candidate.model == "base"
+    over = [TuneResult(Candidate(m, "int8", 2, 1, 1), rtf, 100.0, 0.1, 1.0, False) for m, rtf in (("a", 0.9), ("b", 0.7))]
+    assert pick(over).candidate.model == "b"                    # bütçede yok → en hızlı
+    assert pick([]) is None
+
+
+def test_profile_round_trips_on_the_same_machine(tmp_path, capsys):
+    results = _tune(["tiny", "base"])
+    path = save_profile(tmp_path / "tune.json", pick(results), results, {"max_rtf": 0.5}, "clip.wav")
+    choice = load_profile(path)
+    assert choice["model"] == "base" and choice["beam_size"] == 1
+    data = json.loads(path.read_text())
+    data["fingerprint"]["cpu"] = "another cpu"
+    path.write_text(json.dumps(data))
+    assert load_profile(path) is None
+    assert "another machine" in capsys.readouterr().out
+    assert load_profile(tmp_path / "missing.json") is None
@@ -5,7 +5,7 @@ Whisper Answer Assistant (EN focus): Realtime EN transcript + instant EN answer
 - Transcribe with faster-whisper (auto language; we route if EN)
 - If the utterance looks like an English question, ask ChatGPT for a short, speakable answer
 - Optionally auto-copy the answer to clipboard (--auto-copy)
-- Logs to meeting_log.txt
+- Logs transcripts/answers to meeting_log.jsonl (buffered, background writer)
 
 Usage:
   python whisper_answer_assistant.py --whisper-model base --auto-copy
@@ -32,6 +32,12 @@ load_dotenv()
 from faster_whisper import WhisperModel
 from openai import OpenAI
 
+try:
+    from waa.eventlog import EventLog
+except ImportError:   # paket kurulmadan depo kökünden çalıştırma
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+    from waa.eventlog import EventLog
+
 AUDIO_SR = 16000
 CHANNELS = 1
 DTYPE = "int16"
@@ -41,14 +47,16 @@ VAD_AGGRESSIVENESS = 2
 MAX_SEGMENT_SEC = 15
 SILENCE_FOLLOW_SEC = 0.6
 
-LOG_PATH = "meeting_log.txt"
+LOG_PATH = "meeting_log.jsonl"
+LOG = None  # main() içinde açılır
 
 def ts():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def log(line: str):
-    with open(LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(line)
+def log(kind: str, **fields):
+    # kuyruğa atar; dosyaya arka plan thread'i toplu yazar
+    if LOG is not None:
+        LOG.write(kind, **fields)
 
 EN_QUESTION_STARTS = (
     "what", "why", "how", "when", "where", "who", "which",
@@ -94,9 +102,10 @@ def pcm_float32_from_int16(pcm16: bytes) -> np.ndarray:
 
 @dataclass
 class SegState:
+    # konumlar yakalanan örnek sayısı cinsinden (duvar saati değil)
     buf: bytearray = field(default_factory=bytearray)
-    start: Optional[float] = None
-    last_voiced: Optional[float] = None
+    start: Optional[int] = None
+    last_voiced: Optional[int] = None
 
 class Worker(threading.Thread):
     def __init__(self, device: Optional[int], whisper_model: str, auto_copy: bool, openai_model: str):
@@ -108,6 +117,7 @@ class Worker(threading.Thread):
 
         self.vad = webrtcvad.Vad(VAD_AGGRESSIVENESS)
         self.seg = SegState()
+        self.samples = 0
         self.stop_evt = threading.Event()
         self.model = None
         self.client = None
@@ -146,7 +156,8 @@ class Worker(threading.Thread):
         if not frame:
             return
         voiced = self.vad.is_speech(frame, AUDIO_SR)
-        now = time.time()
+        self.samples += len(frame) // 2
+        now = self.samples
 
         if voiced:
             if self.seg.start is None:
@@ -154,14 +165,14 @@ class Worker(threading.Thread):
                 self.seg.buf = bytearray()
             self.seg.buf.extend(frame)
             self.seg.last_voiced = now
-            if (now - self.seg.start) > MAX_SEGMENT_SEC:
+            if (now - self.seg.start) > MAX_SEGMENT_SEC * AUDIO_SR:
                 self._finalize(now, reason="maxlen")
         else:
             if self.seg.start is not None and self.seg.last_voiced is not None:
-                if (now - self.seg.last_voiced) >= SILENCE_FOLLOW_SEC:
+                if (now - self.seg.last_voiced) >= SILENCE_FOLLOW_SEC * AUDIO_SR:
                     self._finalize(now, reason="silence")
 
-    def _finalize(self, now: float, reason: str):
+    def _finalize(self, now: int, reason: str):
         pcm16 = bytes(self.seg.buf)
         self.seg = SegState()
         if not pcm16:
@@ -169,6 +180,7 @@ class Worker(threading.Thread):
 
         print(f"\n[{ts()}] (segment {reason}) decoding...")
         audio = pcm_float32_from_int16(pcm16)
+        t0 = time.perf_counter()
         try:
             segments, info = self.model.transcribe(
                 audio,
@@ -184,25 +196,28 @@ class Worker(threading.Thread):
             prob = getattr(info, "language_probability", None)
         except Exception as e:
             print("Transcription error:", e)
-            log(f"[{ts()}] ERROR transcribe: {e}\n")
+            log("error", stage="asr", error=str(e))
             return
 
         if text.strip():
             prob_s = f", p={prob:.2f}" if prob is not None else ""
             print(f"[{ts()}] You ({lang}{prob_s}): {text}")
-            log(f"[{ts()}] USER({lang}): {text}\n")
+            question = is_english_question(text, lang)
+            log("transcript", reason=reason, text=text, lang=lang,
+                prob=round(prob, 3) if prob is not None else None, question=question,
+                decode_ms=round((time.perf_counter() - t0) * 1000.0, 1))
 
-            if is_english_question(text, lang):
+            if question:
                 print("-" * 80)
                 print(f"🧩 English question detected:\n> {text}")
-                log(f"[{ts()}] ROUTER: EN question: {text}\n")
                 if self.client is None:
                     print("(OpenAI not configured) Skipping answer.\n" + "-" * 80)
                     return
+                t_ask = time.perf_counter()
+                t_first = None
                 try:
                     stream = stream_answer(self.client, text, model=self.openai_model)
                     print("🤖 Suggested answer (speak this):")
-                    log(f"[{ts()}] ASSISTANT: ")
                     collected = []
                     for chunk in stream:
                         delta = ""
@@ -211,12 +226,15 @@ class Worker(threading.Thread):
                         except Exception:
                             pass
                         if delta:
+                            if t_first is None:
+                                t_first = time.perf_counter() - t_ask
                             collected.append(delta)
                             print(delta, end="", flush=True)
-                            log(delta)
                     answer = "".join(collected).strip()
                     print("\n" + "-" * 80)
-                    log("\n")
+                    log("answer", question=text, answer=answer,
+                        ttft_ms=round(t_first * 1000.0, 1) if t_first is not None else None,
+                        total_ms=round((time.perf_counter() - t_ask) * 1000.0, 1))
                     if self.auto_copy and answer:
                         try:
                             pyperclip.copy(answer)
@@ -225,7 +243,7 @@ class Worker(threading.Thread):
                             pass
                 except Exception as e:
                     print("\n⚠️ OpenAI error:", e)
-                    log(f"[{ts()}] ERROR OpenAI: {e}\n")
+                    log("error", stage="llm", question=text, error=str(e))
 
 def list_devices_and_exit():
     print(sd.query_devices())
@@ -255,6 +273,8 @@ def main():
     print(f"Auto-copy: {'ON' if args.auto_copy else 'OFF'}")
     print("=" * 80)
 
+    global LOG
+    LOG = EventLog(LOG_PATH)
     worker = Worker(
         device=args.device,
         whisper_model=args.whisper_model,
@@ -269,6 +289,7 @@ def main():
         print("\n🛑 Stopping...")
     finally:
         worker.stop()
+        LOG.close()
 
 if __name__ == "__main__":
     main()